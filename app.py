@@ -1,9 +1,13 @@
 import gradio as gr
-from pipeline import nl_to_sql
+from pipeline import impossible_filters, nl_to_sql, nl_to_sql_page, page_token, token_after
+from prepared import PreparedStatements, drop_session, session_for
+from query_generator.sql_ast import inline
+from schema_mapper.introspection import catalog_for, values_for
 import sqlite3
 import pandas as pd
 import os
 import base64
+import hashlib
 
 try:
     import psycopg2
@@ -22,71 +26,157 @@ except ImportError:
     pymongo = None
 
 DB_TYPES = ["Demo (built-in schema)", "SQLite (upload .db)", "PostgreSQL", "MySQL", "MongoDB"]
+# Rows per page of a translated question
+PAGE_SIZE = 100
+# No statement loads more rows than this into memory
+MAX_ROWS = 1000
 
-def run_sql_on_sqlite(db_file, sql):
+def _show(columns, rows, rowcount, max_rows=None):
+    if columns is not None:
+        table = pd.DataFrame(rows, columns=columns).to_markdown(index=False)
+        if max_rows is not None and len(rows) >= max_rows:
+            table += f"\n\n(First {max_rows} rows)"
+        return table
+    return f"Query executed successfully. Rows affected: {rowcount}"
+
+def run_sql(conn, sql, params=None, max_rows=MAX_ROWS):
+    """
+    Execute ``sql`` on an open DB-API connection, fetching at most
+    ``max_rows`` rows; returns (result, error). With ``params`` the SQL has
+    placeholders for them.
+    """
     try:
-        conn = sqlite3.connect(db_file)
         cur = conn.cursor()
-        cur.execute(sql)
-        if sql.strip().lower().startswith("select"):
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
-            df = pd.DataFrame(rows, columns=columns)
-            result = df.to_markdown(index=False)
+        if params:
+            cur.execute(sql, params)
         else:
+            cur.execute(sql)
+        columns = [desc[0] for desc in cur.description] if cur.description else None
+        rows = cur.fetchmany(max_rows) if columns is not None else []
+        if columns is None:
             conn.commit()
-            result = f"Query executed successfully. Rows affected: {cur.rowcount}"
+        result = _show(columns, rows, cur.rowcount, max_rows)
         cur.close()
-        conn.close()
         return result, None
     except Exception as e:
         return None, str(e)
 
-def run_sql_on_postgres(host, port, user, password, dbname, sql):
+def connect_sqlite(db_file):
+    return sqlite3.connect(db_file)
+
+def connect_postgres(host, port, user, password, dbname):
     if not psycopg2:
-        return None, "psycopg2 is not installed. Cannot connect to PostgreSQL."
+        raise RuntimeError("psycopg2 is not installed. Cannot connect to PostgreSQL.")
+    return psycopg2.connect(
+        host=host, port=port, user=user, password=password, dbname=dbname
+    )
+
+def connect_mysql(host, port, user, password, dbname):
+    if not mysql_connector_available:
+        raise RuntimeError("mysql-connector-python is not installed. Cannot connect to MySQL.")
+    return mysql.connector.connect(
+        host=host, port=port, user=user, password=password, database=dbname
+    )
+
+def _run_with(connect, sql):
     try:
-        conn = psycopg2.connect(
-            host=host, port=port, user=user, password=password, dbname=dbname
-        )
-        cur = conn.cursor()
-        cur.execute(sql)
-        if sql.strip().lower().startswith("select"):
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
-            df = pd.DataFrame(rows, columns=columns)
-            result = df.to_markdown(index=False)
-        else:
-            conn.commit()
-            result = f"Query executed successfully. Rows affected: {cur.rowcount}"
-        cur.close()
-        conn.close()
-        return result, None
+        conn = connect()
     except Exception as e:
         return None, str(e)
+    try:
+        return run_sql(conn, sql)
+    finally:
+        conn.close()
+
+def run_sql_on_sqlite(db_file, sql):
+    return _run_with(lambda: connect_sqlite(db_file), sql)
+
+def run_sql_on_postgres(host, port, user, password, dbname, sql):
+    return _run_with(lambda: connect_postgres(host, port, user, password, dbname), sql)
 
 def run_sql_on_mysql(host, port, user, password, dbname, sql):
-    if not mysql_connector_available:
-        return None, "mysql-connector-python is not installed. Cannot connect to MySQL."
+    return _run_with(lambda: connect_mysql(host, port, user, password, dbname), sql)
+
+def translate_and_run(nl_query, connect, key=None, background_refresh=True, dialect="sqlite", session=None,
+                      token=None):
+    """
+    Translate ``nl_query`` against the live schema and values of the
+    database that ``connect()`` opens, then run it there. The schema is
+    introspected once per database (``key``) and reused until it changes,
+    and its text column values are sampled and refreshed as they change (in
+    the background with ``background_refresh``, which calls ``connect``
+    again). A query whose equality filters no row can match is not run. If
+    the connection or introspection fails the bundled schema and values are
+    used. Returns (sql, result, error, token).
+
+    A SELECT reads one page of PAGE_SIZE rows. When its table has a primary
+    key the page is a keyset range and, if it came back full, ``token``
+    fetches the next one (pass it back with the same question); otherwise
+    the rows are capped at PAGE_SIZE and ``token`` is None.
+
+    The SQL shown has its values written in; what runs is the same statement
+    with placeholders, prepared once per connection, so questions that
+    differ only in their values reuse one plan. With a ``session`` key the
+    connection and its statements stay open for the next question under that
+    key instead of being closed; it must identify the login, not just the
+    database, so nobody is handed another user's connection.
+    """
     try:
-        conn = mysql.connector.connect(
-            host=host, port=port, user=user, password=password, database=dbname
-        )
-        cur = conn.cursor()
-        cur.execute(sql)
-        if sql.strip().lower().startswith("select"):
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
-            df = pd.DataFrame(rows, columns=columns)
-            result = df.to_markdown(index=False)
+        if session is not None:
+            statements = session_for(session, connect, dialect)
         else:
-            conn.commit()
-            result = f"Query executed successfully. Rows affected: {cur.rowcount}"
-        cur.close()
-        conn.close()
-        return result, None
+            statements = PreparedStatements(connect(), dialect)
     except Exception as e:
-        return None, str(e)
+        return nl_to_sql(nl_query), None, str(e), None
+    conn = statements.conn
+    after = token_after(token, nl_query)
+    failed = False
+    try:
+        # A session's connection is shared between the app's worker threads
+        with statements:
+            try:
+                catalog = catalog_for(conn, dialect, key=key)
+            except Exception:
+                catalog = None
+                failed = True
+            if catalog is not None and not catalog.tables:
+                catalog = None
+            values = None
+            if catalog is not None:
+                try:
+                    values = values_for(conn, catalog, dialect, key=key,
+                                        connect=connect if background_refresh else None)
+                except Exception:
+                    values = None
+                    failed = True
+            (template, params), page_key = nl_to_sql_page(nl_query, PAGE_SIZE, after, statements.placeholder,
+                                                           catalog=catalog, values=values)
+            # Shown with its values written in; run bound
+            sql = inline(template, params, statements.placeholder)
+            impossible = impossible_filters(nl_query, catalog, values)
+            if impossible:
+                shown = ", ".join(f"{column} = '{value}'" for column, value in impossible)
+                return sql, f"No rows can match {shown}: no such value in the database. The query was not run.", None, None
+            try:
+                columns, rows, rowcount = statements.run(template, params, max_rows=MAX_ROWS)
+            except Exception as e:
+                failed = True
+                return sql, None, str(e), None
+            next_token = None
+            name = page_key.rpartition(".")[2] if page_key else None
+            if name in (columns or ()) and len(rows) == PAGE_SIZE:
+                next_token = page_token(nl_query, rows[-1][columns.index(name)])
+            result = _show(columns, rows, rowcount, None if page_key else PAGE_SIZE)
+            if next_token:
+                result += f"\n\n(Rows after {name} {rows[-1][columns.index(name)]} on the next page)"
+            return sql, result, None, next_token
+    finally:
+        if session is None:
+            statements.close()
+        elif failed:
+            # A failed statement can leave the connection mid-transaction or
+            # gone; the next question opens a fresh one
+            drop_session(session)
 
 def run_query_on_mongodb(connection_string, database_name, collection_name, nl_query):
     if not pymongo:
@@ -116,45 +206,61 @@ def run_query_on_mongodb(connection_string, database_name, collection_name, nl_q
     except Exception as e:
         return None, str(e)
 
-def process_query(nl_query, db_type, sqlite_file, pg_host, pg_port, pg_user, pg_pass, pg_db, mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db, mongo_conn, mongo_db, mongo_collection):
-    sql = nl_to_sql(nl_query)
-    
+def _login(password):
+    """Stands in for a password in session keys, which live as long as the process."""
+    return hashlib.sha256(str(password).encode("utf-8")).hexdigest()
+
+def process_query(nl_query, db_type, sqlite_file, pg_host, pg_port, pg_user, pg_pass, pg_db, mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db, mongo_conn, mongo_db, mongo_collection, next_page=None):
+    """(sql, result, token for the next page or None) for the question on the chosen database."""
     if db_type == "Demo (built-in schema)":
-        return sql, "[Demo mode: No live database connected. SQL generated only.]"
+        return nl_to_sql(nl_query), "[Demo mode: No live database connected. SQL generated only.]", None
     elif db_type == "SQLite (upload .db)":
         if sqlite_file is None:
-            return sql, "Please upload a SQLite .db file."
+            return nl_to_sql(nl_query), "Please upload a SQLite .db file.", None
         temp_path = "temp_uploaded.db"
         with open(temp_path, "wb") as f:
             f.write(sqlite_file.read())
-        result, error = run_sql_on_sqlite(temp_path, sql)
+        # The upload is deleted right after, so values can't be refreshed later
+        sql, result, error, token = translate_and_run(
+            nl_query, lambda: connect_sqlite(temp_path), key=("sqlite-upload", sqlite_file.name),
+            background_refresh=False, token=next_page,
+        )
         os.remove(temp_path)
         if error:
-            return sql, f"❌ Error executing SQL on SQLite:\n{error}"
-        return sql, result
+            return sql, f"❌ Error executing SQL on SQLite:\n{error}", None
+        return sql, result, token
     elif db_type == "PostgreSQL":
         if not all([pg_host, pg_port, pg_user, pg_pass, pg_db]):
-            return sql, "Please provide all PostgreSQL connection details."
-        result, error = run_sql_on_postgres(pg_host, pg_port, pg_user, pg_pass, pg_db, sql)
+            return nl_to_sql(nl_query), "Please provide all PostgreSQL connection details.", None
+        sql, result, error, token = translate_and_run(
+            nl_query, lambda: connect_postgres(pg_host, pg_port, pg_user, pg_pass, pg_db),
+            key=("postgresql", pg_host, pg_port, pg_db), dialect="postgresql",
+            session=("postgresql", pg_host, pg_port, pg_db, pg_user, _login(pg_pass)), token=next_page,
+        )
         if error:
-            return sql, f"❌ Error executing SQL on PostgreSQL:\n{error}"
-        return sql, result
+            return sql, f"❌ Error executing SQL on PostgreSQL:\n{error}", None
+        return sql, result, token
     elif db_type == "MySQL":
         if not all([mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db]):
-            return sql, "Please provide all MySQL connection details."
-        result, error = run_sql_on_mysql(mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db, sql)
+            return nl_to_sql(nl_query), "Please provide all MySQL connection details.", None
+        sql, result, error, token = translate_and_run(
+            nl_query, lambda: connect_mysql(mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db),
+            key=("mysql", mysql_host, mysql_port, mysql_db), dialect="mysql",
+            session=("mysql", mysql_host, mysql_port, mysql_db, mysql_user, _login(mysql_pass)), token=next_page,
+        )
         if error:
-            return sql, f"❌ Error executing SQL on MySQL:\n{error}"
-        return sql, result
+            return sql, f"❌ Error executing SQL on MySQL:\n{error}", None
+        return sql, result, token
     elif db_type == "MongoDB":
+        sql = nl_to_sql(nl_query)
         if not all([mongo_conn, mongo_db, mongo_collection]):
-            return sql, "Please provide all MongoDB connection details."
+            return sql, "Please provide all MongoDB connection details.", None
         result, error = run_query_on_mongodb(mongo_conn, mongo_db, mongo_collection, nl_query)
         if error:
-            return sql, f"❌ Error executing query on MongoDB:\n{error}"
-        return sql, result
+            return sql, f"❌ Error executing query on MongoDB:\n{error}", None
+        return sql, result, None
     else:
-        return sql, "Unknown database type."
+        return nl_to_sql(nl_query), "Unknown database type.", None
 
 examples = [
     ["Show all employees"],
@@ -576,6 +682,10 @@ with gr.Blocks(
 
     with gr.Row():
         submit_btn = gr.Button("Run Query", variant="primary")
+        next_btn = gr.Button("Next page")
+
+    # Where the next page of the last question starts
+    next_page = gr.State(None)
 
     output_sql = gr.Textbox(
         label="Generated SQL:",
@@ -595,10 +705,16 @@ with gr.Blocks(
 </div>
 """)
 
+    query_inputs = [input_text, db_type, sqlite_file, pg_host, pg_port, pg_user, pg_pass, pg_db, mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db, mongo_conn, mongo_db, mongo_collection]
     submit_btn.click(
         fn=process_query,
-        inputs=[input_text, db_type, sqlite_file, pg_host, pg_port, pg_user, pg_pass, pg_db, mysql_host, mysql_port, mysql_user, mysql_pass, mysql_db, mongo_conn, mongo_db, mongo_collection],
-        outputs=[output_sql, output_result]
+        inputs=query_inputs,
+        outputs=[output_sql, output_result, next_page]
+    )
+    next_btn.click(
+        fn=process_query,
+        inputs=query_inputs + [next_page],
+        outputs=[output_sql, output_result, next_page]
     )
 
 demo.launch()
\ No newline at end of file
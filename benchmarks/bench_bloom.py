@@ -0,0 +1,44 @@
+"""
+Bloom filter footprint, false-positive rate and probe cost per column size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_bloom
+
+Builds a filter over 10k, 100k and 1M distinct synthetic values at 1% and
+0.1% target false-positive rates, then probes 100k values that were never
+added. Reports the filter's size next to a Python set of the same values,
+the measured false-positive rate, build time and microseconds per probe.
+"""
+
+import sys
+import time
+
+from schema_mapper.bloom import BloomFilter
+
+SIZES = [10_000, 100_000, 1_000_000]
+RATES = [0.01, 0.001]
+PROBES = 100_000
+
+
+def main():
+    print(f"{'values':>9} {'target':>7} {'bloom KB':>9} {'set KB':>8} {'measured':>9} "
+          f"{'build ms':>9} {'probe us':>9}")
+    for size in SIZES:
+        values = [f"customer-{i}@example.com" for i in range(size)]
+        as_set = set(values)
+        set_kb = (sys.getsizeof(as_set) + sum(sys.getsizeof(value) for value in values)) / 1024
+        absent = [f"visitor-{i}@example.com" for i in range(PROBES)]
+        for rate in RATES:
+            start = time.perf_counter()
+            bloom = BloomFilter.from_items(values, size, rate)
+            build = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            false_positives = sum(value in bloom for value in absent)
+            probe = (time.perf_counter() - start) / PROBES * 1e6
+            print(f"{size:>9} {rate:>7.1%} {bloom.nbytes / 1024:>9.0f} {set_kb:>8.0f} "
+                  f"{false_positives / PROBES:>9.3%} {build:>9.0f} {probe:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
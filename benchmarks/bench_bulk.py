@@ -0,0 +1,80 @@
+"""
+Throughput of bulk translation by worker count.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_bulk [num_queries]
+
+Builds a corpus of questions with varied literals (so most of them are new
+strings, as in a real backfill) and streams it through translate_bulk with
+1, 2, 4, ... processes up to the CPU count, reporting queries per second and
+the speed-up over a single process.
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+import pipeline
+from bulk import translate_bulk
+
+SHAPES = [
+    "Show all employees",
+    "Show employees earning more than 70000",
+    "Show employees in London who are older than 25 and earn more than 50000",
+    "Show departments with average salary > 50000",
+    "Show departments with more than 2 employees",
+    "Top 3 employees by salary",
+    "Show employees who joined after 2020-01-01",
+    "Insert a new employee named Alice with salary 55000, age 28, from London",
+    "Update salary to 75000 for employees in marketing",
+    "Delete employees younger than 25",
+    "Show employees who earn between 40000 and 80000",
+    "Rank employees by salary",
+]
+CITIES = ["London", "Paris", "Tokyo", "Berlin", "Delhi"]
+
+
+def build_corpus(size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+
+    def renumber(match):
+        digits = len(match.group())
+        return str(rng.randint(10 ** (digits - 1), 10 ** digits - 1))
+
+    corpus = []
+    for _ in range(size):
+        query = re.sub(r"(?<![\d-])\d+(?![\d-])", renumber, rng.choice(SHAPES))
+        corpus.append(query.replace("London", rng.choice(CITIES)))
+    return corpus
+
+
+def worker_counts() -> list:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main(size: int = 20000):
+    corpus = build_corpus(size)
+    print(f"{size} queries, {os.cpu_count()} CPUs\n")
+    print(f"{'workers':>8} {'queries/s':>12} {'speed-up':>9}")
+    baseline = None
+    for processes in worker_counts():
+        # Every run starts cold, like a fresh backfill job
+        pipeline.configure_cache()
+        start = time.perf_counter()
+        errors = sum(1 for result in translate_bulk(corpus, processes=processes) if result["error"])
+        rate = size / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"{processes:>8} {rate:>12.0f} {rate / baseline:>8.2f}x" + (f"  ({errors} errors)" if errors else ""))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,67 @@
+"""
+"Departments with more than N employees": the correlated COUNT(*)
+subquery vs the decorrelated join on pre-aggregated counts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_decorrelate
+
+Builds in-memory SQLite databases of 200 departments and 10k, 100k and
+500k employees, with and without an index on ``employees.department_id``,
+then runs the statement ``build_statement`` describes as it is and after
+``optimizer.optimize``. Reports milliseconds per query for each and whether
+both return the same departments.
+"""
+
+import random
+import sqlite3
+import time
+
+from query_generator.generator import build_statement
+from query_generator.optimizer import optimize
+from query_generator.sql_ast import render
+
+DEPARTMENTS = 200
+SIZES = [10000, 100000, 500000]
+SUBQUERIES = [{"type": "count", "operator": "more than", "value": 400, "table": "employees"}]
+
+
+def company(employees: int, rng: random.Random, indexed: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, location TEXT, budget INTEGER)")
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, salary INTEGER, department_id INTEGER)")
+    conn.executemany("INSERT INTO departments VALUES (?, ?, ?, ?)",
+                     [(i, f"dept {i}", "Oslo", 100000) for i in range(DEPARTMENTS)])
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?)",
+                     ((i, f"emp {i}", 50000, int(rng.paretovariate(1.1)) % DEPARTMENTS) for i in range(employees)))
+    if indexed:
+        conn.execute("CREATE INDEX employees_department ON employees (department_id)")
+    return conn
+
+
+def _timed(conn, sql: str, rounds: int = 3):
+    best, rows = float("inf"), None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, sorted(rows)
+
+
+def main():
+    rng = random.Random(17)
+    statement = build_statement("SELECT", ["employees"], [], subqueries=SUBQUERIES)
+    correlated, decorrelated = render(statement), render(optimize(statement))
+    print(f"{'employees':>10} {'index':>6} {'correlated ms':>14} {'join ms':>8} {'rows':>5} {'same':>5}")
+    for size in SIZES:
+        for indexed in (False, True):
+            conn = company(size, rng, indexed)
+            slow, expected = _timed(conn, correlated, rounds=1)
+            fast, found = _timed(conn, decorrelated)
+            print(f"{size:>10} {'yes' if indexed else 'no':>6} {slow:>14.1f} {fast:>8.1f} {len(found):>5} "
+                  f"{'yes' if found == expected else 'NO':>5}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
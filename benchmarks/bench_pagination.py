@@ -0,0 +1,58 @@
+"""
+Deep pages: LIMIT/OFFSET vs keyset pagination.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pagination
+
+Fills an in-memory SQLite employees table with 500k rows, then fetches one
+page of ``PAGE`` rows starting at several depths, as "Show employees in
+Oslo" pages: with ``LIMIT n OFFSET depth`` and with the statement
+``nl_to_sql_page`` writes (``WHERE id > last ORDER BY id LIMIT n``).
+Reports milliseconds per page for each and whether both return the same
+rows.
+"""
+
+import sqlite3
+import time
+
+from pipeline import nl_to_sql, nl_to_sql_page
+from schema_mapper.introspection import introspect
+
+ROWS = 500000
+PAGE = 100
+DEPTHS = [0, 10000, 100000, 250000]
+QUERY = "Show employees older than 30"
+
+
+def _timed(conn, sql: str, params=(), rounds: int = 3):
+    best, rows = float("inf"), None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, salary INTEGER, city TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)",
+                     ((i, f"emp {i}", 40000 + i % 50000, "Oslo" if i % 2 else "Lima", 20 + i % 40)
+                      for i in range(1, ROWS + 1)))
+    catalog = introspect(conn)
+    unbounded = nl_to_sql(QUERY, catalog=catalog).rstrip(";")
+    # Where each depth's page starts: the key of the row just before it
+    keys = [row[0] for row in conn.execute("SELECT id FROM employees WHERE age > 30 ORDER BY id")]
+
+    print(f"{'depth':>8} {'offset ms':>10} {'keyset ms':>10} {'same':>5}")
+    for depth in DEPTHS:
+        offset_ms, expected = _timed(conn, f"{unbounded} ORDER BY employees.id LIMIT {PAGE} OFFSET {depth}")
+        (sql, params), _ = nl_to_sql_page(QUERY, PAGE, keys[depth - 1] if depth else None, "?", catalog=catalog)
+        keyset_ms, found = _timed(conn, sql, params)
+        same = [row[:len(expected[0])] for row in found] == expected
+        print(f"{depth:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f} {'yes' if same else 'NO':>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Micro-benchmark for the compiled parser pattern families.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parser
+
+It compares the old "loop over a list and call re.search" scan against a
+PatternFamily on synthetic families of growing size, measures how much of
+the family scanning the trigger prefilter skips on simple queries, then
+times ParserAgent.parse over a small query corpus.
+"""
+
+import contextlib
+import io
+import re
+import time
+
+from parser_agent import parser
+from parser_agent.parser import ParserAgent
+from parser_agent.patterns import PatternFamily
+
+CORPUS = [
+    "Show all employees",
+    "Show employees earning more than 70000",
+    "Show employees in New York who are older than 25 and earn more than 50000",
+    "Show departments with average salary > 50000",
+    "Show employees who earn more than average",
+    "Rank employees by salary",
+    "Top 3 employees by salary",
+    "Show employees with rollup",
+    "Insert a new employee named Alice with salary 55000, age 28, from London",
+    "Delete employees younger than 25",
+]
+
+FAMILY_SIZES = [10, 50, 200, 1000]
+
+WORDS = ["rank", "group", "total", "summary", "cube", "rollup", "dense", "top",
+         "bottom", "average", "count", "senior", "budget", "window", "grouping"]
+
+
+def _timeit(fn, repeat=5, number=200):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _synthetic_patterns(size):
+    # Same shape as the real families; the numeric suffix keeps any from matching
+    patterns = []
+    for i in range(size):
+        first = WORDS[i % len(WORDS)]
+        second = WORDS[(i * 7 + 3) % len(WORDS)]
+        patterns.append(rf"{first}\s+{second}{i}\s+by\s+(\w+)")
+    return patterns
+
+
+def bench_family_scaling():
+    print("Family scan (no match, worst case), microseconds per query")
+    print(f"{'patterns':>10} {'re.search loop':>16} {'PatternFamily':>15} {'speedup':>9}")
+    query = CORPUS[2].lower()
+    for size in FAMILY_SIZES:
+        patterns = _synthetic_patterns(size)
+        family = PatternFamily("synthetic", patterns)
+
+        def legacy():
+            for pattern in patterns:
+                if re.search(pattern, query):
+                    break
+
+        loop_time = _timeit(legacy, number=50)
+        family_time = _timeit(lambda: family.search(query), number=50)
+        print(f"{size:>10} {loop_time * 1e6:>16.1f} {family_time * 1e6:>15.1f} {loop_time / family_time:>8.1f}x")
+
+
+SIMPLE_QUERIES = [
+    "show employees in new york",
+    "show employees older than 30",
+    "delete employees younger than 25",
+    "show names of employees",
+]
+
+FAMILIES = [
+    parser.GROUP_BY_PATTERNS,
+    parser.HAVING_PATTERNS,
+    parser.SUBQUERY_PATTERNS,
+    parser.WINDOW_PATTERNS,
+    parser.CTE_PATTERNS,
+    parser.ADVANCED_AGG_PATTERNS,
+    parser.JOIN_PATTERNS,
+]
+
+
+def bench_prefilter():
+    def scan_all():
+        for query in SIMPLE_QUERIES:
+            for family in FAMILIES:
+                family.search(query)
+
+    def scan_triggered():
+        for query in SIMPLE_QUERIES:
+            stages = parser.STAGE_TRIGGERS.scan(query)
+            for family in FAMILIES:
+                if family.name in stages:
+                    family.search(query)
+
+    all_time = _timeit(scan_all) / len(SIMPLE_QUERIES)
+    triggered_time = _timeit(scan_triggered) / len(SIMPLE_QUERIES)
+    print(f"\nSimple queries, all families:       {all_time * 1e6:.1f} microseconds per query")
+    print(f"Simple queries, trigger prefilter:  {triggered_time * 1e6:.1f} microseconds per query")
+
+
+def bench_parse():
+    agent = ParserAgent()
+    queries = [q.lower() for q in CORPUS]
+
+    def parse_all():
+        for query in queries:
+            agent.parse(query)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_query = _timeit(parse_all, number=20) / len(queries)
+    print(f"\nParserAgent.parse: {per_query * 1e6:.1f} microseconds per query over {len(queries)} queries")
+
+
+if __name__ == "__main__":
+    bench_family_scaling()
+    bench_prefilter()
+    bench_parse()
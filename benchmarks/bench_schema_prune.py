@@ -0,0 +1,93 @@
+"""
+Table ranking on wide schemas: scoring and sorting every table vs pruning
+to the tables the matched columns point at and keeping the top k.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_schema_prune
+
+Builds synthetic schemas of 1k, 10k and 100k columns (ten per table), then
+maps noun lists drawn from their column names. Reports microseconds per
+ranking for the old full sort and for ``rank_tables`` with the mapper's
+limit, and per ``map_to_schema`` call (noun matching included, warm memo)
+for both. Both rankings agree on the top ``MAX_TABLES`` tables; the
+"agreement" column checks that.
+"""
+
+import random
+import time
+
+from benchmarks.bench_schema_match import PARTS
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import MAX_TABLES, map_to_schema
+
+SIZES = [1000, 10000, 100000]
+COLUMNS_PER_TABLE = 10
+
+
+def synthetic_schema(columns: int, rng: random.Random) -> dict:
+    schema = {}
+    for i in range(columns // COLUMNS_PER_TABLE):
+        table = f"{rng.choice(PARTS)}_{rng.choice(PARTS)}_{i}"
+        names = {"id"}
+        while len(names) < COLUMNS_PER_TABLE:
+            names.add("_".join(rng.sample(PARTS, rng.randint(1, 2))))
+        schema[table] = sorted(names)
+    return schema
+
+
+def full_sort(catalog: SchemaCatalog, columns, preferred=None, mentioned=()):
+    """The ranking before pruning: score every table, sort them all."""
+    scores = dict.fromkeys(catalog.tables, 0)
+    for table in mentioned:
+        if table in scores:
+            scores[table] += 1
+    for column in columns:
+        for table in catalog.column_tables.get(column, ()):
+            scores[table] += 1
+    if preferred in scores:
+        scores[preferred] += 2
+    return sorted(scores, key=lambda table: -scores[table])
+
+
+def _per_call(fn, cases) -> float:
+    start = time.perf_counter()
+    for case in cases:
+        fn(case)
+    return (time.perf_counter() - start) / len(cases) * 1e6
+
+
+def main():
+    rng = random.Random(5)
+    print(f"{'columns':>8} {'tables':>7} {'sort us':>8} {'top-k us':>9} "
+          f"{'map full us':>12} {'map top-k us':>13} {'agreement':>10}")
+    for size in SIZES:
+        schema = synthetic_schema(size, rng)
+        catalog = SchemaCatalog.from_schema(schema)
+        names = sorted({column for columns in schema.values() for column in columns if column != "id"})
+        cases = []
+        for _ in range(200):
+            nouns = rng.sample(names, rng.randint(1, 3))
+            preferred = rng.choice(catalog.tables)
+            cases.append((nouns, {"table": preferred, "filters": {}}))
+        for nouns, parsed in cases:
+            map_to_schema(nouns, parsed, catalog)
+
+        ranked = []
+        for nouns, parsed in cases:
+            columns = [column for noun in nouns for column in catalog.match_noun(noun)[1]]
+            ranked.append((columns, parsed["table"]))
+        sort_us = _per_call(lambda case: full_sort(catalog, case[0], case[1]), ranked)
+        top_us = _per_call(lambda case: catalog.rank_tables(case[0], case[1], limit=MAX_TABLES), ranked)
+        map_full = _per_call(lambda case: map_to_schema(case[0], case[1], catalog, max_tables=None), cases)
+        map_top = _per_call(lambda case: map_to_schema(case[0], case[1], catalog), cases)
+        agree = sum(
+            full_sort(catalog, columns, preferred)[:MAX_TABLES] == catalog.rank_tables(columns, preferred, limit=MAX_TABLES)
+            for columns, preferred in ranked
+        ) / len(ranked)
+        print(f"{size:>8} {len(catalog.tables):>7} {sort_us:>8.0f} {top_us:>9.0f} "
+              f"{map_full:>12.0f} {map_top:>13.0f} {agree:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Cold start: building a schema catalog vs loading it from a snapshot.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_snapshot
+
+For synthetic schemas of 1k, 10k and 100k columns, reports milliseconds to
+build the catalog and its match indexes from scratch, to load the snapshot
+(catalog state only), and for the first fuzzy lookup after loading, which
+pulls the indexes out of the memory-mapped file. Also prints snapshot size.
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_schema_match import PARTS
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import display_names, normalization_map
+from schema_mapper.snapshot import load_snapshot, save_snapshot
+
+SIZES = [1000, 10000, 100000]
+COLUMNS_PER_TABLE = 50
+
+
+def synthetic_schema(size: int, rng: random.Random) -> dict:
+    # Names repeat across tables, as they do in real warehouses
+    columns = ["_".join(rng.sample(PARTS, rng.randint(1, 3))) for _ in range(size)]
+    return {
+        f"table_{start // COLUMNS_PER_TABLE}": columns[start:start + COLUMNS_PER_TABLE]
+        for start in range(0, len(columns), COLUMNS_PER_TABLE)
+    }
+
+
+def _ms(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    rng = random.Random(5)
+    path = os.path.join(tempfile.mkdtemp(), "schema_snapshot.bin")
+    print(f"{'columns':>8} {'build ms':>9} {'load ms':>8} {'1st match ms':>13} {'size KB':>8}")
+    for size in SIZES:
+        schema = synthetic_schema(size, rng)
+
+        def build():
+            catalog = SchemaCatalog.from_schema(schema, normalization_map, display_names)
+            catalog.match_noun("order_total")
+            return catalog
+
+        catalog, build_ms = _ms(build)
+        save_snapshot(catalog, path, "bench")
+        loaded, load_ms = _ms(lambda: load_snapshot(path, "bench"))
+        _, match_ms = _ms(lambda: loaded.match_noun("order_total"))
+        assert loaded.match_noun("order_total") == catalog.match_noun("order_total")
+        print(f"{size:>8} {build_ms:>9.1f} {load_ms:>8.1f} {match_ms:>13.1f} {os.path.getsize(path) / 1024:>8.0f}")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+SQL generation: the old f-string generator vs the syntax tree and renderer.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sql_ast
+
+Parses and maps a corpus of questions once, with each literal-bearing
+question repeated over a range of numbers so most parses are distinct, then
+times SQL generation alone. Reports microseconds per call for:
+
+* string: the generator before the syntax tree (benchmarks/string_generator.py)
+* tree: ``generate_sql``, building and rendering a statement every call
+* memoized: ``generate_sql_for`` as the pipeline calls it, over a stream in
+  which each parse comes back ``REPEATS`` times (rephrased questions, batch
+  jobs, template-cache hits with the same literals)
+
+and how many of the corpus' statements are identical between the two
+generators.
+"""
+
+import contextlib
+import io
+import time
+
+from benchmarks import string_generator
+from pipeline import _prepare
+from query_generator import generator
+from query_generator.generator import generate_sql, generate_sql_for
+
+QUESTIONS = [
+    "Show all employees",
+    "Show employees earning more than {n}",
+    "Show employees in New York who are older than {age} and earn more than {n}",
+    "Show departments with average salary > {n}",
+    "Show employees who earn more than average",
+    "Rank employees by salary",
+    "Top {k} employees by salary",
+    "Delete employees younger than {age}",
+    "Show employees with salary between {n} and {m}",
+    "group employees by city and show count",
+    "Show departments with more than {k} employees",
+    "Show employees who joined after 2020-01-01",
+]
+VARIANTS = 40
+REPEATS = 10
+
+
+def _arguments(intent, parsed, mapping):
+    filters = mapping.filters
+    if parsed.function is not None:
+        filters = {**filters, "function": parsed.function}
+    return (intent, mapping.tables, mapping.columns, filters, parsed.joins, parsed.group_by, parsed.having,
+            parsed.subqueries, parsed.window_functions, parsed.ctes, parsed.advanced_aggregations)
+
+
+def _per_call(fn, cases, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for case in cases:
+            fn(*case)
+        best = min(best, (time.perf_counter() - start) / len(cases))
+    return best * 1e6
+
+
+def main():
+    prepared = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for question in QUESTIONS:
+            for i in range(VARIANTS if "{" in question else 1):
+                text = question.format(n=40000 + 250 * i, m=90000 + 250 * i, age=20 + i, k=2 + i)
+                prepared.append(_prepare(text, None, None))
+    cases = [_arguments(*case) for case in prepared]
+
+    string_us = _per_call(string_generator.generate_sql, cases)
+    tree_us = _per_call(generate_sql, cases)
+    stream = [case for case in prepared for _ in range(REPEATS)]
+    generator.clear_cache()
+    memo_us = _per_call(generate_sql_for, stream, rounds=1)
+    same = sum(string_generator.generate_sql(*case) == generate_sql(*case) for case in cases)
+
+    print(f"{'statements':>10} {'string us':>10} {'tree us':>8} {'memoized us':>12} {'identical':>10}")
+    print(f"{len(cases):>10} {string_us:>10.2f} {tree_us:>8.2f} {memo_us:>12.2f} {same / len(cases):>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Misspelled schema terms: difflib vs the trigram index vs SymSpell.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_symspell
+
+Takes the bundled schema plus synthetic warehouses of 1k and 10k column
+names, misspells random terms with one or two edits (deletion, insertion,
+substitution, adjacent transposition), and looks each one up with the
+mapper's settings. Reports microseconds per lookup and top-1 recall (how
+often the first match is the term that was misspelled) for each matcher, and
+for the mapper's path: SymSpell first, the trigram index when it finds nothing.
+"""
+
+import difflib
+import random
+import string
+import time
+
+from benchmarks.bench_schema_match import synthetic_columns
+from schema_mapper.ngram_index import TrigramIndex
+from schema_mapper.schema import SCHEMA
+from schema_mapper.symspell import SymSpellIndex
+
+SIZES = [1000, 10000]
+LETTERS = string.ascii_lowercase
+
+
+def misspell(word: str, edits: int, rng: random.Random) -> str:
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        kind = rng.randrange(4)
+        if kind == 0 and len(word) > 3:
+            word = word[:i] + word[i + 1:]
+        elif kind == 1:
+            word = word[:i] + rng.choice(LETTERS) + word[i:]
+        elif kind == 2:
+            word = word[:i] + rng.choice(LETTERS) + word[i + 1:]
+        elif i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def corpus(terms: list, rng: random.Random, count: int = 300) -> list:
+    pairs = []
+    while len(pairs) < count:
+        term = rng.choice(terms)
+        # Short words only get one edit; two would make them other words
+        typo = misspell(term, 1 if len(term) < 6 else rng.randint(1, 2), rng)
+        if typo != term:
+            pairs.append((typo, term))
+    return pairs
+
+
+def measure(lookup, pairs):
+    start = time.perf_counter()
+    results = [lookup(typo) for typo, _ in pairs]
+    elapsed = (time.perf_counter() - start) / len(pairs) * 1e6
+    recall = sum(result[:1] == [term] for result, (_, term) in zip(results, pairs)) / len(pairs)
+    return elapsed, recall
+
+
+def main():
+    rng = random.Random(3)
+    vocabularies = [("bundled", sorted({column for columns in SCHEMA.values() for column in columns}))]
+    vocabularies += [(str(size), synthetic_columns(size, rng)) for size in SIZES]
+
+    print(f"{'terms':>8} {'difflib us':>11} {'recall':>7} {'trigram us':>11} {'recall':>7} "
+          f"{'symspell us':>12} {'recall':>7} {'mapper us':>10} {'recall':>7} {'build ms':>9}")
+    for name, terms in vocabularies:
+        pairs = corpus(terms, rng)
+        trigram = TrigramIndex(terms)
+        start = time.perf_counter()
+        spelling = SymSpellIndex(terms)
+        build = (time.perf_counter() - start) * 1000
+        slow = measure(lambda word: difflib.get_close_matches(word, terms, n=2, cutoff=0.6), pairs)
+        index = measure(lambda word: trigram.get_close_matches(word, n=2, cutoff=0.6), pairs)
+        fast = measure(lambda word: spelling.lookup(word, n=2), pairs)
+        both = measure(lambda word: spelling.lookup(word, n=2) or trigram.get_close_matches(word, n=2, cutoff=0.6), pairs)
+        print(f"{name:>8} {slow[0]:>11.0f} {slow[1]:>7.1%} {index[0]:>11.0f} {index[1]:>7.1%} "
+              f"{fast[0]:>12.0f} {fast[1]:>7.1%} {both[0]:>10.0f} {both[1]:>7.1%} {build:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
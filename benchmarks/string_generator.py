@@ -0,0 +1,352 @@
+"""
+generate_sql as it was before the SQL syntax tree: each statement appended
+as f-strings. Kept only so benchmarks.bench_sql_ast can compare against it.
+"""
+
+import tracing
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import DEFAULT_CATALOG
+from schema_mapper.value_index import DEFAULT_VALUES, ValueIndex
+
+# The join behind "by department" when the parser asked for none
+_DEPARTMENTS_JOIN = {"type": "INNER", "table": "departments", "on": {"left": "employees.department_id", "right": "departments.id"}}
+
+
+def _join_clause(table: str, joins, catalog: SchemaCatalog = None) -> str:
+    """
+    The JOINs to append to ``FROM table`` for the tables named in ``joins``.
+    The catalog's foreign keys decide the path (adding any tables in between)
+    and the ON columns; tables no key reaches keep the join's own condition.
+    """
+    requested = {}
+    for join in joins or ():
+        join_table = join.get("table", "")
+        join_condition = join.get("on", {})
+        if join_table and join_condition and join_condition.get("left", "") and join_condition.get("right", ""):
+            requested.setdefault(join_table, join)
+    if not requested:
+        return ""
+
+    plan = (catalog or DEFAULT_CATALOG).join_planner.plan(table, requested)
+    if plan is None:
+        return "".join(
+            f" {join.get('type', 'INNER')} JOIN {join_table} ON {join['on']['left']} = {join['on']['right']}"
+            for join_table, join in requested.items()
+        )
+    return "".join(
+        f" {requested.get(join_table, {}).get('type', 'INNER')} JOIN {join_table} ON {left} = {right}"
+        for join_table, left, right in plan
+    )
+
+
+def generate_sql(intent: str, tables: list[str], columns: list[str], filters: dict = None, joins: list = None, group_by: str = None, having: dict = None, subqueries: list = None, window_functions: list = None, ctes: list = None, advanced_aggregations: list = None, catalog: SchemaCatalog = None, values: ValueIndex = None) -> str:
+    if not tables:
+        raise ValueError("No table specified for SQL query.")
+    
+    # Generate CTEs if present
+    cte_clause = ""
+    if ctes:
+        cte_definitions = []
+        for cte in ctes:
+            if cte["type"] == "with_clause" and cte["query"]:
+                cte_definitions.append(f"{cte['name']} AS ({cte['query']})")
+            elif cte["type"] == "high_salary":
+                cte_definitions.append(f"{cte['name']} AS (SELECT * FROM employees WHERE salary > 70000)")
+            elif cte["type"] == "senior":
+                cte_definitions.append(f"{cte['name']} AS (SELECT * FROM employees WHERE age > 30)")
+            elif cte["type"] == "junior":
+                cte_definitions.append(f"{cte['name']} AS (SELECT * FROM employees WHERE age <= 30)")
+            elif cte["type"] == "department_summary":
+                cte_definitions.append(f"{cte['name']} AS (SELECT department_id, COUNT(*) as emp_count, AVG(salary) as avg_salary FROM employees GROUP BY department_id)")
+        if cte_definitions:
+            cte_clause = "WITH " + ", ".join(cte_definitions) + " "
+    
+    # Build the main query
+    table = tables[0] if tables else "employees"
+    
+    # Mapping from schema column names to display names
+    display_names = (catalog or DEFAULT_CATALOG).display_names
+    
+    # Known values (cities, positions, names) are written as the database spells them
+    values = DEFAULT_VALUES if values is None else values
+
+    if intent == "SELECT":
+        # Build column clause
+        # Work on a copy: window functions add columns, and the caller's
+        # columns may be a shared (or immutable) sequence
+        columns = list(columns) if columns else ["*"]
+        
+        # Add window functions to columns if present
+        if window_functions:
+            for window_func in window_functions:
+                if window_func["type"] == "row_number":
+                    columns.append(f"ROW_NUMBER() OVER (ORDER BY {window_func['order_by']} {window_func['order']}) as row_num")
+                elif window_func["type"] == "rank":
+                    columns.append(f"RANK() OVER (ORDER BY {window_func['order_by']} {window_func['order']}) as rank_num")
+                elif window_func["type"] == "dense_rank":
+                    columns.append(f"DENSE_RANK() OVER (ORDER BY {window_func['order_by']} {window_func['order']}) as dense_rank_num")
+        
+        col_clause = ", ".join(columns)
+        
+        # Build the FROM clause with JOINs
+        from_clause = f"FROM {table}" + _join_clause(table, joins, catalog)
+        
+        sql = f"{cte_clause}SELECT {col_clause} {from_clause}"
+        
+        where_clauses = []
+        if filters:
+            for key, condition in filters.items():
+                # Skip function key as it's not a filter condition
+                if key == "function":
+                    continue
+                if isinstance(condition, dict):
+                    for op, val in condition.items():
+                        op_map = {"gt": ">", "lt": "<", "eq": "=", "like": "LIKE"}
+                        operator = op_map.get(op, "=")
+                        display_key = display_names.get(key, key)
+                        if op == "between" and isinstance(val, (list, tuple)) and len(val) == 2:
+                            where_clauses.append(f"{display_key} BETWEEN {val[0]} AND {val[1]}")
+                        elif op == "like" and isinstance(val, str):
+                            where_clauses.append(f"{display_key} LIKE '{val}'")
+                        elif isinstance(val, str):
+                            # Apply proper case mapping
+                            proper_val = values.canonical(val, key)
+                            where_clauses.append(f"{display_key} {operator} '{proper_val}'")
+                        else:
+                            where_clauses.append(f"{display_key} {operator} {val}")
+                else:
+                    display_key = display_names.get(key, key)
+                    if isinstance(condition, str):
+                        # Apply proper case mapping
+                        proper_val = values.canonical(condition, key)
+                        where_clauses.append(f"{display_key} = '{proper_val}'")
+                    else:
+                        where_clauses.append(f"{display_key} = {condition}")
+
+        # Add subquery conditions
+        if subqueries:
+            for subquery in subqueries:
+                if subquery["type"] == "comparison" and subquery["comparison"] == "average":
+                    # Handle "more than average" or "less than average"
+                    op = ">" if subquery["operator"] == "more than" else "<"
+                    avg_subquery = f"(SELECT AVG(salary) FROM employees)"
+                    where_clauses.append(f"salary {op} {avg_subquery}")
+                elif subquery["type"] == "count":
+                    # Handle "with more than X employees"
+                    op = ">" if subquery["operator"] == "more than" else "<"
+                    count_subquery = f"(SELECT COUNT(*) FROM employees WHERE employees.department_id = departments.id)"
+                    # For count subqueries, we need to select from departments and join with employees
+                    if table == "employees":
+                        # Change the main query to select from departments
+                        sql = f"SELECT departments.* FROM departments WHERE {count_subquery} {op} {subquery['value']}"
+                    else:
+                        where_clauses.append(f"{count_subquery} {op} {subquery['value']}")
+                elif subquery["type"] == "budget":
+                    # Handle budget comparisons
+                    op = subquery["operator"]
+                    val = subquery["value"]
+                    where_clauses.append(f"budget {op} {val}")
+
+        # Add WHERE clause if we have any conditions
+        if where_clauses:
+            sql += " WHERE " + " AND ".join(where_clauses)
+        
+        # Add ORDER BY for window functions
+        if window_functions:
+            for window_func in window_functions:
+                if "order_by" in window_func:
+                    sql += f" ORDER BY {window_func['order_by']} {window_func['order']}"
+                    break
+        
+        # Add LIMIT for TOP/BOTTOM queries
+        if window_functions:
+            for window_func in window_functions:
+                if "limit" in window_func:
+                    sql += f" LIMIT {window_func['limit']}"
+                    break
+        
+        # Add GROUP BY clause
+        if group_by:
+            sql += f" GROUP BY {group_by}"
+        elif advanced_aggregations:
+            for agg in advanced_aggregations:
+                if agg["type"] == "rollup":
+                    columns_str = ", ".join(agg["columns"])
+                    sql += f" GROUP BY ROLLUP({columns_str})"
+                    if tracing.enabled:
+                        tracing.emit("generator", f"🔍 Advanced Aggregation: ROLLUP({columns_str})")
+                elif agg["type"] == "cube":
+                    columns_str = ", ".join(agg["columns"])
+                    sql += f" GROUP BY CUBE({columns_str})"
+                    if tracing.enabled:
+                        tracing.emit("generator", f"🔍 Advanced Aggregation: CUBE({columns_str})")
+                break
+        
+        # Add HAVING clause
+        if having and group_by:
+            having_col = having.get("column", "")
+            having_op = having.get("operator", ">")
+            having_val = having.get("value", 0)
+            sql += f" HAVING {having_col} {having_op} {having_val}"
+            
+    elif intent == "AGGREGATE":
+        # Get the function from the filters, default to AVG
+        func = filters.get("function", "AVG").upper() if filters else "AVG"
+        
+        # Build the FROM clause with JOINs
+        from_clause = f"FROM {table}" + _join_clause(table, joins, catalog)
+        
+        # Handle GROUP BY queries
+        if group_by:
+            # For GROUP BY, we need to include both the group column and the aggregation
+            if group_by == "departments" or group_by == "department":
+                # Join with departments table to get department names
+                from_clause = f"FROM {table}" + _join_clause(table, list(joins or ()) + [_DEPARTMENTS_JOIN], catalog)
+                if "count(*)" in columns:
+                    select_cols = ["departments.name", "COUNT(*)"]
+                else:
+                    select_cols = ["departments.name", f"{func}(employees.salary)"]
+            else:
+                if "count(*)" in columns:
+                    select_cols = [group_by, "COUNT(*)"]
+                else:
+                    select_cols = [group_by, f"{func}(salary)"]
+            col_clause = ", ".join(select_cols)
+        else:
+            # Regular aggregate query
+            if not columns:
+                columns = ["*"]
+            col_clause = ", ".join([f"{func}({col})" for col in columns])
+        
+        sql = f"{cte_clause}SELECT {col_clause} {from_clause}"
+        
+        where_clauses = []
+        if filters:
+            for key, condition in filters.items():
+                # Skip function key as it's not a filter condition
+                if key == "function":
+                    continue
+                if isinstance(condition, dict):
+                    for op, val in condition.items():
+                        op_map = {"gt": ">", "lt": "<", "eq": "="}
+                        operator = op_map.get(op, "=")
+                        display_key = display_names.get(key, key)
+                        if op == "between" and isinstance(val, (list, tuple)) and len(val) == 2:
+                            where_clauses.append(f"{display_key} BETWEEN {val[0]} AND {val[1]}")
+                        elif isinstance(val, str):
+                            where_clauses.append(f"{display_key} {operator} '{val}'")
+                        else:
+                            where_clauses.append(f"{display_key} {operator} {val}")
+                else:
+                    display_key = display_names.get(key, key)
+                    if isinstance(condition, str):
+                        # Apply proper case mapping
+                        proper_val = values.canonical(condition, key)
+                        where_clauses.append(f"{display_key} = '{proper_val}'")
+                    else:
+                        where_clauses.append(f"{display_key} = {condition}")
+
+
+        
+        # Add GROUP BY clause for aggregate queries
+        if group_by:
+            if group_by == "departments" or group_by == "department":
+                sql += " GROUP BY departments.name"
+            else:
+                sql += f" GROUP BY {group_by}"
+        elif advanced_aggregations:
+            for agg in advanced_aggregations:
+                if agg["type"] == "rollup":
+                    columns_str = ", ".join(agg["columns"])
+                    sql += f" GROUP BY ROLLUP({columns_str})"
+                    if tracing.enabled:
+                        tracing.emit("generator", f"🔍 Advanced Aggregation: ROLLUP({columns_str})")
+                elif agg["type"] == "cube":
+                    columns_str = ", ".join(agg["columns"])
+                    sql += f" GROUP BY CUBE({columns_str})"
+                    if tracing.enabled:
+                        tracing.emit("generator", f"🔍 Advanced Aggregation: CUBE({columns_str})")
+                break
+        
+        # Add HAVING clause
+        if having and group_by:
+            having_col = having.get("column", "")
+            having_op = having.get("operator", ">")
+            having_val = having.get("value", 0)
+            # For HAVING, we need to reference the aggregated column
+            if having_col == "salary":
+                having_col = f"{func}(employees.salary)"
+            sql += f" HAVING {having_col} {having_op} {having_val}"
+            
+    elif intent == "INSERT":
+        if filters:
+            cols = ", ".join(filters.keys())
+            vals = []
+            for key, v in filters.items():
+                if isinstance(v, str):
+                    # Preserve email case, apply proper case mapping to others
+                    if '@' in v:  # Email
+                        vals.append(f"'{v}'")
+                    else:
+                        proper_val = values.canonical(v, key)
+                        vals.append(f"'{proper_val}'")
+                else:
+                    vals.append(str(v))
+            vals_str = ", ".join(vals)
+            sql = f"INSERT INTO {table} ({cols}) VALUES ({vals_str})"
+        else:
+            sql = f"INSERT INTO {table} (...) VALUES (...);"
+    elif intent == "UPDATE":
+        if filters:
+            set_parts = []
+            where_parts = []
+            for key, value in filters.items():
+                display_key = display_names.get(key, key)
+                if key == "department_id":
+                    where_parts.append(f"{display_key} = '{value}'")
+                elif key == "salary":
+                    # For UPDATE, salary goes in SET clause
+                    val_str = f"'{value}'" if isinstance(value, str) else str(value)
+                    set_parts.append(f"{key} = {val_str}")
+                else:
+                    val_str = f"'{value}'" if isinstance(value, str) else str(value)
+                    set_parts.append(f"{key} = {val_str}")
+            set_clause = "SET " + ", ".join(set_parts) if set_parts else ""
+            where_clause = "WHERE " + " AND ".join(where_parts) if where_parts else ""
+            sql = f"UPDATE {table} {set_clause} {where_clause}".strip()
+        else:
+            sql = f"UPDATE {table} SET ... WHERE ...;"
+    elif intent == "DELETE":
+        sql = f"DELETE FROM {table}"
+        if filters:
+            where_clauses = []
+            for key, condition in filters.items():
+                # Skip function key as it's not a filter condition
+                if key == "function":
+                    continue
+                if isinstance(condition, dict):
+                    for op, val in condition.items():
+                        op_map = {"gt": ">", "lt": "<", "eq": "="}
+                        operator = op_map.get(op, "=")
+                        display_key = display_names.get(key, key)
+                        if op == "between" and isinstance(val, (list, tuple)) and len(val) == 2:
+                            where_clauses.append(f"{display_key} BETWEEN {val[0]} AND {val[1]}")
+                        elif isinstance(val, str):
+                            where_clauses.append(f"{display_key} {operator} '{val}'")
+                        else:
+                            where_clauses.append(f"{display_key} {operator} {val}")
+                else:
+                    display_key = display_names.get(key, key)
+                    if isinstance(condition, str):
+                        # Apply proper case mapping
+                        proper_val = values.canonical(condition, key)
+                        where_clauses.append(f"{display_key} = '{proper_val}'")
+                    else:
+                        where_clauses.append(f"{display_key} = {condition}")
+
+            if where_clauses:
+                sql += " WHERE " + " AND ".join(where_clauses)
+    else:
+        sql = "-- Unknown intent"
+
+    return sql + ";"
@@ -0,0 +1,163 @@
+"""
+Bulk translation across a process pool, for backfills too big for threads.
+
+Translation is pure-Python and CPU-bound, so ``nl_to_sql_many(workers=...)``
+is limited by the GIL. ``translate_bulk`` instead fans chunks of queries out
+to worker processes and streams the results back in input order:
+
+    for result in translate_bulk(open("questions.txt"), processes=8):
+        ...
+
+Where the platform supports it, workers are forked from this process, so
+they start with the parser's compiled patterns, the schema and any warm
+caches already in memory instead of importing and compiling them again.
+The schema's match indexes load on first use, so they are loaded here
+before forking rather than once per worker.
+
+``run_batch`` is the file-to-file driver behind ``cli.py --batch``: JSONL or
+plain lines in, one JSON result per line out.
+"""
+
+import json
+import multiprocessing
+import os
+from collections import deque
+from itertools import islice, tee
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+import pipeline
+import tracing
+from schema_mapper.mapper import DEFAULT_CATALOG
+
+
+def _chunked(queries: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(queries)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker() -> None:
+    # Trace hooks inherited from the parent (e.g. the CLI's printer) would
+    # interleave output from every worker
+    tracing.clear_hooks()
+
+
+def _translate_chunk(chunk: List[str]) -> List[Dict]:
+    return pipeline.nl_to_sql_many(chunk)
+
+
+def _pool_context():
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def translate_bulk(
+    queries: Iterable[str],
+    processes: Optional[int] = None,
+    chunksize: int = 256,
+    prefetch: int = 2,
+) -> Iterator[Dict]:
+    """
+    Yield one {"query", "sql", "error"} dict per query, in input order.
+
+    ``queries`` may be any iterable, including a file or generator; it is
+    consumed lazily. At most ``processes * prefetch`` chunks of ``chunksize``
+    queries are in flight at a time, so memory stays flat however long the
+    input is. ``processes`` defaults to the CPU count; 1 runs in-process.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    chunks = _chunked(queries, chunksize)
+
+    if processes <= 1:
+        for chunk in chunks:
+            yield from pipeline.nl_to_sql_many(chunk)
+        return
+
+    window = max(1, processes * prefetch)
+    context = _pool_context()
+    if context.get_start_method() == "fork":
+        # Forked workers share what the parent has built
+        DEFAULT_CATALOG.load_indexes()
+    with context.Pool(processes, initializer=_init_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_translate_chunk, (chunk,)))
+            if len(pending) >= window:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+# JSONL fields tried, in order, for the question text and for an id to echo back
+QUERY_FIELDS = ("query", "question", "text", "title")
+ID_FIELDS = ("id", "request_id")
+
+
+def read_queries(lines: Iterable[str], fmt: str = "auto", field: Optional[str] = None) -> Iterator[Dict]:
+    """
+    One {"line", "query"[, "id"][, "error"]} record per non-blank input line.
+
+    ``fmt`` is "lines" (each line is a question), "jsonl" (each line is a JSON
+    object) or "auto" (JSON when the line starts with "{"). ``field`` names
+    the JSON field holding the question; by default the first of
+    QUERY_FIELDS that is present is used.
+    """
+    names = (field,) if field else QUERY_FIELDS
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+        record = {"line": number, "query": text}
+        if fmt == "jsonl" or (fmt == "auto" and text.startswith("{")):
+            record["query"] = None
+            try:
+                data = json.loads(text)
+            except ValueError as e:
+                record["error"] = f"invalid JSON: {e}"
+                yield record
+                continue
+            if not isinstance(data, dict):
+                record["error"] = "expected a JSON object"
+                yield record
+                continue
+            for name in ID_FIELDS:
+                if name in data:
+                    record["id"] = data[name]
+                    break
+            record["query"] = next((data[name] for name in names if isinstance(data.get(name), str)), None)
+            if record["query"] is None:
+                record["error"] = f"no query field (looked for {', '.join(names)})"
+        yield record
+
+
+def run_batch(
+    lines: Iterable[str],
+    out: TextIO,
+    fmt: str = "auto",
+    field: Optional[str] = None,
+    processes: int = 1,
+    chunksize: int = 256,
+) -> Dict:
+    """
+    Translate every record of ``lines`` and write one JSON object per line to
+    ``out``, in input order, with the query, SQL, intent, cache source,
+    timings and error. Both sides are streamed, so memory stays flat however
+    large the input is. Returns {"total", "errors"} counts.
+    """
+    records, feed = tee(read_queries(lines, fmt, field))
+    results = translate_bulk((record["query"] for record in feed), processes=processes, chunksize=chunksize)
+    total = errors = 0
+    for record, result in zip(records, results):
+        output = dict(record)
+        output.update(result)
+        if "error" in record:
+            output.update(sql=None, intent=None, error=record["error"])
+        out.write(json.dumps(output) + "\n")
+        total += 1
+        errors += output["error"] is not None
+    return {"total": total, "errors": errors}
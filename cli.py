@@ -3,6 +3,8 @@ import readline
 import argparse
 from colorama import init, Fore, Style
 from pipeline import nl_to_sql
+from bulk import run_batch
+import tracing
 
 # Initialize colorama for cross-platform colored output
 init()
@@ -43,7 +45,39 @@ def clear_screen():
     import os
     os.system('cls' if os.name == 'nt' else 'clear')
 
+def run_batch_mode(args):
+    """Translate queries from a file or stdin, writing JSON lines to stdout."""
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    try:
+        summary = run_batch(
+            source, sys.stdout, fmt=args.format, field=args.field,
+            processes=args.workers, chunksize=args.chunksize,
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(f"Translated {summary['total']} queries, {summary['errors']} errors", file=sys.stderr)
+
 def main():
+    arg_parser = argparse.ArgumentParser(description="NaturalSQL CLI - Natural Language to SQL Converter")
+    arg_parser.add_argument("-q", "--quiet", action="store_true", help="only show the generated SQL, not each pipeline stage")
+    arg_parser.add_argument("-b", "--batch", nargs="?", const="-", metavar="FILE",
+                            help="non-interactive: translate queries from FILE (or stdin) and print one JSON result per line")
+    arg_parser.add_argument("--format", choices=["auto", "jsonl", "lines"], default="auto",
+                            help="batch input format; auto treats lines starting with '{' as JSON")
+    arg_parser.add_argument("--field", help="JSON field holding the query (default: first of query, question, text, title)")
+    arg_parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes for batch mode")
+    arg_parser.add_argument("--chunksize", type=int, default=256, help="queries per worker task in batch mode")
+    args = arg_parser.parse_args()
+
+    if args.batch:
+        # stdout carries the JSON results, so no trace output
+        run_batch_mode(args)
+        return
+
+    # The CLI shows every stage by default; servers stay quiet
+    tracing.set_verbose(not args.quiet)
+
     # Set up command history
     history_file = ".naturalsql_history"
     try:
@@ -128,6 +128,29 @@ def setup_database():
         print(f"❌ Database setup failed: {e}")
         return False
 
+def build_schema_snapshot():
+    """Snapshot the schema catalog so app restarts load it instead of rebuilding it"""
+    print("\n🧊 Building schema snapshot...")
+    
+    try:
+        from schema_mapper.mapper import BUNDLED_VERSION, SNAPSHOT_PATH, build_default_catalog
+        from schema_mapper.snapshot import read_header, save_snapshot
+        
+        header = read_header(SNAPSHOT_PATH)
+        if header and header["version"] == BUNDLED_VERSION:
+            print(f"✅ Schema snapshot up to date: {SNAPSHOT_PATH}")
+            return True
+        
+        catalog = build_default_catalog()
+        save_snapshot(catalog, SNAPSHOT_PATH, BUNDLED_VERSION)
+        print(f"✅ Schema snapshot written: {SNAPSHOT_PATH}")
+        print(f"   - {len(catalog.tables)} tables, {len(catalog.columns)} columns")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Schema snapshot failed: {e}")
+        return False
+
 def validate_system():
     """Validate the complete system"""
     print("\n🔍 Validating system...")
@@ -235,6 +258,11 @@ def main():
     # Create configuration
     create_config()
     
+    # Snapshot the schema catalog
+    if not build_schema_snapshot():
+        print("❌ Deployment failed: Schema snapshot failed")
+        return False
+    
     # Validate system
     if not validate_system():
         print("❌ Deployment failed: System validation failed")
@@ -246,6 +274,7 @@ def main():
     print("✅ Database configured")
     print("✅ System validated")
     print("✅ Configuration created")
+    print("✅ Schema snapshot built")
     print("\n🚀 To start the application:")
     print("   python app.py")
     print("\n🌐 Access the web interface at:")
@@ -0,0 +1,163 @@
+from typing import Dict, Optional, Tuple
+
+
+class FrozenDict(dict):
+    """A read-only, hashable dict; still passes ``isinstance(x, dict)``."""
+
+    __slots__ = ("_hash",)
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(frozenset(self.items()))
+            return self._hash
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+_EMPTY = FrozenDict()
+_CONTAINERS = {dict, list, tuple}
+
+
+def freeze(value):
+    """Recursively turn dicts into FrozenDicts and lists into tuples."""
+    # Most parse fields are empty or flat; skip the recursion for those
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        if not value:
+            return _EMPTY
+        return FrozenDict({
+            key: freeze(item) if type(item) in _CONTAINERS else item for key, item in value.items()
+        })
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return ()
+        return tuple([freeze(item) if type(item) in _CONTAINERS else item for item in value])
+    return value
+
+
+def thaw(value):
+    """The inverse of freeze: plain dicts and lists, e.g. for printing or JSON."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ParsedQuery:
+    """
+    The parser's result. Immutable and hashable, so it can be cached, used as
+    a cache key and shared between threads. Read-only ``parsed["filters"]`` /
+    ``parsed.get("function")`` access is kept for code written against the
+    old result dict.
+    """
+
+    __slots__ = (
+        "action", "table", "columns", "filters", "joins", "group_by", "having",
+        "subqueries", "window_functions", "ctes", "advanced_aggregations", "function",
+        "nouns", "_hash",
+    )
+    FIELDS = __slots__[:-1]
+
+    action: str
+    table: str
+    columns: Tuple[str, ...]
+    filters: FrozenDict
+    joins: tuple
+    group_by: Optional[str]
+    having: FrozenDict
+    subqueries: tuple
+    window_functions: tuple
+    ctes: tuple
+    advanced_aggregations: tuple
+    function: Optional[str]
+    nouns: Tuple[str, ...]
+
+    def __init__(self, action: str = "", table: str = "", columns=(), filters=None, joins=(), group_by=None,
+                 having=None, subqueries=(), window_functions=(), ctes=(), advanced_aggregations=(), function=None,
+                 nouns=()):
+        values = (
+            action, table, freeze(columns), freeze(filters or _EMPTY), freeze(joins), group_by,
+            freeze(having or _EMPTY), freeze(subqueries), freeze(window_functions), freeze(ctes),
+            freeze(advanced_aggregations), function, freeze(nouns),
+        )
+        setattr_ = object.__setattr__
+        for name, value in zip(self.FIELDS, values):
+            setattr_(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ParsedQuery":
+        return cls(**data)
+
+    def to_dict(self) -> Dict:
+        """The old result-dict form, with mutable copies of every value."""
+        data = {name: thaw(getattr(self, name)) for name in self.FIELDS}
+        if data["function"] is None:
+            del data["function"]
+        return data
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def _key(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedQuery):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, "_hash", hash(self._key()))
+            return self._hash
+
+    def __reduce__(self):
+        return (_rebuild_parsed_query, (self._key(),))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"ParsedQuery({fields})"
+
+    # Read-only mapping access, for callers of the old dict result
+    def __getitem__(self, key):
+        if key in self.FIELDS and not (key == "function" and self.function is None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def _rebuild_parsed_query(values):
+    return ParsedQuery(*values)
@@ -1,13 +1,153 @@
 import re
-from typing import Dict, List
+
+import tracing
+from parser_agent.parsed_query import ParsedQuery
+from parser_agent.patterns import PatternFamily, TriggerIndex
+from parser_agent.tokenizer import DATE, EMAIL, NUMBER, WORDS, tokenize
+from schema_mapper.value_index import DEFAULT_VALUES, ValueIndex
+
+# Every pattern family is compiled once at import time.  Order matters: each
+# family reports the first pattern in this order that matches the query.
+GROUP_BY_PATTERNS = PatternFamily("group_by", [
+    r"group\s+employees?\s+by\s+(\w+)",
+    r"group\s+by\s+(\w+)",
+    r"show\s+(\w+)\s+with\s+(?:average|avg|total|sum|count)\s+(\w+)",
+    r"(\w+)\s+with\s+(?:average|avg|total|sum|count)\s+(\w+)",
+    r"show\s+(\w+)\s+grouped\s+by\s+(\w+)",
+    r"(\w+)\s+grouped\s+by\s+(\w+)",
+    r"group\s+(\w+)\s+by\s+(\w+)",
+    r"show\s+(\w+)\s+and\s+their\s+(?:average|avg|total|sum|count)\s+(\w+)",
+    r"(\w+)\s+and\s+their\s+(?:average|avg|total|sum|count)\s+(\w+)",
+    r"group\s+employees?\s+by\s+(\w+)\s+and\s+show\s+count",
+    r"show\s+employee\s+count\s+by\s+(\w+)",
+    r"count\s+employees?\s+by\s+(\w+)",
+    r"(\w+)\s+count\s+by\s+(\w+)",
+    r"show\s+(\w+)\s+count\s+by\s+(\w+)"
+])
+
+HAVING_PATTERNS = PatternFamily("having", [
+    r"(?:average|avg|total|sum|count)\s+(\w+)\s*(>|<|=|>=|<=)\s*(\d+)",
+    r"(\w+)\s*(>|<|=|>=|<=)\s*(\d+)",
+    r"with\s+(?:average|avg|total|sum|count)\s+(\w+)\s*(>|<|=|>=|<=)\s*(\d+)"
+])
+
+SUBQUERY_PATTERNS = PatternFamily("subquery", [
+    r"who\s+earn\s+more\s+than\s+average",
+    r"who\s+earn\s+less\s+than\s+average",
+    r"with\s+more\s+than\s+(\d+)\s+employees?",
+    r"with\s+less\s+than\s+(\d+)\s+employees?",
+    r"in\s+departments?\s+with\s+high\s+budgets?",
+    r"in\s+departments?\s+with\s+low\s+budgets?",
+    r"who\s+earn\s+more\s+than\s+(\w+)\s+(\w+)",
+    r"who\s+earn\s+less\s+than\s+(\w+)\s+(\w+)",
+    r"departments?\s+with\s+budget\s+(>|<|=|>=|<=)\s*(\d+)",
+    r"employees?\s+in\s+departments?\s+with\s+(\w+)\s+(>|<|=|>=|<=)\s*(\d+)",
+    r"departments?\s+with\s+more\s+than\s+(\d+)\s+employees?",
+    r"departments?\s+with\s+less\s+than\s+(\d+)\s+employees?"
+])
+
+WINDOW_PATTERNS = PatternFamily("window", [
+    r"show\s+employees?\s+with\s+row\s+numbers?",
+    r"show\s+row\s+numbers?",
+    r"add\s+row\s+numbers?",
+    r"list\s+employees?\s+with\s+row\s+numbers?",
+    r"with\s+row\s+numbers?",
+    r"dense\s+rank\s+by\s+(\w+)",
+    r"rank\s+employees?\s+by\s+salary\s+desc",
+    r"rank\s+employees?\s+by\s+salary\s+asc",
+    r"rank\s+employees?\s+by\s+(\w+)",
+    r"rank\s+by\s+(\w+)",
+    r"show\s+employees?\s+with\s+rank",
+    r"top\s+(\d+)\s+employees?\s+by\s+(\w+)",
+    r"bottom\s+(\d+)\s+employees?\s+by\s+(\w+)",
+    r"rank\s+departments?\s+by\s+(\w+)",
+    r"show\s+ranked\s+(\w+)",
+    r"employees?\s+ranked\s+by\s+(\w+)",
+    r"with\s+rank"
+])
+
+CTE_PATTERNS = PatternFamily("cte", [
+    r"with\s+(\w+)\s+as\s+\((.+?)\)",
+    r"using\s+cte",
+    r"common\s+table\s+expression",
+    r"with\s+recursive",
+    r"with\s+(\w+)\s+as",
+    r"define\s+(\w+)\s+as",
+    r"create\s+(\w+)\s+as",
+    r"high\s+salary\s+employees?",
+    r"senior\s+employees?",
+    r"junior\s+employees?",
+    r"department\s+summary",
+    r"employee\s+summary"
+])
+
+ADVANCED_AGG_PATTERNS = PatternFamily("advanced_agg", [
+    r"with\s+rollup",
+    r"with\s+cube",
+    r"hierarchical\s+summary",
+    r"multi\s+level\s+summary",
+    r"department\s+and\s+position\s+summary",
+    r"rollup\s+by\s+(\w+)",
+    r"cube\s+by\s+(\w+)",
+    r"grouping\s+sets",
+    r"hierarchical\s+grouping",
+    r"multi\s+dimensional\s+analysis",
+    r"department\s+position\s+rollup",
+    r"salary\s+rollup\s+by\s+department"
+])
+
+JOIN_PATTERNS = PatternFamily("join", [
+    r"employees?\s+and\s+their\s+departments?",
+    r"employees?\s+with\s+department\s+names?",
+    r"employees?\s+and\s+departments?",
+    r"show\s+employees?\s+and\s+departments?",
+    r"list\s+employees?\s+and\s+departments?",
+    r"employees?\s+with\s+their\s+department\s+info",
+    r"employees?\s+joined\s+with\s+departments?",
+    r"employees?\s+along\s+with\s+departments?",
+    r"employees?\s+including\s+department\s+details",
+    r"employees?\s+plus\s+department\s+information",
+    r"employee\s+names?\s+and\s+department\s+names?",
+    r"show\s+employee\s+names?\s+and\s+department\s+names?",
+    r"list\s+employee\s+names?\s+and\s+department\s+names?",
+    r"names?\s+and\s+departments?",
+    r"employee\s+names?\s+with\s+department\s+names?"
+])
+
+# One scan of the query tells which families above can possibly match, so
+# "show X where Y" traffic skips most of the regex work
+STAGE_TRIGGERS = TriggerIndex(
+    [
+        GROUP_BY_PATTERNS,
+        HAVING_PATTERNS,
+        SUBQUERY_PATTERNS,
+        WINDOW_PATTERNS,
+        CTE_PATTERNS,
+        ADVANCED_AGG_PATTERNS,
+        JOIN_PATTERNS,
+    ],
+    common_words=["show", "employee", "in", "and", "by", "name", "salary", "department", "list", "add", "with"],
+)
+
+# Where department names live: the bundled schema's department column, or
+# the name column of a sampled departments table
+DEPARTMENT_COLUMNS = ("department", "departments.name")
+
+
+def _is_department(values: ValueIndex, text: str) -> bool:
+    return any(values.lookup(text, column) for column in DEPARTMENT_COLUMNS)
+
 
 class ParserAgent:
     def __init__(self):
         pass
 
-    def parse(self, query: str) -> Dict:
+    def parse(self, query: str, values: ValueIndex = None) -> ParsedQuery:
+        """Parse ``query``; ``values`` are the known column values (default: the bundled ones)."""
         query = query.lower()
-        print("📝 Query:", query)
+        values = DEFAULT_VALUES if values is None else values
+        if tracing.enabled:
+            tracing.emit("parser", f"📝 Query: {query}", query=query)
 
         result = {
             "action": "",
@@ -23,54 +163,33 @@ class ParserAgent:
             "advanced_aggregations": []  # New field for advanced aggregations
         }
 
+        stages = STAGE_TRIGGERS.scan(query)
+
         # Detect GROUP BY operations first
-        group_by_patterns = [
-            r"group\s+employees?\s+by\s+(\w+)",
-            r"group\s+by\s+(\w+)",
-            r"show\s+(\w+)\s+with\s+(?:average|avg|total|sum|count)\s+(\w+)",
-            r"(\w+)\s+with\s+(?:average|avg|total|sum|count)\s+(\w+)",
-            r"show\s+(\w+)\s+grouped\s+by\s+(\w+)",
-            r"(\w+)\s+grouped\s+by\s+(\w+)",
-            r"group\s+(\w+)\s+by\s+(\w+)",
-            r"show\s+(\w+)\s+and\s+their\s+(?:average|avg|total|sum|count)\s+(\w+)",
-            r"(\w+)\s+and\s+their\s+(?:average|avg|total|sum|count)\s+(\w+)",
-            r"group\s+employees?\s+by\s+(\w+)\s+and\s+show\s+count",
-            r"show\s+employee\s+count\s+by\s+(\w+)",
-            r"count\s+employees?\s+by\s+(\w+)",
-            r"(\w+)\s+count\s+by\s+(\w+)",
-            r"show\s+(\w+)\s+count\s+by\s+(\w+)"
-        ]
-        
-        for pattern in group_by_patterns:
-            match = re.search(pattern, query)
-            if match:
-                if len(match.groups()) == 2:
-                    result["group_by"] = match.group(1)
-                    # Extract the aggregation function and column
-                    agg_match = re.search(r"(average|avg|total|sum|count)\s+(\w+)", query)
-                    if agg_match:
-                        agg_func = agg_match.group(1)
-                        agg_col = agg_match.group(2)
-                        result["columns"] = [f"{agg_func}({agg_col})"]
-                        print(f"📊 GROUP BY Detected: {result['group_by']} with {agg_func}({agg_col})")
-                elif len(match.groups()) == 1:
-                    # Handle patterns like "group employees by department and show count"
-                    result["group_by"] = match.group(1)
-                    if "count" in query:
-                        result["columns"] = ["count(*)"]
-                        print(f"📊 GROUP BY Detected: {result['group_by']} with count(*)")
-                break
+        match = GROUP_BY_PATTERNS.search(query) if "group_by" in stages else None
+        if match:
+            if len(match.groups()) == 2:
+                result["group_by"] = match.group(1)
+                # Extract the aggregation function and column
+                agg_match = re.search(r"(average|avg|total|sum|count)\s+(\w+)", query)
+                if agg_match:
+                    agg_func = agg_match.group(1)
+                    agg_col = agg_match.group(2)
+                    result["columns"] = [f"{agg_func}({agg_col})"]
+                    if tracing.enabled:
+                        tracing.emit("parser", f"📊 GROUP BY Detected: {result['group_by']} with {agg_func}({agg_col})")
+            elif len(match.groups()) == 1:
+                # Handle patterns like "group employees by department and show count"
+                result["group_by"] = match.group(1)
+                if "count" in query:
+                    result["columns"] = ["count(*)"]
+                    if tracing.enabled:
+                        tracing.emit("parser", f"📊 GROUP BY Detected: {result['group_by']} with count(*)")
 
         # Detect HAVING conditions
-        having_patterns = [
-            r"(?:average|avg|total|sum|count)\s+(\w+)\s*(>|<|=|>=|<=)\s*(\d+)",
-            r"(\w+)\s*(>|<|=|>=|<=)\s*(\d+)",
-            r"with\s+(?:average|avg|total|sum|count)\s+(\w+)\s*(>|<|=|>=|<=)\s*(\d+)"
-        ]
-        
-        for pattern in having_patterns:
-            match = re.search(pattern, query)
-            if match and result["group_by"]:  # Only if we have GROUP BY
+        if result["group_by"] and "having" in stages:  # Only if we have GROUP BY
+            match = HAVING_PATTERNS.search(query)
+            if match:
                 col = match.group(1)
                 op = match.group(2)
                 val = int(match.group(3))
@@ -79,318 +198,257 @@ class ParserAgent:
                     "operator": op,
                     "value": val
                 }
-                print(f"🔍 HAVING Detected: {col} {op} {val}")
-                break
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 HAVING Detected: {col} {op} {val}")
 
         # Detect Subqueries
-        subquery_patterns = [
-            r"who\s+earn\s+more\s+than\s+average",
-            r"who\s+earn\s+less\s+than\s+average",
-            r"with\s+more\s+than\s+(\d+)\s+employees?",
-            r"with\s+less\s+than\s+(\d+)\s+employees?",
-            r"in\s+departments?\s+with\s+high\s+budgets?",
-            r"in\s+departments?\s+with\s+low\s+budgets?",
-            r"who\s+earn\s+more\s+than\s+(\w+)\s+(\w+)",
-            r"who\s+earn\s+less\s+than\s+(\w+)\s+(\w+)",
-            r"departments?\s+with\s+budget\s+(>|<|=|>=|<=)\s*(\d+)",
-            r"employees?\s+in\s+departments?\s+with\s+(\w+)\s+(>|<|=|>=|<=)\s*(\d+)",
-            r"departments?\s+with\s+more\s+than\s+(\d+)\s+employees?",
-            r"departments?\s+with\s+less\s+than\s+(\d+)\s+employees?"
-        ]
-        
-        for pattern in subquery_patterns:
-            match = re.search(pattern, query)
-            if match:
-                if "average" in pattern:
+        match = SUBQUERY_PATTERNS.search(query) if "subquery" in stages else None
+        if match:
+            pattern = match.pattern
+            if "average" in pattern:
+                result["subqueries"].append({
+                    "type": "comparison",
+                    "operator": "more than" if "more" in pattern else "less than",
+                    "comparison": "average",
+                    "column": "salary"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Subquery Detected: salary {result['subqueries'][-1]['operator']} average")
+            elif "employees" in pattern and match.groups():
+                count = match.group(1)
+                if count:
                     result["subqueries"].append({
-                        "type": "comparison",
+                        "type": "count",
                         "operator": "more than" if "more" in pattern else "less than",
-                        "comparison": "average",
-                        "column": "salary"
+                        "value": int(count),
+                        "table": "employees"
                     })
-                    print(f"🔍 Subquery Detected: salary {result['subqueries'][-1]['operator']} average")
-                elif "employees" in pattern and match.groups():
-                    count = match.group(1)
-                    if count:
-                        result["subqueries"].append({
-                            "type": "count",
-                            "operator": "more than" if "more" in pattern else "less than",
-                            "value": int(count),
-                            "table": "employees"
-                        })
-                        print(f"🔍 Subquery Detected: {result['subqueries'][-1]['operator']} {count} employees")
-                elif "budget" in pattern:
-                    if match.groups():
-                        op = match.group(1)
-                        val = int(match.group(2))
-                        result["subqueries"].append({
-                            "type": "budget",
-                            "operator": op,
-                            "value": val,
-                            "column": "budget"
-                        })
-                        print(f"🔍 Subquery Detected: budget {op} {val}")
-                break
+                    if tracing.enabled:
+                        tracing.emit("parser", f"🔍 Subquery Detected: {result['subqueries'][-1]['operator']} {count} employees")
+            elif "budget" in pattern:
+                if match.groups():
+                    op = match.group(1)
+                    val = int(match.group(2))
+                    result["subqueries"].append({
+                        "type": "budget",
+                        "operator": op,
+                        "value": val,
+                        "column": "budget"
+                    })
+                    if tracing.enabled:
+                        tracing.emit("parser", f"🔍 Subquery Detected: budget {op} {val}")
 
         # Detect Window Functions
-        window_patterns = [
-            r"show\s+employees?\s+with\s+row\s+numbers?",
-            r"show\s+row\s+numbers?",
-            r"add\s+row\s+numbers?",
-            r"list\s+employees?\s+with\s+row\s+numbers?",
-            r"with\s+row\s+numbers?",
-            r"dense\s+rank\s+by\s+(\w+)",
-            r"rank\s+employees?\s+by\s+salary\s+desc",
-            r"rank\s+employees?\s+by\s+salary\s+asc",
-            r"rank\s+employees?\s+by\s+(\w+)",
-            r"rank\s+by\s+(\w+)",
-            r"show\s+employees?\s+with\s+rank",
-            r"top\s+(\d+)\s+employees?\s+by\s+(\w+)",
-            r"bottom\s+(\d+)\s+employees?\s+by\s+(\w+)",
-            r"rank\s+departments?\s+by\s+(\w+)",
-            r"show\s+ranked\s+(\w+)",
-            r"employees?\s+ranked\s+by\s+(\w+)",
-            r"with\s+rank"
-        ]
-        
-        for pattern in window_patterns:
-            match = re.search(pattern, query)
-            if match:
-                print(f"🔍 Window pattern matched: {pattern}")
-                if r"row\s+numbers?" in pattern:
-                    result["window_functions"].append({
-                        "type": "row_number",
-                        "order_by": "id",
-                        "order": "ASC"
-                    })
-                    print(f"🔍 Window Function Detected: ROW_NUMBER()")
-                    break
-                elif "rank" in pattern and "dense" not in pattern and match.groups():
-                    column = match.group(1)
-                    order = "DESC" if "desc" in pattern else "ASC"
-                    result["window_functions"].append({
-                        "type": "rank",
-                        "order_by": column,
-                        "order": order
-                    })
-                    print(f"🔍 Window Function Detected: RANK() by {column} {order}")
-                elif r"dense\s+rank" in pattern and match.groups():
-                    column = match.group(1)
-                    result["window_functions"].append({
-                        "type": "dense_rank",
-                        "order_by": column,
-                        "order": "DESC"
-                    })
-                    print(f"🔍 Window Function Detected: DENSE_RANK() by {column}")
-                    break
-                elif "top" in pattern and match.groups():
-                    limit = int(match.group(1))
-                    column = match.group(2)
-                    result["window_functions"].append({
-                        "type": "rank",
-                        "order_by": column,
-                        "order": "DESC",
-                        "limit": limit
-                    })
-                    print(f"🔍 Window Function Detected: TOP {limit} by {column}")
-                elif "bottom" in pattern and match.groups():
-                    limit = int(match.group(1))
-                    column = match.group(2)
-                    result["window_functions"].append({
-                        "type": "rank",
-                        "order_by": column,
-                        "order": "ASC",
-                        "limit": limit
-                    })
-                    print(f"🔍 Window Function Detected: BOTTOM {limit} by {column}")
-                break
+        match = WINDOW_PATTERNS.search(query) if "window" in stages else None
+        if match:
+            pattern = match.pattern
+            if tracing.enabled:
+                tracing.emit("parser", f"🔍 Window pattern matched: {pattern}")
+            if r"row\s+numbers?" in pattern:
+                result["window_functions"].append({
+                    "type": "row_number",
+                    "order_by": "id",
+                    "order": "ASC"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Window Function Detected: ROW_NUMBER()")
+            elif "rank" in pattern and "dense" not in pattern and match.groups():
+                column = match.group(1)
+                order = "DESC" if "desc" in pattern else "ASC"
+                result["window_functions"].append({
+                    "type": "rank",
+                    "order_by": column,
+                    "order": order
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Window Function Detected: RANK() by {column} {order}")
+            elif r"dense\s+rank" in pattern and match.groups():
+                column = match.group(1)
+                result["window_functions"].append({
+                    "type": "dense_rank",
+                    "order_by": column,
+                    "order": "DESC"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Window Function Detected: DENSE_RANK() by {column}")
+            elif "top" in pattern and match.groups():
+                limit = int(match.group(1))
+                column = match.group(2)
+                result["window_functions"].append({
+                    "type": "rank",
+                    "order_by": column,
+                    "order": "DESC",
+                    "limit": limit
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Window Function Detected: TOP {limit} by {column}")
+            elif "bottom" in pattern and match.groups():
+                limit = int(match.group(1))
+                column = match.group(2)
+                result["window_functions"].append({
+                    "type": "rank",
+                    "order_by": column,
+                    "order": "ASC",
+                    "limit": limit
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Window Function Detected: BOTTOM {limit} by {column}")
 
         # Detect CTEs (Common Table Expressions)
-        cte_patterns = [
-            r"with\s+(\w+)\s+as\s+\((.+?)\)",
-            r"using\s+cte",
-            r"common\s+table\s+expression",
-            r"with\s+recursive",
-            r"with\s+(\w+)\s+as",
-            r"define\s+(\w+)\s+as",
-            r"create\s+(\w+)\s+as",
-            r"high\s+salary\s+employees?",
-            r"senior\s+employees?",
-            r"junior\s+employees?",
-            r"department\s+summary",
-            r"employee\s+summary"
-        ]
-        
-        for pattern in cte_patterns:
-            match = re.search(pattern, query)
-            if match:
-                print(f"🔍 CTE pattern matched: {pattern}")
-                if "with" in pattern and "as" in pattern and match.groups():
-                    cte_name = match.group(1)
-                    cte_query = match.group(2) if len(match.groups()) > 1 else ""
-                    result["ctes"].append({
-                        "name": cte_name,
-                        "query": cte_query,
-                        "type": "with_clause"
-                    })
-                    print(f"🔍 CTE Detected: {cte_name}")
-                elif r"high\s+salary" in pattern:
-                    result["ctes"].append({
-                        "name": "high_salary_employees",
-                        "query": "SELECT * FROM employees WHERE salary > 70000",
-                        "type": "high_salary"
-                    })
-                    print(f"🔍 CTE Detected: high_salary_employees")
-                elif "senior" in pattern:
-                    result["ctes"].append({
-                        "name": "senior_employees",
-                        "query": "SELECT * FROM employees WHERE age > 30",
-                        "type": "senior"
-                    })
-                    print(f"🔍 CTE Detected: senior_employees")
-                elif "junior" in pattern:
-                    result["ctes"].append({
-                        "name": "junior_employees",
-                        "query": "SELECT * FROM employees WHERE age <= 30",
-                        "type": "junior"
-                    })
-                    print(f"🔍 CTE Detected: junior_employees")
-                elif r"department\s+summary" in pattern:
-                    result["ctes"].append({
-                        "name": "department_summary",
-                        "query": "SELECT department_id, COUNT(*) as emp_count, AVG(salary) as avg_salary FROM employees GROUP BY department_id",
-                        "type": "department_summary"
-                    })
-                    print(f"🔍 CTE Detected: department_summary")
-                break
+        match = CTE_PATTERNS.search(query) if "cte" in stages else None
+        if match:
+            pattern = match.pattern
+            if tracing.enabled:
+                tracing.emit("parser", f"🔍 CTE pattern matched: {pattern}")
+            if "with" in pattern and "as" in pattern and match.groups():
+                cte_name = match.group(1)
+                cte_query = match.group(2) if len(match.groups()) > 1 else ""
+                result["ctes"].append({
+                    "name": cte_name,
+                    "query": cte_query,
+                    "type": "with_clause"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 CTE Detected: {cte_name}")
+            elif r"high\s+salary" in pattern:
+                result["ctes"].append({
+                    "name": "high_salary_employees",
+                    "query": "SELECT * FROM employees WHERE salary > 70000",
+                    "type": "high_salary"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 CTE Detected: high_salary_employees")
+            elif "senior" in pattern:
+                result["ctes"].append({
+                    "name": "senior_employees",
+                    "query": "SELECT * FROM employees WHERE age > 30",
+                    "type": "senior"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 CTE Detected: senior_employees")
+            elif "junior" in pattern:
+                result["ctes"].append({
+                    "name": "junior_employees",
+                    "query": "SELECT * FROM employees WHERE age <= 30",
+                    "type": "junior"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 CTE Detected: junior_employees")
+            elif r"department\s+summary" in pattern:
+                result["ctes"].append({
+                    "name": "department_summary",
+                    "query": "SELECT department_id, COUNT(*) as emp_count, AVG(salary) as avg_salary FROM employees GROUP BY department_id",
+                    "type": "department_summary"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 CTE Detected: department_summary")
 
         # Detect Advanced Aggregations (ROLLUP, CUBE)
-        advanced_agg_patterns = [
-            r"with\s+rollup",
-            r"with\s+cube",
-            r"hierarchical\s+summary",
-            r"multi\s+level\s+summary",
-            r"department\s+and\s+position\s+summary",
-            r"rollup\s+by\s+(\w+)",
-            r"cube\s+by\s+(\w+)",
-            r"grouping\s+sets",
-            r"hierarchical\s+grouping",
-            r"multi\s+dimensional\s+analysis",
-            r"department\s+position\s+rollup",
-            r"salary\s+rollup\s+by\s+department"
-        ]
-        
-        for pattern in advanced_agg_patterns:
-            match = re.search(pattern, query)
-            if match:
-                if "rollup" in pattern:
-                    if match.groups():
-                        column = match.group(1)
-                        result["advanced_aggregations"].append({
-                            "type": "rollup",
-                            "columns": [column],
-                            "operation": "ROLLUP"
-                        })
-                        print(f"🔍 Advanced Aggregation Detected: ROLLUP by {column}")
-                    else:
-                        result["advanced_aggregations"].append({
-                            "type": "rollup",
-                            "columns": ["department_id", "position"],
-                            "operation": "ROLLUP"
-                        })
-                        print(f"🔍 Advanced Aggregation Detected: ROLLUP")
-                elif "cube" in pattern:
-                    if match.groups():
-                        column = match.group(1)
-                        result["advanced_aggregations"].append({
-                            "type": "cube",
-                            "columns": [column],
-                            "operation": "CUBE"
-                        })
-                        print(f"🔍 Advanced Aggregation Detected: CUBE by {column}")
-                    else:
-                        result["advanced_aggregations"].append({
-                            "type": "cube",
-                            "columns": ["department_id", "position"],
-                            "operation": "CUBE"
-                        })
-                        print(f"🔍 Advanced Aggregation Detected: CUBE")
-                elif "hierarchical" in pattern:
+        match = ADVANCED_AGG_PATTERNS.search(query) if "advanced_agg" in stages else None
+        if match:
+            pattern = match.pattern
+            if "rollup" in pattern:
+                if match.groups():
+                    column = match.group(1)
+                    result["advanced_aggregations"].append({
+                        "type": "rollup",
+                        "columns": [column],
+                        "operation": "ROLLUP"
+                    })
+                    if tracing.enabled:
+                        tracing.emit("parser", f"🔍 Advanced Aggregation Detected: ROLLUP by {column}")
+                else:
                     result["advanced_aggregations"].append({
                         "type": "rollup",
                         "columns": ["department_id", "position"],
                         "operation": "ROLLUP"
                     })
-                    print(f"🔍 Advanced Aggregation Detected: Hierarchical ROLLUP")
-                elif "multi" in pattern and "dimensional" in pattern:
+                    if tracing.enabled:
+                        tracing.emit("parser", f"🔍 Advanced Aggregation Detected: ROLLUP")
+            elif "cube" in pattern:
+                if match.groups():
+                    column = match.group(1)
+                    result["advanced_aggregations"].append({
+                        "type": "cube",
+                        "columns": [column],
+                        "operation": "CUBE"
+                    })
+                    if tracing.enabled:
+                        tracing.emit("parser", f"🔍 Advanced Aggregation Detected: CUBE by {column}")
+                else:
                     result["advanced_aggregations"].append({
                         "type": "cube",
-                        "columns": ["department_id", "position", "city"],
+                        "columns": ["department_id", "position"],
                         "operation": "CUBE"
                     })
-                    print(f"🔍 Advanced Aggregation Detected: Multi-dimensional CUBE")
-                break
+                    if tracing.enabled:
+                        tracing.emit("parser", f"🔍 Advanced Aggregation Detected: CUBE")
+            elif "hierarchical" in pattern:
+                result["advanced_aggregations"].append({
+                    "type": "rollup",
+                    "columns": ["department_id", "position"],
+                    "operation": "ROLLUP"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Advanced Aggregation Detected: Hierarchical ROLLUP")
+            elif "multi" in pattern and "dimensional" in pattern:
+                result["advanced_aggregations"].append({
+                    "type": "cube",
+                    "columns": ["department_id", "position", "city"],
+                    "operation": "CUBE"
+                })
+                if tracing.enabled:
+                    tracing.emit("parser", f"🔍 Advanced Aggregation Detected: Multi-dimensional CUBE")
 
         # Detect JOIN operations
-        join_patterns = [
-            r"employees?\s+and\s+their\s+departments?",
-            r"employees?\s+with\s+department\s+names?",
-            r"employees?\s+and\s+departments?",
-            r"show\s+employees?\s+and\s+departments?",
-            r"list\s+employees?\s+and\s+departments?",
-            r"employees?\s+with\s+their\s+department\s+info",
-            r"employees?\s+joined\s+with\s+departments?",
-            r"employees?\s+along\s+with\s+departments?",
-            r"employees?\s+including\s+department\s+details",
-            r"employees?\s+plus\s+department\s+information",
-            r"employee\s+names?\s+and\s+department\s+names?",
-            r"show\s+employee\s+names?\s+and\s+department\s+names?",
-            r"list\s+employee\s+names?\s+and\s+department\s+names?",
-            r"names?\s+and\s+departments?",
-            r"employee\s+names?\s+with\s+department\s+names?"
-        ]
-        
-        for pattern in join_patterns:
-            if re.search(pattern, query):
-                result["joins"].append({
-                    "type": "INNER",
-                    "table": "departments",
-                    "on": {
-                        "left": "employees.department_id",
-                        "right": "departments.id"
-                    }
-                })
-                print("🔗 JOIN Detected: employees INNER JOIN departments")
-                break
+        if "join" in stages and JOIN_PATTERNS.search(query):
+            result["joins"].append({
+                "type": "INNER",
+                "table": "departments",
+                "on": {
+                    "left": "employees.department_id",
+                    "right": "departments.id"
+                }
+            })
+            if tracing.enabled:
+                tracing.emit("parser", "🔗 JOIN Detected: employees INNER JOIN departments")
 
         # Detect action first
         if "insert" in query or "add" in query:
             result["action"] = "insert"
-            print("🔍 Action Detected: INSERT")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: INSERT")
         elif "update" in query or "set" in query:
             result["action"] = "update"
-            print("🔍 Action Detected: UPDATE")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: UPDATE")
         elif "delete" in query or "remove" in query:
             result["action"] = "delete"
-            print("🔍 Action Detected: DELETE")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: DELETE")
         elif result["subqueries"]:  # If subquery is detected, it's a SELECT query
             result["action"] = "select"
-            print("🔍 Action Detected: SELECT (with subquery)")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: SELECT (with subquery)")
         elif "average" in query or "avg" in query:
             result["action"] = "aggregate"
             result["function"] = "avg"
-            print("🔍 Action Detected: AGGREGATE (AVG)")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: AGGREGATE (AVG)")
         elif "total" in query or "sum" in query:
             result["action"] = "aggregate"
             result["function"] = "sum"
-            print("🔍 Action Detected: AGGREGATE (SUM)")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: AGGREGATE (SUM)")
         elif "count" in query:
             result["action"] = "aggregate"
             result["function"] = "count"
-            print("🔍 Action Detected: AGGREGATE (COUNT)")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: AGGREGATE (COUNT)")
         elif result["group_by"]:  # If GROUP BY is detected, it's an aggregate query
             result["action"] = "aggregate"
-            print("🔍 Action Detected: AGGREGATE (GROUP BY)")
+            if tracing.enabled:
+                tracing.emit("parser", "🔍 Action Detected: AGGREGATE (GROUP BY)")
         else:
             # Default to select for queries that don't match other patterns
             result["action"] = "select"
@@ -441,9 +499,8 @@ class ParserAgent:
         table_match = re.search(r"(?:of|from|in)\s+([a-zA-Z_][a-zA-Z0-9_]*)", query)
         if table_match:
             potential_table = table_match.group(1).strip()
-            # Don't treat cities as table names
-            cities = ["new", "york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]
-            if potential_table.lower() not in cities:
+            # Don't treat known values (cities, departments) as table names
+            if not values.has_word(potential_table):
                 result["table"] = potential_table
 
         if result["action"] == "insert":
@@ -461,172 +518,146 @@ class ParserAgent:
         if not result["table"]:
             result["table"] = "employees"
 
+        # Everything below works off one token stream instead of raw-string scans
+        tokens = tokenize(query, values)
+
         # Extract filters for select queries
         if result["action"] == "select":
             # Salary filters
-            if "earning more than" in query:
-                num = re.search(r"earning more than\s+(\d+)", query)
+            for phrase in (("earning", "more", "than"), ("earn", "more", "than")):
+                num = tokens.after(phrase, (NUMBER,))
                 if num:
-                    result["filters"]["salary"] = {"gt": int(num.group(1))}
-            if "who earn more than" in query:
-                num = re.search(r"who earn more than\s+(\d+)", query)
-                if num:
-                    result["filters"]["salary"] = {"gt": int(num.group(1))}
-            if "earn more than" in query:
-                num = re.search(r"earn more than\s+(\d+)", query)
-                if num:
-                    result["filters"]["salary"] = {"gt": int(num.group(1))}
-            if "earn between" in query:
-                between_match = re.search(r"earn between\s+(\d+)\s+and\s+(\d+)", query)
-                if between_match:
-                    min_val = int(between_match.group(1))
-                    max_val = int(between_match.group(2))
-                    result["filters"]["salary"] = {"between": [min_val, max_val]}
-            
+                    result["filters"]["salary"] = {"gt": int(num.text)}
+            between = tokens.range_after(("earn", "between"))
+            if between:
+                result["filters"]["salary"] = {"between": between}
+
             # Age filters
-            if "older than" in query:
-                num = re.search(r"older than\s+(\d+)", query)
-                if num:
-                    result["filters"]["age"] = {"gt": int(num.group(1))}
-            if "younger than" in query:
-                num = re.search(r"younger than\s+(\d+)", query)
-                if num:
-                    result["filters"]["age"] = {"lt": int(num.group(1))}
-            if "age between" in query:
-                between_match = re.search(r"age between\s+(\d+)\s+and\s+(\d+)", query)
-                if between_match:
-                    min_val = int(between_match.group(1))
-                    max_val = int(between_match.group(2))
-                    result["filters"]["age"] = {"between": [min_val, max_val]}
-            
+            num = tokens.after(("older", "than"), (NUMBER,))
+            if num:
+                result["filters"]["age"] = {"gt": int(num.text)}
+            num = tokens.after(("younger", "than"), (NUMBER,))
+            if num:
+                result["filters"]["age"] = {"lt": int(num.text)}
+            between = tokens.range_after(("age", "between"))
+            if between:
+                result["filters"]["age"] = {"between": between}
+
             # City filters - check this before department filters
-            if "in" in query and any(city in query.lower() for city in ["new york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]):
-                # Look for city patterns more specifically
-                for city in ["new york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]:
-                    if city in query.lower():
-                        result["filters"]["city"] = city
-                        break
-            
+            cities = tokens.entities("city")
+            if cities:
+                result["filters"]["city"] = cities[0].text
+
             # Department filters (only if no city was found)
-            if "in" in query and "city" not in result["filters"]:
-                dept_match = re.search(r"in\s+([a-zA-Z]+)", query)
-                if dept_match:
-                    dept = dept_match.group(1).strip()
-                    if dept.lower() in ["engineering", "marketing", "sales", "hr", "finance", "it", "operations"]:
-                        result["filters"]["department"] = dept
-            
+            if "city" not in result["filters"]:
+                dept = tokens.after(("in",), WORDS)
+                if dept and _is_department(values, dept.text):
+                    result["filters"]["department"] = dept.text
+
             # Join date filters
-            if "joined after" in query:
-                date_match = re.search(r"joined after\s+(\d{4}-\d{2}-\d{2})", query)
-                if date_match:
-                    result["filters"]["join_date"] = {"gt": date_match.group(1)}
-            if "joined before" in query:
-                date_match = re.search(r"joined before\s+(\d{4}-\d{2}-\d{2})", query)
-                if date_match:
-                    result["filters"]["join_date"] = {"lt": date_match.group(1)}
-            if "joined in" in query:
-                year_match = re.search(r"joined in\s+(\d{4})", query)
-                if year_match:
-                    year = year_match.group(1)
-                    result["filters"]["join_date"] = {"like": f"{year}%"}
-            
+            date = tokens.after(("joined", "after"), (DATE,))
+            if date:
+                result["filters"]["join_date"] = {"gt": date.text}
+            date = tokens.after(("joined", "before"), (DATE,))
+            if date:
+                result["filters"]["join_date"] = {"lt": date.text}
+            year = tokens.after(("joined", "in"), (NUMBER, DATE))
+            if year and len(year.text) >= 4 and year.text[:4].isdigit():
+                result["filters"]["join_date"] = {"like": f"{year.text[:4]}%"}
+
             # Position filters
-            if "position" in query or "title" in query:
-                pos_match = re.search(r"(?:position|title)\s+(?:is\s+)?([a-zA-Z\s]+)", query)
-                if pos_match:
-                    result["filters"]["position"] = pos_match.group(1).strip()
+            position = tokens.words_after((frozenset(["position", "title"]),))
+            if position:
+                words = position.split(None, 1)
+                if words[0] == "is" and len(words) > 1:
+                    position = words[1]
+                result["filters"]["position"] = position
 
         # Extract filters for insert queries
         if result["action"] == "insert":
-            name_match = re.search(r"named\s+([a-zA-Z]+)", query)
-            if name_match:
-                result["filters"]["name"] = name_match.group(1)
+            name = tokens.after(("named",), WORDS)
+            if name:
+                result["filters"]["name"] = name.text.split()[0]
+
+            salary = tokens.after(("salary",), (NUMBER,))
+            if salary:
+                result["filters"]["salary"] = int(salary.text)
 
-            salary_match = re.search(r"salary\s+(\d+)", query)
-            if salary_match:
-                result["filters"]["salary"] = int(salary_match.group(1))
-            
             # Age
-            age_match = re.search(r"age\s+(\d+)", query)
-            if age_match:
-                result["filters"]["age"] = int(age_match.group(1))
-            
+            age = tokens.after(("age",), (NUMBER,))
+            if age:
+                result["filters"]["age"] = int(age.text)
+
             # City
-            city_match = re.search(r"(?:from|in)\s+([a-zA-Z\s]+)", query)
-            if city_match:
-                city = city_match.group(1).strip()
-                if city.lower() in ["new york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]:
-                    result["filters"]["city"] = city
-            
+            city = tokens.words_after((frozenset(["from", "in"]),))
+            if city and values.lookup(city, "city"):
+                result["filters"]["city"] = city
+
             # Position
-            pos_match = re.search(r"(?:as|position|title)\s+([a-zA-Z\s]+)", query)
-            if pos_match:
-                result["filters"]["position"] = pos_match.group(1).strip()
-            
+            position = tokens.words_after((frozenset(["as", "position", "title"]),))
+            if position:
+                result["filters"]["position"] = position
+
             # Email
-            email_match = re.search(r"email\s+([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})", query)
-            if email_match:
-                result["filters"]["email"] = email_match.group(1)
+            email = tokens.after(("email",), (EMAIL,))
+            if email:
+                result["filters"]["email"] = email.text
 
         # Extract filters for update queries
         if result["action"] == "update":
-            salary_update = re.search(r"salary\s+to\s+(\d+)", query)
-            if salary_update:
-                result["filters"]["salary"] = int(salary_update.group(1))
-            
-            age_update = re.search(r"age\s+to\s+(\d+)", query)
-            if age_update:
-                result["filters"]["age"] = int(age_update.group(1))
+            salary = tokens.after(("salary", "to"), (NUMBER,))
+            if salary:
+                result["filters"]["salary"] = int(salary.text)
+
+            age = tokens.after(("age", "to"), (NUMBER,))
+            if age:
+                result["filters"]["age"] = int(age.text)
 
-            dept_update = re.search(r"in\s+([a-zA-Z]+)", query)
-            if dept_update:
-                result["filters"]["department"] = dept_update.group(1).strip()
+            dept = tokens.after(("in",), WORDS)
+            if dept:
+                result["filters"]["department"] = dept.text
 
         # Extract filters for delete queries
         if result["action"] == "delete":
             # Salary filters
-            if "salary less than" in query:
-                num = re.search(r"salary less than\s+(\d+)", query)
+            if tokens.contains(("salary", "less", "than")):
+                num = tokens.after(("salary", "less", "than"), (NUMBER,))
                 if num:
-                    result["filters"]["salary"] = {"lt": int(num.group(1))}
-            elif "salary greater than" in query:
-                num = re.search(r"salary greater than\s+(\d+)", query)
+                    result["filters"]["salary"] = {"lt": int(num.text)}
+            elif tokens.contains(("salary", "greater", "than")):
+                num = tokens.after(("salary", "greater", "than"), (NUMBER,))
                 if num:
-                    result["filters"]["salary"] = {"gt": int(num.group(1))}
-            
+                    result["filters"]["salary"] = {"gt": int(num.text)}
+
             # Age filters
-            if "younger than" in query:
-                num = re.search(r"younger than\s+(\d+)", query)
+            if tokens.contains(("younger", "than")):
+                num = tokens.after(("younger", "than"), (NUMBER,))
                 if num:
-                    result["filters"]["age"] = {"lt": int(num.group(1))}
-            elif "older than" in query:
-                num = re.search(r"older than\s+(\d+)", query)
+                    result["filters"]["age"] = {"lt": int(num.text)}
+            elif tokens.contains(("older", "than")):
+                num = tokens.after(("older", "than"), (NUMBER,))
                 if num:
-                    result["filters"]["age"] = {"gt": int(num.group(1))}
-            
+                    result["filters"]["age"] = {"gt": int(num.text)}
+
             # City filters
-            if "in" in query and any(city in query.lower() for city in ["new york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]):
-                city_match = re.search(r"in\s+([a-zA-Z\s]+)", query)
-                if city_match:
-                    city = city_match.group(1).strip()
-                    if city.lower() in ["new york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]:
-                        result["filters"]["city"] = city
-            
+            city = tokens.words_after(("in",))
+            if city and values.lookup(city, "city"):
+                result["filters"]["city"] = city
+
             # Department filters
-            if "in" in query and not any(city in query.lower() for city in ["new york", "london", "tokyo", "paris", "berlin", "mumbai", "delhi", "bangalore"]):
-                dept_match = re.search(r"in\s+([a-zA-Z]+)", query)
-                if dept_match:
-                    dept = dept_match.group(1).strip()
-                    if dept.lower() in ["engineering", "marketing", "sales", "hr", "finance", "it", "operations"]:
-                        result["filters"]["department"] = dept
+            if not tokens.entities("city"):
+                dept = tokens.after(("in",), WORDS)
+                if dept and _is_department(values, dept.text):
+                    result["filters"]["department"] = dept.text
 
         result["nouns"] = result["columns"] + list(result["filters"].keys())
 
         if "function" in result:
             result["nouns"].append(result["function"])
 
-        print("🧠 Final Parsed Output:", result)
-        return result
+        if tracing.enabled:
+            tracing.emit("parser", f"🧠 Final Parsed Output: {result}", result=result)
+        return ParsedQuery.from_dict(result)
 
-def parse_natural_language(query: str) -> Dict:
-    return ParserAgent().parse(query)
\ No newline at end of file
+def parse_natural_language(query: str, values: ValueIndex = None) -> ParsedQuery:
+    return ParserAgent().parse(query, values)
\ No newline at end of file
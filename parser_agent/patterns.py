@@ -0,0 +1,173 @@
+import re
+from typing import List, Optional, Tuple
+
+# An opening parenthesis that starts a capturing group (not escaped, not "(?")
+_CAPTURING_GROUP = re.compile(r"(?<!\\)\((?!\?)")
+
+
+class FamilyMatch:
+    """The branch of a PatternFamily that matched, with that branch's own groups."""
+
+    __slots__ = ("family", "index", "pattern", "_match")
+
+    def __init__(self, family: str, index: int, pattern: str, match: re.Match):
+        self.family = family
+        self.index = index
+        self.pattern = pattern
+        self._match = match
+
+    @property
+    def name(self) -> str:
+        return f"p{self.index}"
+
+    def groups(self) -> Tuple:
+        return self._match.groups()
+
+    def group(self, n: int = 0):
+        return self._match.group(n)
+
+    def span(self) -> Tuple[int, int]:
+        return self._match.span()
+
+    def __repr__(self):
+        return f"FamilyMatch({self.family}.{self.name}: {self.pattern!r}, groups={self.groups()})"
+
+
+class PatternFamily:
+    """
+    A list of regexes compiled once and scanned as one alternation.
+
+    The patterns are merged into a single capture-free alternation, so a query
+    that matches none of them costs one pass of the regex engine no matter how
+    many patterns the family holds.  CPython's ``re`` can factor common
+    prefixes out of such an alternation, but stops doing so once every branch
+    carries its own (named) group, so branches are told apart afterwards with
+    their individually precompiled regexes.
+
+    ``search()`` returns exactly what the old "for pattern in patterns:
+    re.search(...)" loops returned: the first pattern in list order that
+    matches, at its leftmost position.  Patterns must not use backreferences.
+    """
+
+    def __init__(self, name: str, patterns: List[str], flags: int = 0):
+        self.name = name
+        self.patterns = list(patterns)
+        self.flags = flags
+        self.compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+
+        branches = [_CAPTURING_GROUP.sub("(?:", pattern) for pattern in self.patterns]
+        self.any = re.compile("|".join(f"(?:{branch})" for branch in branches), flags)
+        if self.any.groups:
+            raise ValueError(f"Could not strip capturing groups from pattern family '{name}'")
+
+    def search(self, text: str) -> Optional[FamilyMatch]:
+        if not self.any.search(text):
+            return None
+        for index, regex in enumerate(self.compiled):
+            match = regex.search(text)
+            if match:
+                return FamilyMatch(self.name, index, self.patterns[index], match)
+        return None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __repr__(self):
+        return f"PatternFamily({self.name!r}, {len(self.patterns)} patterns)"
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    The literal words every match of ``pattern`` must contain.
+
+    Only literals outside groups and character classes count, and a letter
+    made optional by ``?``, ``*`` or ``{`` is dropped, so ``employees?``
+    yields "employee".  A top-level ``|`` means no literal is guaranteed.
+    """
+    runs = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            runs.append(current)
+            current = ""
+            i += 2
+            continue
+        if ch == "[":
+            runs.append(current)
+            current = ""
+            i = pattern.index("]", i + 2)
+        elif ch == "(":
+            runs.append(current)
+            current = ""
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth:
+            pass
+        elif ch in "?*{":
+            runs.append(current[:-1])
+            current = ""
+        elif ch == "|":
+            return []
+        elif ch.isalnum() or ch == "_" or ch == " ":
+            current += ch
+        else:
+            runs.append(current)
+            current = ""
+        i += 1
+    runs.append(current)
+    return [run for run in runs if run.strip()]
+
+
+class TriggerIndex:
+    """
+    Decides in one pass over a query which pattern families could match it.
+
+    Each pattern contributes its longest required literal as a trigger,
+    preferring literals outside ``common_words`` (words nearly every query
+    contains, most frequent first); a pattern made only of common words uses
+    the least frequent of them.  A family is enabled when any of its triggers
+    occurs in the query; a family with a pattern that has no literal at all
+    is always enabled.  Triggers are found with a single lookahead
+    alternation (longest first) that reports the longest trigger starting at
+    every position; triggers contained in that one are implied, which keeps
+    overlapping words like "group"/"grouping" exact.
+    """
+
+    def __init__(self, families: List[PatternFamily], common_words: List[str] = ()):
+        self.always = set()
+        self.triggers = {}
+        for family in families:
+            for pattern in family.patterns:
+                literals = required_literals(pattern)
+                if not literals:
+                    self.always.add(family.name)
+                    continue
+                rare = [literal for literal in literals if literal not in common_words]
+                if rare:
+                    trigger = max(rare, key=len)
+                else:
+                    trigger = max(literals, key=common_words.index)
+                self.triggers.setdefault(trigger, set()).add(family.name)
+
+        # A trigger also enables every family of the triggers it contains
+        self._enables = {
+            trigger: frozenset().union(*(names for other, names in self.triggers.items() if other in trigger))
+            for trigger in self.triggers
+        }
+        ordered = sorted(self.triggers, key=len, reverse=True)
+        self.regex = re.compile("(?=(" + "|".join(re.escape(t) for t in ordered) + "))") if ordered else None
+
+    def scan(self, text: str) -> set:
+        enabled = set(self.always)
+        if self.regex is None:
+            return enabled
+        for trigger in set(self.regex.findall(text)):
+            enabled |= self._enables[trigger]
+        return enabled
+
+    def __repr__(self):
+        return f"TriggerIndex({len(self.triggers)} triggers, always={sorted(self.always)})"
@@ -0,0 +1,212 @@
+import re
+from typing import List, Optional, Tuple, Union
+
+from schema_mapper.value_index import DEFAULT_VALUES, ValueIndex
+
+NUMBER = "number"
+DATE = "date"
+EMAIL = "email"
+ENTITY = "entity"
+KEYWORD = "keyword"
+IDENTIFIER = "identifier"
+SYMBOL = "symbol"
+
+# Token kinds that are made of letters only
+WORDS = (KEYWORD, IDENTIFIER, ENTITY)
+
+# Columns whose values become single entity tokens ("new york" -> one city).
+# The values themselves come from a ValueIndex: the bundled demo values by
+# default, or the ones sampled from the connected database.
+ENTITY_COLUMNS = ("city",)
+
+# Words the filter extractors anchor on
+KEYWORDS = frozenset([
+    "earn", "earning", "more", "less", "greater", "than", "between", "and",
+    "older", "younger", "age", "salary", "joined", "after", "before", "in",
+    "from", "as", "is", "position", "title", "named", "email", "to",
+])
+
+# Alternatives are tried in order, so emails and dates win over their parts.
+# The leading group captures the whitespace before each token, which gives both
+# the offsets and whether a token is separated from the previous one.
+_TOKEN_TEMPLATE = (
+    r"(\s*)(?:({email})"
+    r"|(\d{{4}}-\d{{2}}-\d{{2}})"
+    r"|(\d+)"
+    r"|([a-z]+)"
+    r"|(\S))"
+)
+_TOKEN = re.compile(_TOKEN_TEMPLATE.format(email=r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}"))
+# Most queries have no "@"; a branch that can never match keeps the same groups
+_TOKEN_NO_EMAIL = re.compile(_TOKEN_TEMPLATE.format(email="(?!)"))
+
+
+class Token:
+    __slots__ = ("kind", "text", "start", "end", "category", "spaced")
+
+    def __init__(self, kind: str, text: str, start: int, end: int, category: str = None, spaced: bool = True):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+        self.category = category
+        # Whitespace separates this token from the previous one
+        self.spaced = spaced
+
+    def __repr__(self):
+        label = f"{self.kind}:{self.category}" if self.category else self.kind
+        return f"Token({label}, {self.text!r}, {self.start})"
+
+
+# A phrase is a sequence of words; a set in place of a word matches any of its members
+Phrase = Tuple[Union[str, frozenset], ...]
+
+
+class TokenStream:
+    """The typed tokens of one lowercased query, with phrase lookups for the extractors."""
+
+    def __init__(self, text: str, tokens: List[Token], positions: dict = None):
+        self.text = text
+        self.tokens = tokens
+        # Token text -> indexes where it occurs, so phrase lookups skip the scan
+        if positions is None:
+            positions = {}
+            for index, token in enumerate(tokens):
+                positions.setdefault(token.text, []).append(index)
+        self.positions = positions
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, index):
+        return self.tokens[index]
+
+    def occurrences(self, phrase: Phrase) -> List[int]:
+        """Indexes of the token just past every occurrence of ``phrase``, in order."""
+        first = phrase[0]
+        if isinstance(first, frozenset):
+            starts = sorted(i for word in first for i in self.positions.get(word, ()))
+        else:
+            starts = self.positions.get(first)
+        if not starts:
+            return []
+        size = len(phrase)
+        if size == 1:
+            return [i + 1 for i in starts]
+        tokens = self.tokens
+        found = []
+        for i in starts:
+            if i + size > len(tokens):
+                break
+            for k in range(1, size):
+                token = tokens[i + k]
+                word = phrase[k]
+                if not token.spaced or not (token.text == word or (isinstance(word, frozenset) and token.text in word)):
+                    break
+            else:
+                found.append(i + size)
+        return found
+
+    def contains(self, phrase: Phrase) -> bool:
+        return bool(self.occurrences(phrase))
+
+    def after(self, phrase: Phrase, kinds: Tuple[str, ...]) -> Optional[Token]:
+        """The first token of one of ``kinds`` directly following ``phrase``."""
+        for i in self.occurrences(phrase):
+            if i < len(self.tokens):
+                token = self.tokens[i]
+                if token.kind in kinds and token.spaced:
+                    return token
+        return None
+
+    def words_after(self, phrase: Phrase) -> Optional[str]:
+        """The run of words directly following the first ``phrase`` that has one."""
+        tokens = self.tokens
+        for i in self.occurrences(phrase):
+            end = i
+            while end < len(tokens) and tokens[end].kind in WORDS and tokens[end].spaced:
+                end += 1
+            if end > i:
+                return self.text[tokens[i].start:tokens[end - 1].end]
+        return None
+
+    def range_after(self, phrase: Phrase) -> Optional[List[int]]:
+        """``[low, high]`` from "<phrase> <number> and <number>"."""
+        for i in self.occurrences(phrase):
+            span = self.tokens[i:i + 3]
+            if (
+                len(span) == 3
+                and span[0].kind == NUMBER
+                and span[1].text == "and"
+                and span[2].kind == NUMBER
+                and all(token.spaced for token in span)
+            ):
+                return [int(span[0].text), int(span[2].text)]
+        return None
+
+    def entities(self, category: str) -> List[Token]:
+        return [token for token in self.tokens if token.kind == ENTITY and token.category == category]
+
+
+def _merge_entities(tokens: List[Token], values: ValueIndex) -> bool:
+    """
+    Replace each known value spelled by consecutive words with one ENTITY
+    token, longest value first. Returns whether any were.
+    """
+    merged = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.kind not in (KEYWORD, IDENTIFIER) or not values.starts_value(token.text):
+            i += 1
+            continue
+        end = i + 1
+        while end < len(tokens) and end - i < values.max_words and tokens[end].kind in (KEYWORD, IDENTIFIER):
+            end += 1
+        words = [tokens[k].text for k in range(i, end)]
+        for column in ENTITY_COLUMNS:
+            matched = values.match(words, column)
+            if matched:
+                size = matched[0]
+                text = " ".join(words[:size])
+                tokens[i:i + size] = [Token(ENTITY, text, token.start, tokens[i + size - 1].end, column, token.spaced)]
+                merged = True
+                break
+        i += 1
+    return merged
+
+
+def tokenize(query: str, values: Optional[ValueIndex] = None) -> TokenStream:
+    """
+    Split a lowercased query into typed tokens in a single pass; values of
+    the ``ENTITY_COLUMNS`` in ``values`` (default: the bundled ones) become
+    ENTITY tokens.
+    """
+    tokens = []
+    positions = {}
+    offset = 0
+    regex = _TOKEN if "@" in query else _TOKEN_NO_EMAIL
+    for spaces, email, date, number, word, symbol in regex.findall(query):
+        start = offset + len(spaces)
+        if word:
+            kind, text = KEYWORD if word in KEYWORDS else IDENTIFIER, word
+        elif number:
+            kind, text = NUMBER, number
+        elif date:
+            kind, text = DATE, date
+        elif email:
+            kind, text = EMAIL, email
+        else:
+            kind, text = SYMBOL, symbol
+        offset = start + len(text)
+        positions.setdefault(text, []).append(len(tokens))
+        # The first token counts as spaced so a phrase can start the query
+        tokens.append(Token(kind, text, start, offset, None, bool(spaces) or not tokens))
+    values = DEFAULT_VALUES if values is None else values
+    # Most queries name no known value; the distinct words tell in one set test
+    if values.starts_any(positions) and _merge_entities(tokens, values):
+        positions = None
+    return TokenStream(query, tokens, positions)
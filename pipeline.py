@@ -1,54 +1,327 @@
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from parser_agent.parsed_query import ParsedQuery
 from parser_agent.parser import parse_natural_language
 from intent_classifier.classifier import classify_intent
-from schema_mapper.mapper import map_to_schema
-from query_generator.generator import generate_sql
+from schema_mapper.mapper import DEFAULT_CATALOG, map_to_schema
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapping import SchemaMapping
+from schema_mapper.value_index import ValueIndex
+from query_generator import generator
+from query_generator.generator import generate_sql_for
+from query_generator.pagination import DEFAULT_PAGE_SIZE, Page
+import tracing
+from template_cache import TemplateCache, fingerprint
+from translation_cache import TranslationCache, normalize_query
+
+# Identical questions (UI examples, dashboards, retries) skip the whole chain;
+# entries are (sql, intent)
+_cache = TranslationCache()
+# Questions that differ only in numbers, dates, emails or cities share the
+# parse/classify/map work and only regenerate the SQL
+_templates = TemplateCache()
+
+def configure_cache(max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 3600.0):
+    """Replace the translation and template caches; max_entries=0 disables caching."""
+    global _cache, _templates
+    _cache = TranslationCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    _templates = TemplateCache(max_entries=max_entries, ttl=ttl)
+
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters and current size of the translation cache."""
+    return _cache.stats()
+
+def template_cache_stats() -> dict:
+    """Hit/miss counters of the literal-abstracted template cache."""
+    return _templates.stats()
+
+def clear_cache():
+    _cache.clear()
+    _templates.clear()
+    generator.clear_cache()
+
+def nl_to_sql(query: str, use_cache: bool = True, catalog: Optional[SchemaCatalog] = None,
+              values: Optional[ValueIndex] = None) -> str:
+    if tracing.enabled:
+        tracing.emit("pipeline", f"\n🔍 Input Query: {query}", query=query)
+
+    # Translation only depends on the normalized text, so that is both the
+    # cache key and what the chain sees
+    return _translate_key(normalize_query(query), use_cache, catalog, values)[0]
+
+def nl_to_sql_params(query: str, placeholder: str = "?", use_cache: bool = True,
+                     catalog: Optional[SchemaCatalog] = None,
+                     values: Optional[ValueIndex] = None) -> Tuple[str, tuple]:
+    """
+    (SQL, params): the translation with its values bound rather than written
+    in, as ``placeholder`` ("?", "%s" or "$1"; see sql_ast.PLACEHOLDERS for
+    each dialect's). Questions that differ only in their literals get the
+    same text, so a driver can prepare it once and reuse the plan.
+    """
+    if tracing.enabled:
+        tracing.emit("pipeline", f"\n🔍 Input Query: {query}", query=query)
+    return _translate_key(normalize_query(query), use_cache, catalog, values, placeholder)[0]
+
+def nl_to_sql_page(query: str, size: int = DEFAULT_PAGE_SIZE, after=None, placeholder: Optional[str] = None,
+                   use_cache: bool = True, catalog: Optional[SchemaCatalog] = None,
+                   values: Optional[ValueIndex] = None) -> Tuple[object, Optional[str]]:
+    """
+    (SQL, key): the translation reading at most ``size`` rows, starting after
+    the row whose key was ``after``. SQL is (sql, params) with a
+    ``placeholder``, as for nl_to_sql_params. ``key`` is the column the rows
+    are ordered by, whose value in the last row is the next page's
+    ``after``; None when the statement is only capped (grouped, ordered or
+    limited already, or its table has no single-column primary key), or is
+    not a SELECT.
+    """
+    if tracing.enabled:
+        tracing.emit("pipeline", f"\n🔍 Input Query: {query}", query=query)
+    return _translate_key(normalize_query(query), use_cache, catalog, values, placeholder, Page(size, after))[0]
+
+def page_token(query: str, after) -> str:
+    """An opaque token for the page after the row keyed ``after``, valid for ``query`` only."""
+    text = json.dumps([normalize_query(query), after], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+def token_after(token: Optional[str], query: str):
+    """The ``after`` a page_token holds, or None if there is none or it belongs to another query."""
+    if not token:
+        return None
+    try:
+        tokened, after = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    return after if tokened == normalize_query(query) else None
+
+def nl_to_sql_many(queries: List[str], workers: Optional[int] = None, use_cache: bool = True,
+                   catalog: Optional[SchemaCatalog] = None, values: Optional[ValueIndex] = None) -> List[Dict]:
+    """
+    Translate a batch of queries. Returns one dict per input, in input order:
+
+        {"query", "sql", "intent", "cache", "error", "timings": {"translate_ms"}}
+
+    ``cache`` says which cache answered ("translation", "template" or None).
+    A query that fails gets its error message instead of SQL and intent, and
+    the rest of the batch carries on.
+
+    Duplicates (after normalization) are translated once, and queries that
+    differ only in their literals share one parse through the template cache;
+    schema lookups are memoized per noun. ``workers`` > 1 spreads the unique
+    queries over a thread pool.
+    """
+    keys = []
+    errors = {}
+    for index, query in enumerate(queries):
+        try:
+            keys.append(normalize_query(query))
+        except Exception as e:
+            keys.append(None)
+            errors[index] = str(e)
 
-def nl_to_sql(query: str) -> str:
-    print(f"\n🔍 Input Query: {query}")
+    unique = [key for key in dict.fromkeys(keys) if key is not None]
 
+    def translate(key):
+        start = time.perf_counter()
+        try:
+            sql, intent, cache = _translate_key(key, use_cache, catalog, values)
+            error = None
+        except Exception as e:
+            sql = intent = cache = None
+            error = str(e)
+        return sql, intent, cache, error, (time.perf_counter() - start) * 1000
+
+    outcomes = {}
+    if workers and workers > 1 and len(unique) > 1:
+        # Sequentially, the first query of a template builds it before the
+        # others arrive; in parallel, run one per template first so queries
+        # of the same shape don't all miss at once
+        seen_templates = set()
+        first, rest = [], []
+        for key in unique:
+            template = fingerprint(key, values)[0]
+            (rest if template in seen_templates else first).append(key)
+            seen_templates.add(template)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch in (first, rest):
+                outcomes.update(zip(batch, pool.map(translate, batch)))
+    else:
+        for key in unique:
+            outcomes[key] = translate(key)
+
+    results = []
+    for index, (query, key) in enumerate(zip(queries, keys)):
+        if key is None:
+            sql, intent, cache, error, elapsed = None, None, None, errors[index], 0.0
+        else:
+            sql, intent, cache, error, elapsed = outcomes[key]
+        results.append({
+            "query": query,
+            "sql": sql,
+            "intent": intent,
+            "cache": cache,
+            "error": error,
+            "timings": {"translate_ms": round(elapsed, 3)},
+        })
+    return results
+
+def impossible_filters(query: str, catalog: Optional[SchemaCatalog] = None,
+                       values: Optional[ValueIndex] = None) -> List[Tuple[str, str]]:
+    """
+    The equality filters in the translation of ``query`` that no row can
+    match, as (column, value), judged by the columns ``values`` indexes in
+    full or holds Bloom filters for; [] when it can't rule any out. A query
+    with one of these returns nothing, so there is no point running it.
+
+    Translating ``query`` works these out and caches them, so asking after
+    the translation doesn't parse it again (unless caching is off).
+    """
+    if values is None:
+        return []
+    key = normalize_query(query)
+    cache_key = ("impossible", _scope(catalog, values), key)
+    impossible = _cache.get(cache_key)
+    if impossible is None:
+        # Same chain as the translation; its trace was already emitted there
+        with tracing.muted():
+            impossible = _impossible(_prepare(key, catalog, values), catalog, values)
+        _cache.put(cache_key, impossible)
+    if impossible and tracing.enabled:
+        tracing.emit("pipeline", f"🚫 Filters no row can match: {list(impossible)}", impossible=list(impossible))
+    return list(impossible)
+
+def _impossible(prepared: tuple, catalog: Optional[SchemaCatalog], values: ValueIndex) -> Tuple[Tuple[str, str], ...]:
+    """impossible_filters for a prepared (intent, ParsedQuery, SchemaMapping)."""
+    intent, parsed, mapping = prepared
+    if intent not in ("SELECT", "AGGREGATE", "DELETE") or not mapping.tables:
+        return ()
+    table = mapping.tables[0]
+    display_names = (catalog or DEFAULT_CATALOG).display_names
+    impossible = []
+    for key, condition in mapping.filters.items():
+        if isinstance(condition, dict):
+            condition = condition.get("eq")
+        if not isinstance(condition, str):
+            continue
+        column = f"{table}.{display_names.get(key, key)}"
+        if not values.may_contain(condition, column):
+            impossible.append((column, condition))
+    return tuple(impossible)
+
+def _check(key: str, prepared: tuple, catalog: Optional[SchemaCatalog], values: Optional[ValueIndex]) -> None:
+    """Cache impossible_filters for a question while its translation has it prepared."""
+    if values is not None:
+        _cache.put(("impossible", _scope(catalog, values), key), _impossible(prepared, catalog, values))
+
+def _scope(catalog: Optional[SchemaCatalog], values: Optional[ValueIndex]) -> Optional[tuple]:
+    """What cached translations depend on besides the query; None for the bundled defaults."""
+    if catalog is None and values is None:
+        return None
+    return (catalog.fingerprint if catalog is not None else None, values.fingerprint if values is not None else None)
+
+def _translate_key(key: str, use_cache: bool, catalog: Optional[SchemaCatalog] = None,
+                   values: Optional[ValueIndex] = None,
+                   placeholder: Optional[str] = None, page: Optional[Page] = None) -> Tuple[str, str, Optional[str]]:
+    """
+    (SQL, intent, which cache answered) for a normalized query; SQL is as
+    generate_sql returns it for ``placeholder`` and ``page``.
+    """
+    if not use_cache or _cache.max_entries <= 0:
+        # Without a cache to keep them, templates only cost an extra probe parse
+        return _translate(key, catalog, values, placeholder, page) + (None,)
+
+    # Translations depend on the schema and its values, so other catalogs and
+    # value indexes get their own entries; a refreshed index has a new fingerprint
+    scope = _scope(catalog, values)
+    cache_key = key if scope is None else (scope, key)
+    if page is not None:
+        return _translate_page(key, cache_key, catalog, values, placeholder, page)
+    if placeholder is not None:
+        cache_key = (placeholder, cache_key)
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        sql, intent = cached
+        if tracing.enabled:
+            tracing.emit("pipeline", f"⚡ Cached SQL: {sql}", sql=sql, cache="translation")
+        return sql, intent, "translation"
+
+    if scope is None and placeholder is None:
+        sql, intent, from_template = _templates.translate(key, _prepare)
+    else:
+        def generate(*prepared):
+            _check(key, prepared, catalog, values)
+            return generate_sql_for(*prepared, catalog=catalog, values=values, placeholder=placeholder)
+
+        sql, intent, from_template = _templates.translate(
+            key,
+            lambda query: _prepare(query, catalog, values),
+            generate,
+            scope=scope,
+            values=values,
+        )
+    cache = "template" if from_template else None
+    if tracing.enabled:
+        label = "⚡ Template SQL" if from_template else "💡 Generated SQL"
+        tracing.emit("pipeline", f"{label}: {sql}", sql=sql, cache=cache)
+    _cache.put(cache_key, (sql, intent))
+    return sql, intent, cache
+
+def _translate_page(key: str, cache_key, catalog: Optional[SchemaCatalog], values: Optional[ValueIndex],
+                    placeholder: Optional[str], page: Page) -> Tuple[object, str, Optional[str]]:
+    """
+    _translate_key for one page. The cache keeps the question's parse and
+    mapping, not its SQL: every page of it is cut from that one entry
+    after the lookup, so paging through a result doesn't push out others.
+    """
+    cache_key = ("prepared", cache_key)
+    prepared = _cache.get(cache_key)
+    cache = "translation" if prepared is not None else None
+    if prepared is None:
+        prepared = _prepare(key, catalog, values)
+        _cache.put(cache_key, prepared)
+        _check(key, prepared, catalog, values)
+    sql = generate_sql_for(*prepared, catalog=catalog, values=values, placeholder=placeholder, page=page)
+    if tracing.enabled:
+        label = "⚡ Cached SQL" if cache else "💡 Generated SQL"
+        tracing.emit("pipeline", f"{label}: {sql}", sql=sql, cache=cache)
+    return sql, prepared[0], cache
+
+def _translate(query: str, catalog: Optional[SchemaCatalog] = None,
+               values: Optional[ValueIndex] = None, placeholder: Optional[str] = None,
+               page: Optional[Page] = None) -> Tuple[str, str]:
+    intent, parsed, schema = _prepare(query, catalog, values)
+    sql = generate_sql_for(intent, parsed, schema, catalog, values, placeholder, page)
+    if tracing.enabled:
+        tracing.emit("pipeline", f"💡 Generated SQL: {sql}", sql=sql, cache=None)
+
+    return sql, intent
+
+def _prepare(query: str, catalog: Optional[SchemaCatalog] = None,
+             values: Optional[ValueIndex] = None) -> Tuple[str, ParsedQuery, SchemaMapping]:
+    """Run parse -> classify -> map; the result feeds generate_sql_for."""
     # Step 1: Parse the query
-    parsed = parse_natural_language(query)
-    print(f"🧠 Parsed Output: {parsed}")
+    parsed = parse_natural_language(query, values)
+    if tracing.enabled:
+        tracing.emit("pipeline", f"🧠 Parsed Output: {parsed.to_dict()}", parsed=parsed)
 
     # Step 2: Classify intent
     intent = classify_intent(parsed)
-    print(f"🎯 Intent Detected: {intent}")
+    if tracing.enabled:
+        tracing.emit("pipeline", f"🎯 Intent Detected: {intent}", intent=intent)
 
     # Step 3: Map to schema
-    nouns = parsed.get("columns", []) + list(parsed.get("filters", {}).keys())
-    schema = map_to_schema(nouns, parsed)
-    print(f"🗂️ Schema Mapping: {schema}")
-
-    # Step 4: Construct SQL
-    # Pass both filters and function information
-    filters = parsed.get("filters", {})
-    if "function" in parsed:
-        filters["function"] = parsed["function"]
-    
-    # Pass joins information
-    joins = parsed.get("joins", [])
-    
-    # Pass group_by and having information
-    group_by = parsed.get("group_by")
-    having = parsed.get("having", {})
-    
-    # Pass subqueries information
-    subqueries = parsed.get("subqueries", [])
-    
-    # Pass window functions information
-    window_functions = parsed.get("window_functions", [])
-    
-    # Pass CTEs information
-    ctes = parsed.get("ctes", [])
-    
-    # Pass advanced aggregations information
-    advanced_aggregations = parsed.get("advanced_aggregations", [])
-    
-    sql = generate_sql(intent, schema["tables"], schema["columns"], filters, joins, group_by, having, subqueries, window_functions, ctes, advanced_aggregations)
-    print(f"💡 Generated SQL: {sql}")
-
-    return sql
+    nouns = list(parsed.columns) + list(parsed.filters)
+    schema = map_to_schema(nouns, parsed, catalog)
+    if tracing.enabled:
+        shown = {"tables": list(schema.tables), "columns": list(schema.columns)}
+        tracing.emit("pipeline", f"🗂️ Schema Mapping: {shown}", schema=schema)
+
+    return intent, parsed, schema
 
 if __name__ == "__main__":
+    tracing.set_verbose()
     sample_query = "Show employees with rollup"
     nl_to_sql(sample_query)
\ No newline at end of file
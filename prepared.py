@@ -0,0 +1,188 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from schema_mapper.introspection import detect_dialect
+
+# Dialect -> the placeholder the statements run here are written with. Only
+# MySQL differs from sql_ast.PLACEHOLDERS: its prepared cursor takes "?",
+# which, unlike the plain cursor's "%s", needs no %% escaping
+PREPARED_PLACEHOLDERS = {"sqlite": "?", "postgresql": "$1", "mysql": "?"}
+
+
+class PreparedStatements:
+    """
+    Statements prepared once on a connection and executed with new values,
+    keyed by their SQL text; the least recently used past ``max_statements``
+    are released.
+
+    * SQLite: sqlite3 already keeps compiled statements by text (up to
+      ``cached_statements`` per connection), so the text is executed as is.
+    * PostgreSQL: ``PREPARE`` once per text, then ``EXECUTE`` with the values;
+      eviction runs ``DEALLOCATE``.
+    * MySQL: one ``cursor(prepared=True)`` per text, which prepares on the
+      server on first use and reuses it after; eviction closes the cursor.
+
+    Writes and reads alike are committed, so a connection kept open between
+    questions never sits idle inside a transaction.
+
+    One thread at a time uses the connection. ``with statements:`` holds it
+    for a series of calls, such as introspecting ``statements.conn`` and
+    then running a statement on it.
+    """
+
+    def __init__(self, conn, dialect: Optional[str] = None, max_statements: int = 64):
+        self.conn = conn
+        self.dialect = dialect or detect_dialect(conn)
+        self.placeholder = PREPARED_PLACEHOLDERS[self.dialect]
+        self.max_statements = max_statements
+        self._statements = OrderedDict()  # sql -> statement name or cursor
+        # Reentrant, so run() works inside ``with statements:``
+        self._lock = threading.RLock()
+        self._next = 0
+        self.prepares = 0
+        self.executions = 0
+
+    def __len__(self):
+        return len(self._statements)
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+    def run(self, sql: str, params: Sequence = (), max_rows: Optional[int] = None) -> Tuple[Optional[List[str]], list, int]:
+        """
+        Execute ``sql`` (written with ``self.placeholder``) with ``params``:
+        returns (column names, rows, rowcount); column names are None for a
+        statement that returns no rows. At most ``max_rows`` rows are fetched.
+        """
+        sql = sql.strip().rstrip(";")
+        with self._lock:
+            self.executions += 1
+            if self.dialect == "postgresql":
+                return self._run_postgres(sql, tuple(params), max_rows)
+            if self.dialect == "mysql":
+                return self._run_mysql(sql, tuple(params), max_rows)
+            cur = self.conn.cursor()
+            try:
+                cur.execute(sql, tuple(params))
+                return self._finish(cur, max_rows)
+            finally:
+                cur.close()
+
+    def _finish(self, cur, max_rows=None) -> Tuple[Optional[List[str]], list, int]:
+        columns = [desc[0] for desc in cur.description] if cur.description else None
+        rows = []
+        if columns is not None:
+            rows = cur.fetchall() if max_rows is None else cur.fetchmany(max_rows)
+            if self.dialect == "mysql" and max_rows is not None:
+                # MySQL won't run a cursor, or commit, with rows left unread
+                while cur.fetchmany(1000):
+                    pass
+        self.conn.commit()
+        return columns, rows, cur.rowcount
+
+    def _statement(self, sql: str, prepare: Callable[[str], object]):
+        statement = self._statements.get(sql)
+        if statement is not None:
+            self._statements.move_to_end(sql)
+            return statement
+        while len(self._statements) >= max(self.max_statements, 1):
+            self._release(*self._statements.popitem(last=False))
+        statement = prepare(sql)
+        self.prepares += 1
+        self._statements[sql] = statement
+        return statement
+
+    def _run_postgres(self, sql, params, max_rows):
+        cur = self.conn.cursor()
+        try:
+            def prepare(text):
+                self._next += 1
+                name = f"naturalsql_{self._next}"
+                cur.execute(f"PREPARE {name} AS {text}")
+                return name
+
+            name = self._statement(sql, prepare)
+            if params:
+                cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+            else:
+                cur.execute(f"EXECUTE {name}")
+            return self._finish(cur, max_rows)
+        finally:
+            cur.close()
+
+    def _run_mysql(self, sql, params, max_rows):
+        cur = self._statement(sql, lambda text: self.conn.cursor(prepared=True))
+        cur.execute(sql, params)
+        return self._finish(cur, max_rows)
+
+    def _release(self, sql, statement):
+        try:
+            if self.dialect == "postgresql":
+                cur = self.conn.cursor()
+                try:
+                    cur.execute(f"DEALLOCATE {statement}")
+                finally:
+                    cur.close()
+            elif self.dialect == "mysql":
+                statement.close()
+        except Exception:
+            # The statement dies with the connection anyway
+            pass
+
+    def close(self):
+        """Release every statement and close the connection."""
+        with self._lock:
+            if self.dialect == "mysql":
+                for sql, statement in self._statements.items():
+                    self._release(sql, statement)
+            self._statements.clear()
+            self.conn.close()
+
+
+# Connections kept open between questions, so their prepared statements are
+# reused: session key -> PreparedStatements
+_sessions: Dict[Hashable, PreparedStatements] = {}
+_lock = threading.Lock()
+
+
+def session_for(key: Hashable, connect: Callable[[], object], dialect: Optional[str] = None,
+                max_statements: int = 64) -> PreparedStatements:
+    """The open session for ``key``, connecting with ``connect()`` the first time."""
+    with _lock:
+        session = _sessions.get(key)
+    if session is not None:
+        return session
+    session = PreparedStatements(connect(), dialect, max_statements)
+    with _lock:
+        current = _sessions.setdefault(key, session)
+    if current is not session:
+        # Another thread connected first
+        session.close()
+    return current
+
+
+def drop_session(key: Hashable):
+    """Close the session for ``key``, e.g. after an error left its connection unusable."""
+    with _lock:
+        session = _sessions.pop(key, None)
+    if session is not None:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+def close_sessions():
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
@@ -1,350 +1,349 @@
-def generate_sql(intent: str, tables: list[str], columns: list[str], filters: dict = None, joins: list = None, group_by: str = None, having: dict = None, subqueries: list = None, window_functions: list = None, ctes: list = None, advanced_aggregations: list = None) -> str:
+import tracing
+from query_generator import sql_ast
+from query_generator.optimizer import optimize
+from query_generator.pagination import Page, paginate
+from query_generator.sql_ast import (
+    OPERATORS, Between, Compare, Count, Cte, Delete, From, GroupBy, Having, Insert, Join, Raw, Select, Update, Where,
+    Window, render,
+)
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import DEFAULT_CATALOG
+from schema_mapper.value_index import DEFAULT_VALUES, ValueIndex
+from translation_cache import TranslationCache
+
+# The join behind "by department" when the parser asked for none
+_DEPARTMENTS_JOIN = {"type": "INNER", "table": "departments", "on": {"left": "employees.department_id", "right": "departments.id"}}
+
+# Bodies of the CTEs the parser names by type
+CTE_QUERIES = {
+    "high_salary": Select(("*",), From("employees"), Where((Compare("salary", ">", 70000),))),
+    "senior": Select(("*",), From("employees"), Where((Compare("age", ">", 30),))),
+    "junior": Select(("*",), From("employees"), Where((Compare("age", "<=", 30),))),
+    "department_summary": Select(("department_id", "COUNT(*) as emp_count", "AVG(salary) as avg_salary"),
+                                 From("employees"), group_by=GroupBy(("department_id",))),
+}
+# Parser window type -> SQL function
+WINDOW_FUNCTIONS = {"row_number": "ROW_NUMBER", "rank": "RANK", "dense_rank": "DENSE_RANK"}
+GROUPINGS = {"rollup": "ROLLUP", "cube": "CUBE"}
+
+_AVERAGE_SALARY = Raw("(SELECT AVG(salary) FROM employees)")
+_EMPLOYEE_COUNT = Count("employees", "department_id", "departments.id")
+
+
+def _joins(table: str, joins, catalog: SchemaCatalog = None) -> tuple:
+    """
+    The Join nodes that follow ``FROM table`` for the tables named in
+    ``joins``. The catalog's foreign keys decide the path (adding any tables
+    in between) and the ON columns; tables no key reaches keep the join's
+    own condition.
+    """
+    requested = {}
+    for join in joins or ():
+        join_table = join.get("table", "")
+        join_condition = join.get("on", {})
+        if join_table and join_condition and join_condition.get("left", "") and join_condition.get("right", ""):
+            requested.setdefault(join_table, join)
+    if not requested:
+        return ()
+
+    plan = (catalog or DEFAULT_CATALOG).join_planner.plan(table, requested)
+    if plan is None:
+        return tuple(
+            Join(join_table, join["on"]["left"], join["on"]["right"], join.get("type", "INNER"))
+            for join_table, join in requested.items()
+        )
+    return tuple(
+        Join(join_table, left, right, requested.get(join_table, {}).get("type", "INNER"))
+        for join_table, left, right in plan
+    )
+
+
+def _conditions(filters, display_names, values: ValueIndex) -> list:
+    """
+    WHERE conditions for the parsed filters: ``{"gt": 5}``-style dicts become
+    comparisons, plain values equality; known values are spelled the way the
+    database does.
+    """
+    conditions = []
+    for key, condition in (filters or {}).items():
+        # Not a filter: the aggregate function rides along with them
+        if key == "function":
+            continue
+        column = display_names.get(key, key)
+        if isinstance(condition, dict):
+            for op, val in condition.items():
+                if op == "between" and isinstance(val, (list, tuple)) and len(val) == 2:
+                    conditions.append(Between(column, val[0], val[1]))
+                elif op == "like" and isinstance(val, str):
+                    conditions.append(Compare(column, "LIKE", val))
+                elif isinstance(val, str):
+                    conditions.append(Compare(column, OPERATORS.get(op, "="), values.canonical(val, key)))
+                else:
+                    conditions.append(Compare(column, OPERATORS.get(op, "="), val))
+        elif isinstance(condition, str):
+            conditions.append(Compare(column, "=", values.canonical(condition, key)))
+        else:
+            conditions.append(Compare(column, "=", condition))
+    return conditions
+
+
+def _ctes(ctes) -> tuple:
+    nodes = []
+    for cte in ctes or ():
+        if cte["type"] == "with_clause":
+            if cte["query"]:
+                nodes.append(Cte(cte["name"], cte["query"]))
+        elif cte["type"] in CTE_QUERIES:
+            nodes.append(Cte(cte["name"], CTE_QUERIES[cte["type"]]))
+    return tuple(nodes)
+
+
+def _through_ctes(source: From, ctes) -> From:
+    """
+    ``source`` read through the first CTE that filters its table's rows
+    ("high salary employees"), under the table's name so joins still
+    resolve; the optimizer folds the filter back into the statement.
+    """
+    for cte in ctes:
+        query = cte.query
+        if type(query) is Select and query.source.table == source.table and query.where and query.columns == ("*",):
+            return From(cte.name, source.joins, alias=source.table)
+    return source
+
+
+def _grouping(advanced_aggregations):
+    """GROUP BY ROLLUP/CUBE for the first advanced aggregation, if it is one."""
+    for agg in advanced_aggregations or ():
+        grouping = GROUPINGS.get(agg["type"])
+        if grouping is None:
+            return None
+        columns = tuple(agg["columns"])
+        if tracing.enabled:
+            tracing.emit("generator", f"🔍 Advanced Aggregation: {grouping}({', '.join(columns)})")
+        return GroupBy(columns, grouping)
+    return None
+
+
+def build_statement(intent: str, tables: list[str], columns: list[str], filters: dict = None, joins: list = None, group_by: str = None, having: dict = None, subqueries: list = None, window_functions: list = None, ctes: list = None, advanced_aggregations: list = None, catalog: SchemaCatalog = None, values: ValueIndex = None):
+    """
+    The statement node for a translated question (see ``sql_ast``), or
+    None when the intent has no SQL form. Arguments as for ``generate_sql``.
+    """
     if not tables:
         raise ValueError("No table specified for SQL query.")
-    
-    # Generate CTEs if present
-    cte_clause = ""
-    if ctes:
-        cte_definitions = []
-        for cte in ctes:
-            if cte["type"] == "with_clause" and cte["query"]:
-                cte_definitions.append(f"{cte['name']} AS ({cte['query']})")
-            elif cte["type"] == "high_salary":
-                cte_definitions.append(f"{cte['name']} AS (SELECT * FROM employees WHERE salary > 70000)")
-            elif cte["type"] == "senior":
-                cte_definitions.append(f"{cte['name']} AS (SELECT * FROM employees WHERE age > 30)")
-            elif cte["type"] == "junior":
-                cte_definitions.append(f"{cte['name']} AS (SELECT * FROM employees WHERE age <= 30)")
-            elif cte["type"] == "department_summary":
-                cte_definitions.append(f"{cte['name']} AS (SELECT department_id, COUNT(*) as emp_count, AVG(salary) as avg_salary FROM employees GROUP BY department_id)")
-        if cte_definitions:
-            cte_clause = "WITH " + ", ".join(cte_definitions) + " "
-    
-    # Build the main query
-    table = tables[0] if tables else "employees"
-    
+    table = tables[0]
     # Mapping from schema column names to display names
-    display_names = {
-        "department_id": "department"
-    }
-    
-    # Mapping to preserve proper case for cities and other proper nouns
-    proper_case = {
-        "new york": "New York",
-        "london": "London", 
-        "tokyo": "Tokyo",
-        "paris": "Paris",
-        "berlin": "Berlin",
-        "mumbai": "Mumbai",
-        "delhi": "Delhi",
-        "bangalore": "Bangalore",
-        "software engineer": "Software Engineer",
-        "data scientist": "Data Scientist",
-        "product manager": "Product Manager",
-        "sales representative": "Sales Representative",
-        "john": "John",
-        "alice": "Alice",
-        "bob": "Bob",
-        "jane": "Jane",
-        "mike": "Mike",
-        "sarah": "Sarah"
-    }
+    display_names = (catalog or DEFAULT_CATALOG).display_names
+    # Known values (cities, positions, names) are written as the database spells them
+    values = DEFAULT_VALUES if values is None else values
 
     if intent == "SELECT":
-        # Build column clause
-        if not columns:
-            columns = ["*"]
-        
-        # Add window functions to columns if present
-        if window_functions:
-            for window_func in window_functions:
-                if window_func["type"] == "row_number":
-                    columns.append(f"ROW_NUMBER() OVER (ORDER BY {window_func['order_by']} {window_func['order']}) as row_num")
-                elif window_func["type"] == "rank":
-                    columns.append(f"RANK() OVER (ORDER BY {window_func['order_by']} {window_func['order']}) as rank_num")
-                elif window_func["type"] == "dense_rank":
-                    columns.append(f"DENSE_RANK() OVER (ORDER BY {window_func['order_by']} {window_func['order']}) as dense_rank_num")
-        
-        col_clause = ", ".join(columns)
-        
-        # Build the FROM clause with JOINs
-        from_clause = f"FROM {table}"
-        if joins:
-            for join in joins:
-                join_type = join.get("type", "INNER")
-                join_table = join.get("table", "")
-                join_condition = join.get("on", {})
-                if join_table and join_condition:
-                    left_col = join_condition.get("left", "")
-                    right_col = join_condition.get("right", "")
-                    if left_col and right_col:
-                        from_clause += f" {join_type} JOIN {join_table} ON {left_col} = {right_col}"
-        
-        sql = f"{cte_clause}SELECT {col_clause} {from_clause}"
-        
-        where_clauses = []
-        if filters:
-            for key, condition in filters.items():
-                # Skip function key as it's not a filter condition
-                if key == "function":
-                    continue
-                if isinstance(condition, dict):
-                    for op, val in condition.items():
-                        op_map = {"gt": ">", "lt": "<", "eq": "=", "like": "LIKE"}
-                        operator = op_map.get(op, "=")
-                        display_key = display_names.get(key, key)
-                        if op == "between" and isinstance(val, list) and len(val) == 2:
-                            where_clauses.append(f"{display_key} BETWEEN {val[0]} AND {val[1]}")
-                        elif op == "like" and isinstance(val, str):
-                            where_clauses.append(f"{display_key} LIKE '{val}'")
-                        elif isinstance(val, str):
-                            # Apply proper case mapping
-                            proper_val = proper_case.get(val.lower(), val)
-                            where_clauses.append(f"{display_key} {operator} '{proper_val}'")
-                        else:
-                            where_clauses.append(f"{display_key} {operator} {val}")
+        # Window functions add columns; the caller's columns may be a shared
+        # (or immutable) sequence, so build a new one
+        select_cols = list(columns) if columns else ["*"]
+        order_by = limit = None
+        for window_func in window_functions or ():
+            function = WINDOW_FUNCTIONS.get(window_func["type"])
+            if function:
+                select_cols.append(Window(function, window_func["order_by"], window_func["order"]))
+            # The first ordering and limit also order and cut the result
+            if order_by is None and "order_by" in window_func:
+                order_by = (window_func["order_by"], window_func["order"])
+            if limit is None and "limit" in window_func:
+                limit = window_func["limit"]
+
+        source = From(table, _joins(table, joins, catalog) if joins else ())
+        where = _conditions(filters, display_names, values) if filters else []
+        statement_ctes = _ctes(ctes) if ctes else ()
+        for subquery in subqueries or ():
+            op = ">" if subquery.get("operator") == "more than" else "<"
+            if subquery["type"] == "comparison" and subquery["comparison"] == "average":
+                # "more than average" / "less than average"
+                where.append(Compare("salary", op, _AVERAGE_SALARY))
+            elif subquery["type"] == "count":
+                # "with more than X employees"
+                condition = Compare(_EMPLOYEE_COUNT, op, subquery["value"])
+                if table == "employees":
+                    # A question about employees counts them per department,
+                    # so the departments are what is selected
+                    select_cols = ["departments.*"]
+                    source = From("departments")
+                    statement_ctes = ()
+                    where.insert(0, condition)
                 else:
-                    display_key = display_names.get(key, key)
-                    if isinstance(condition, str):
-                        # Apply proper case mapping
-                        proper_val = proper_case.get(condition.lower(), condition)
-                        where_clauses.append(f"{display_key} = '{proper_val}'")
-                    else:
-                        where_clauses.append(f"{display_key} = {condition}")
-
-        # Add subquery conditions
-        if subqueries:
-            for subquery in subqueries:
-                if subquery["type"] == "comparison" and subquery["comparison"] == "average":
-                    # Handle "more than average" or "less than average"
-                    op = ">" if subquery["operator"] == "more than" else "<"
-                    avg_subquery = f"(SELECT AVG(salary) FROM employees)"
-                    where_clauses.append(f"salary {op} {avg_subquery}")
-                elif subquery["type"] == "count":
-                    # Handle "with more than X employees"
-                    op = ">" if subquery["operator"] == "more than" else "<"
-                    count_subquery = f"(SELECT COUNT(*) FROM employees WHERE employees.department_id = departments.id)"
-                    # For count subqueries, we need to select from departments and join with employees
-                    if table == "employees":
-                        # Change the main query to select from departments
-                        sql = f"SELECT departments.* FROM departments WHERE {count_subquery} {op} {subquery['value']}"
-                    else:
-                        where_clauses.append(f"{count_subquery} {op} {subquery['value']}")
-                elif subquery["type"] == "budget":
-                    # Handle budget comparisons
-                    op = subquery["operator"]
-                    val = subquery["value"]
-                    where_clauses.append(f"budget {op} {val}")
-
-        # Add WHERE clause if we have any conditions
-        if where_clauses:
-            sql += " WHERE " + " AND ".join(where_clauses)
-        
-        # Add ORDER BY for window functions
-        if window_functions:
-            for window_func in window_functions:
-                if "order_by" in window_func:
-                    sql += f" ORDER BY {window_func['order_by']} {window_func['order']}"
-                    break
-        
-        # Add LIMIT for TOP/BOTTOM queries
-        if window_functions:
-            for window_func in window_functions:
-                if "limit" in window_func:
-                    sql += f" LIMIT {window_func['limit']}"
-                    break
-        
-        # Add GROUP BY clause
-        if group_by:
-            sql += f" GROUP BY {group_by}"
-        elif advanced_aggregations:
-            for agg in advanced_aggregations:
-                if agg["type"] == "rollup":
-                    columns_str = ", ".join(agg["columns"])
-                    sql += f" GROUP BY ROLLUP({columns_str})"
-                    print(f"🔍 Advanced Aggregation: ROLLUP({columns_str})")
-                elif agg["type"] == "cube":
-                    columns_str = ", ".join(agg["columns"])
-                    sql += f" GROUP BY CUBE({columns_str})"
-                    print(f"🔍 Advanced Aggregation: CUBE({columns_str})")
-                break
-        
-        # Add HAVING clause
+                    where.append(condition)
+            elif subquery["type"] == "budget":
+                where.append(Compare("budget", subquery["operator"], subquery["value"]))
+
+        if statement_ctes:
+            source = _through_ctes(source, statement_ctes)
+        grouping = GroupBy((group_by,)) if group_by else _grouping(advanced_aggregations)
+        having_node = None
         if having and group_by:
-            having_col = having.get("column", "")
-            having_op = having.get("operator", ">")
-            having_val = having.get("value", 0)
-            sql += f" HAVING {having_col} {having_op} {having_val}"
-            
-    elif intent == "AGGREGATE":
+            having_node = Having(having.get("column", ""), having.get("operator", ">"), having.get("value", 0))
+        return Select(tuple(select_cols), source, Where(tuple(where)) if where else None, grouping, having_node,
+                      order_by, limit, statement_ctes)
+
+    if intent == "AGGREGATE":
         # Get the function from the filters, default to AVG
         func = filters.get("function", "AVG").upper() if filters else "AVG"
-        
-        # Build the FROM clause with JOINs
-        from_clause = f"FROM {table}"
-        if joins:
-            for join in joins:
-                join_type = join.get("type", "INNER")
-                join_table = join.get("table", "")
-                join_condition = join.get("on", {})
-                if join_table and join_condition:
-                    left_col = join_condition.get("left", "")
-                    right_col = join_condition.get("right", "")
-                    if left_col and right_col:
-                        from_clause += f" {join_type} JOIN {join_table} ON {left_col} = {right_col}"
-        
-        # Handle GROUP BY queries
-        if group_by:
-            # For GROUP BY, we need to include both the group column and the aggregation
-            if group_by == "departments" or group_by == "department":
-                # Join with departments table to get department names
-                from_clause += " INNER JOIN departments ON employees.department_id = departments.id"
-                if "count(*)" in columns:
-                    select_cols = ["departments.name", "COUNT(*)"]
-                else:
-                    select_cols = ["departments.name", f"{func}(employees.salary)"]
-            else:
-                if "count(*)" in columns:
-                    select_cols = [group_by, "COUNT(*)"]
-                else:
-                    select_cols = [group_by, f"{func}(salary)"]
-            col_clause = ", ".join(select_cols)
+        join_nodes = _joins(table, joins, catalog)
+        grouping = None
+        if group_by in ("departments", "department"):
+            # Grouped by department name, through the departments table
+            join_nodes = _joins(table, list(joins or ()) + [_DEPARTMENTS_JOIN], catalog)
+            select_cols = ("departments.name", "COUNT(*)" if "count(*)" in columns else f"{func}(employees.salary)")
+            grouping = GroupBy(("departments.name",))
+        elif group_by:
+            select_cols = (group_by, "COUNT(*)" if "count(*)" in columns else f"{func}(salary)")
+            grouping = GroupBy((group_by,))
         else:
-            # Regular aggregate query
-            if not columns:
-                columns = ["*"]
-            col_clause = ", ".join([f"{func}({col})" for col in columns])
-        
-        sql = f"{cte_clause}SELECT {col_clause} {from_clause}"
-        
-        where_clauses = []
-        if filters:
-            for key, condition in filters.items():
-                # Skip function key as it's not a filter condition
-                if key == "function":
-                    continue
-                if isinstance(condition, dict):
-                    for op, val in condition.items():
-                        op_map = {"gt": ">", "lt": "<", "eq": "="}
-                        operator = op_map.get(op, "=")
-                        display_key = display_names.get(key, key)
-                        if op == "between" and isinstance(val, list) and len(val) == 2:
-                            where_clauses.append(f"{display_key} BETWEEN {val[0]} AND {val[1]}")
-                        elif isinstance(val, str):
-                            where_clauses.append(f"{display_key} {operator} '{val}'")
-                        else:
-                            where_clauses.append(f"{display_key} {operator} {val}")
-                else:
-                    display_key = display_names.get(key, key)
-                    if isinstance(condition, str):
-                        # Apply proper case mapping
-                        proper_val = proper_case.get(condition.lower(), condition)
-                        where_clauses.append(f"{display_key} = '{proper_val}'")
-                    else:
-                        where_clauses.append(f"{display_key} = {condition}")
-
-
-        
-        # Add GROUP BY clause for aggregate queries
-        if group_by:
-            if group_by == "departments" or group_by == "department":
-                sql += " GROUP BY departments.name"
-            else:
-                sql += f" GROUP BY {group_by}"
-        elif advanced_aggregations:
-            for agg in advanced_aggregations:
-                if agg["type"] == "rollup":
-                    columns_str = ", ".join(agg["columns"])
-                    sql += f" GROUP BY ROLLUP({columns_str})"
-                    print(f"🔍 Advanced Aggregation: ROLLUP({columns_str})")
-                elif agg["type"] == "cube":
-                    columns_str = ", ".join(agg["columns"])
-                    sql += f" GROUP BY CUBE({columns_str})"
-                    print(f"🔍 Advanced Aggregation: CUBE({columns_str})")
-                break
-        
-        # Add HAVING clause
+            select_cols = tuple(f"{func}({col})" for col in columns or ["*"])
+            grouping = _grouping(advanced_aggregations)
+
+        having_node = None
         if having and group_by:
             having_col = having.get("column", "")
-            having_op = having.get("operator", ">")
-            having_val = having.get("value", 0)
-            # For HAVING, we need to reference the aggregated column
+            # HAVING compares the aggregate, not the column
             if having_col == "salary":
                 having_col = f"{func}(employees.salary)"
-            sql += f" HAVING {having_col} {having_op} {having_val}"
-            
-    elif intent == "INSERT":
-        if filters:
-            cols = ", ".join(filters.keys())
-            vals = []
-            for v in filters.values():
-                if isinstance(v, str):
-                    # Preserve email case, apply proper case mapping to others
-                    if '@' in v:  # Email
-                        vals.append(f"'{v}'")
-                    else:
-                        proper_val = proper_case.get(v.lower(), v)
-                        vals.append(f"'{proper_val}'")
-                else:
-                    vals.append(str(v))
-            vals_str = ", ".join(vals)
-            sql = f"INSERT INTO {table} ({cols}) VALUES ({vals_str})"
-        else:
-            sql = f"INSERT INTO {table} (...) VALUES (...);"
-    elif intent == "UPDATE":
-        if filters:
-            set_parts = []
-            where_parts = []
-            for key, value in filters.items():
-                display_key = display_names.get(key, key)
-                if key == "department_id":
-                    where_parts.append(f"{display_key} = '{value}'")
-                elif key == "salary":
-                    # For UPDATE, salary goes in SET clause
-                    val_str = f"'{value}'" if isinstance(value, str) else str(value)
-                    set_parts.append(f"{key} = {val_str}")
-                else:
-                    val_str = f"'{value}'" if isinstance(value, str) else str(value)
-                    set_parts.append(f"{key} = {val_str}")
-            set_clause = "SET " + ", ".join(set_parts) if set_parts else ""
-            where_clause = "WHERE " + " AND ".join(where_parts) if where_parts else ""
-            sql = f"UPDATE {table} {set_clause} {where_clause}".strip()
-        else:
-            sql = f"UPDATE {table} SET ... WHERE ...;"
-    elif intent == "DELETE":
-        sql = f"DELETE FROM {table}"
-        if filters:
-            where_clauses = []
-            for key, condition in filters.items():
-                # Skip function key as it's not a filter condition
-                if key == "function":
-                    continue
-                if isinstance(condition, dict):
-                    for op, val in condition.items():
-                        op_map = {"gt": ">", "lt": "<", "eq": "="}
-                        operator = op_map.get(op, "=")
-                        display_key = display_names.get(key, key)
-                        if op == "between" and isinstance(val, list) and len(val) == 2:
-                            where_clauses.append(f"{display_key} BETWEEN {val[0]} AND {val[1]}")
-                        elif isinstance(val, str):
-                            where_clauses.append(f"{display_key} {operator} '{val}'")
-                        else:
-                            where_clauses.append(f"{display_key} {operator} {val}")
-                else:
-                    display_key = display_names.get(key, key)
-                    if isinstance(condition, str):
-                        # Apply proper case mapping
-                        proper_val = proper_case.get(condition.lower(), condition)
-                        where_clauses.append(f"{display_key} = '{proper_val}'")
-                    else:
-                        where_clauses.append(f"{display_key} = {condition}")
-
-            if where_clauses:
-                sql += " WHERE " + " AND ".join(where_clauses)
+            having_node = Having(having_col, having.get("operator", ">"), having.get("value", 0))
+        where = _conditions(filters, display_names, values)
+        statement_ctes = _ctes(ctes) if ctes else ()
+        source = _through_ctes(From(table, join_nodes), statement_ctes) if statement_ctes else From(table, join_nodes)
+        return Select(select_cols, source, Where(tuple(where)) if where else None, grouping,
+                      having_node, None, None, statement_ctes)
+
+    if intent == "INSERT":
+        if not filters:
+            return None
+        row = []
+        for key, v in filters.items():
+            # Emails keep their case; known values get the database's
+            row.append(values.canonical(v, key) if isinstance(v, str) and "@" not in v else v)
+        return Insert(table, tuple(filters), tuple(row))
+
+    if intent == "UPDATE":
+        if not filters:
+            return None
+        assignments = []
+        where = []
+        for key, value in filters.items():
+            if key == "department_id":
+                # The department picks the rows; everything else is set
+                where.append(Compare(display_names.get(key, key), "=", str(value)))
+            else:
+                assignments.append((key, value))
+        return Update(table, tuple(assignments), Where(tuple(where)) if where else None)
+
+    if intent == "DELETE":
+        where = _conditions(filters, display_names, values)
+        return Delete(table, Where(tuple(where)) if where else None)
+    return None
+
+
+# What generate_sql says when there is no statement to build
+_PLACEHOLDERS = {
+    "INSERT": "INSERT INTO {table} (...) VALUES (...);",
+    "UPDATE": "UPDATE {table} SET ... WHERE ...;",
+}
+
+
+def generate_sql(intent: str, tables: list[str], columns: list[str], filters: dict = None, joins: list = None, group_by: str = None, having: dict = None, subqueries: list = None, window_functions: list = None, ctes: list = None, advanced_aggregations: list = None, catalog: SchemaCatalog = None, values: ValueIndex = None, placeholder: str = None, page: Page = None):
+    """
+    The SQL for a mapped question. With ``placeholder`` ("?", "%s" or "$1",
+    see sql_ast.PLACEHOLDERS) returns ``(sql, params)`` instead, the values
+    bound rather than written into the text.
+
+    With ``page`` (see pagination.Page) a SELECT reads one page of rows, and
+    the result is ``(sql or (sql, params), key)``: ``key`` is the column the
+    rows are ordered by, whose last value starts the next page, or None when
+    the statement could only be capped.
+    """
+    statement = build_statement(intent, tables, columns, filters, joins, group_by, having, subqueries,
+                                window_functions, ctes, advanced_aggregations, catalog, values)
+    if statement is not None:
+        statement = optimize(statement)
+    return _finish(statement, intent, tables[0], catalog, placeholder, page)
+
+def _finish(statement, intent: str, table: str, catalog: SchemaCatalog = None, placeholder: str = None,
+            page: Page = None):
+    """generate_sql's result for an optimized ``statement``, or for None when there is none."""
+    key = None
+    if statement is None:
+        text = _PLACEHOLDERS.get(intent)
+        result = text.format(table=table) if text else "-- Unknown intent;"
+        if placeholder is not None:
+            result = (result, ())
     else:
-        sql = "-- Unknown intent"
+        if page is not None and type(statement) is Select:
+            primary_keys = (catalog or DEFAULT_CATALOG).primary_keys
+            statement, key = paginate(statement, page, primary_keys.get(statement.source.table))
+        if placeholder is None:
+            result = render(statement) + ";"
+        else:
+            sql, params = render(statement, placeholder)
+            result = sql + ";", params
+    return result if page is None else (result, key)
+
+def _arguments(parsed, mapping) -> tuple:
+    """generate_sql's arguments from ``tables`` to ``advanced_aggregations``."""
+    filters = mapping.filters
+    if parsed.function is not None:
+        filters = {**filters, "function": parsed.function}
+    return (mapping.tables, mapping.columns, filters, parsed.joins, parsed.group_by, parsed.having,
+            parsed.subqueries, parsed.window_functions, parsed.ctes, parsed.advanced_aggregations)
+
+
+def _generate_for(intent: str, parsed, mapping, catalog, values, placeholder=None, page=None):
+    return generate_sql(intent, *_arguments(parsed, mapping), catalog, values, placeholder, page)
+
+
+def _statement_for(intent: str, parsed, mapping, catalog, values):
+    statement = build_statement(intent, *_arguments(parsed, mapping), catalog, values)
+    return optimize(statement) if statement is not None else None
+
+
+# ParsedQuery and SchemaMapping are immutable and hash once, so the SQL for
+# a pair is kept. Entries name the catalog and values by fingerprint, not by
+# the objects, so a replaced catalog or refreshed index isn't kept alive
+# here, and its entries are never hit again and age out
+_generated = TranslationCache(max_entries=4096, ttl=None)
+# Cached in place of a statement there is none of
+_NO_STATEMENT = "no statement"
+
+
+def generate_sql_for(intent: str, parsed, mapping, catalog: SchemaCatalog = None, values: ValueIndex = None,
+                     placeholder: str = None, page: Page = None):
+    """generate_sql for a ParsedQuery and the SchemaMapping made from it, memoized."""
+    values = DEFAULT_VALUES if values is None else values
+    if tracing.enabled:
+        # Traced runs build the statement again, so its trace lines are emitted
+        return _generate_for(intent, parsed, mapping, catalog, values, placeholder, page)
+    fingerprints = (catalog.fingerprint if catalog is not None else None, values.fingerprint)
+    if page is not None:
+        # Pages of one question share its optimized statement; each is cut
+        # from it, so no page gets an entry of its own
+        key = (intent, parsed, mapping) + fingerprints
+        statement = _generated.get(key)
+        if statement is None:
+            statement = _statement_for(intent, parsed, mapping, catalog, values)
+            _generated.put(key, _NO_STATEMENT if statement is None else statement)
+        elif statement is _NO_STATEMENT:
+            statement = None
+        return _finish(statement, intent, mapping.tables[0], catalog, placeholder, page)
+    key = (intent, parsed, mapping) + fingerprints + (placeholder,)
+    result = _generated.get(key)
+    if result is None:
+        result = _generate_for(intent, parsed, mapping, catalog, values, placeholder)
+        _generated.put(key, result)
+    return result
+
 
-    return sql + ";"
+def clear_cache():
+    """Drop memoized SQL and rendered fragments."""
+    _generated.clear()
+    sql_ast.clear_cache()
 
 if __name__ == "__main__":
     intent = "SELECT"
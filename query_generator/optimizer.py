@@ -0,0 +1,135 @@
+"""
+Rewrites of a statement tree into one that returns the same rows for less
+work. ``generate_sql`` runs ``optimize`` on every statement it builds, so
+``build_statement`` can describe a question the direct way.
+
+Uncorrelated scalar subqueries, such as ``(SELECT AVG(salary) FROM
+employees)``, are left alone: SQLite, PostgreSQL and MySQL already run
+them once per statement, not once per row.
+"""
+
+import re
+
+from query_generator.sql_ast import Compare, Count, Derived, From, GroupBy, Join, Select, Where, render
+
+
+def _references(statement: Select, name: str) -> int:
+    """How often the rest of ``statement`` (its body and the other CTEs) names the CTE ``name``."""
+    pattern = re.compile(rf"\b{re.escape(name)}\b", re.IGNORECASE)
+    found = len(pattern.findall(render(statement._replace(ctes=()))))
+    for cte in statement.ctes:
+        if cte.name != name:
+            found += len(pattern.findall(cte.query if isinstance(cte.query, str) else render(cte.query)))
+    return found
+
+
+def drop_dead_ctes(statement):
+    """Drop CTEs nothing reads; a database may still compute them, and they only cost."""
+    if type(statement) is not Select or not statement.ctes:
+        return statement
+    ctes = statement.ctes
+    while True:
+        current = statement._replace(ctes=ctes)
+        live = tuple(cte for cte in ctes if _references(current, cte.name))
+        if live == ctes:
+            break
+        # Dropping one can leave another, read only by it, dead too
+        ctes = live
+    return statement if ctes == statement.ctes else statement._replace(ctes=ctes)
+
+
+def _row_filter(query) -> bool:
+    """Whether ``query`` only picks rows of one table: ``SELECT * FROM t WHERE ...``."""
+    return (type(query) is Select and query.columns == ("*",) and not query.source.joins
+            and query.source.alias is None and query.group_by is None and query.having is None
+            and query.order_by is None and query.limit is None and not query.ctes)
+
+
+def inline_ctes(statement):
+    """
+    Fold a CTE that only filters rows, read once as the statement's FROM,
+    into the statement: its table is read directly and its conditions join
+    the WHERE, ahead of the statement's own, where indexes and the planner
+    see them. Every dialect gets the pushdown this way, whether or not it
+    would have materialized the CTE (PostgreSQL before 12 always does).
+
+    A CTE read more than once, or that groups or joins, stays named: SQLite,
+    PostgreSQL 12+ and MySQL 8 compute a CTE read twice only once, which is
+    worth more there than pushing filters into each read.
+    """
+    if type(statement) is not Select or not statement.ctes:
+        return statement
+    source = statement.source
+    for cte in statement.ctes:
+        if cte.name != source.table or not _row_filter(cte.query) or _references(statement, cte.name) != 1:
+            continue
+        body = cte.query
+        table = body.source.table
+        alias = source.alias if source.alias not in (None, table) else None
+        conditions = body.where.conditions if body.where else ()
+        if statement.where:
+            conditions += statement.where.conditions
+        return statement._replace(
+            source=From(table, source.joins, alias),
+            where=Where(conditions) if conditions else None,
+            ctes=tuple(other for other in statement.ctes if other is not cte),
+        )
+    return statement
+
+
+def _empty_passes(op: str, value) -> bool:
+    """Whether ``0 op value`` can hold, i.e. whether rows with nothing to count still match."""
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return True
+    return {">": 0 > value, ">=": 0 >= value, "=": value == 0, "<": 0 < value, "<=": 0 <= value}.get(op, True)
+
+
+def decorrelate(statement):
+    """
+    ``(SELECT COUNT(*) FROM t WHERE t.fk = outer.id) op n`` as a join on ``t``
+    counted once per key: ``JOIN (SELECT fk, COUNT(*) AS row_count FROM t
+    GROUP BY fk) AS t_counts ON t_counts.fk = outer.id``. One pass over ``t``
+    instead of one per outer row. An inner join when rows counting zero can't
+    match; otherwise a left join, with a missing count read as 0.
+    """
+    if type(statement) is not Select or not statement.where:
+        return statement
+    source = statement.source
+    columns = statement.columns
+    if "*" in columns:
+        if source.joins:
+            return statement
+        # The counts joined in would show up in *
+        columns = tuple(f"{source.alias or source.table}.*" if column == "*" else column for column in columns)
+    joins = list(source.joins)
+    conditions = []
+    changed = False
+    for condition in statement.where.conditions:
+        count = condition.column if type(condition) is Compare else None
+        if type(count) is not Count or count.key.partition(".")[0] != (source.alias or source.table):
+            conditions.append(condition)
+            continue
+        alias = f"{count.table}_counts"
+        if any(type(join.table) is Derived and join.table.alias == alias for join in joins):
+            # Two counts of the same table: keep the second as it is
+            conditions.append(condition)
+            continue
+        counted = Select((count.column, "COUNT(*) AS row_count"), From(count.table), group_by=GroupBy((count.column,)))
+        outer = _empty_passes(condition.op, condition.value)
+        joins.append(Join(Derived(counted, alias), f"{alias}.{count.column}", count.key, "LEFT" if outer else "INNER"))
+        column = f"COALESCE({alias}.row_count, 0)" if outer else f"{alias}.row_count"
+        conditions.append(Compare(column, condition.op, condition.value))
+        changed = True
+    if not changed:
+        return statement
+    return statement._replace(columns=columns, source=source._replace(joins=tuple(joins)), where=Where(tuple(conditions)))
+
+
+PASSES = (drop_dead_ctes, inline_ctes, decorrelate)
+
+
+def optimize(statement):
+    """``statement`` with every pass applied, in order."""
+    for rewrite in PASSES:
+        statement = rewrite(statement)
+    return statement
@@ -0,0 +1,59 @@
+"""
+Bounded reads. ``generate_sql(..., page=Page(size, after))`` turns a SELECT
+into one page of rows:
+
+* keyset pagination when the table has a single-column primary key and the
+  statement has no order, limit or grouping of its own: ``WHERE key > after
+  ORDER BY key LIMIT size``. The next page starts after the last key seen,
+  so every page costs one index range scan however deep it is, where
+  ``OFFSET`` re-reads every row before it.
+* otherwise a row cap, ``LIMIT size`` (or the statement's own, if lower).
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+from query_generator.sql_ast import Compare, Select, Where, Window
+
+# Rows per page when the caller doesn't say
+DEFAULT_PAGE_SIZE = 100
+
+
+class Page(NamedTuple):
+    size: int = DEFAULT_PAGE_SIZE
+    # Key of the last row of the previous page; None for the first page
+    after: object = None
+
+
+def _keyset_ready(statement: Select) -> bool:
+    """Whether every row of ``statement`` is a table row, in no order of its own."""
+    if statement.group_by or statement.having or statement.order_by or statement.limit is not None:
+        return False
+    # Aggregates and window functions see the whole table, not a page of it
+    return not any(type(column) is Window or "(" in column for column in statement.columns)
+
+
+def paginate(statement, page: Page, key: Optional[str]) -> Tuple[object, Optional[str]]:
+    """
+    (``statement`` cut to ``page``, the column its rows are keyed by), or
+    (capped statement, None) when it can't be paged by ``key``. Statements
+    other than SELECT are returned as they are.
+    """
+    if type(statement) is not Select:
+        return statement, None
+    if key is None or not _keyset_ready(statement):
+        limit = page.size if statement.limit is None else min(statement.limit, page.size)
+        return statement._replace(limit=limit), None
+
+    source = statement.source
+    column = f"{source.alias or source.table}.{key}"
+    columns = statement.columns
+    reads_key = any(selected in ("*", f"{source.alias or source.table}.*", key, column) for selected in columns)
+    if not reads_key:
+        # The next page starts from the key, so the rows must carry it
+        columns += (column,)
+    conditions = statement.where.conditions if statement.where else ()
+    if page.after is not None:
+        conditions += (Compare(column, ">", page.after),)
+    paged = statement._replace(columns=columns, where=Where(conditions) if conditions else None,
+                               order_by=(column, "ASC"), limit=page.size)
+    return paged, column
@@ -0,0 +1,304 @@
+"""
+A small SQL syntax tree and its renderer.
+
+``generate_sql`` describes each statement with these nodes and ``render``
+turns them into text, so every statement is spelled in one place. Nodes
+are immutable named tuples: cheap to build, hashable, and safe to share.
+Clause nodes that recur across questions (FROM with its joins, window
+columns, CTEs, GROUP BY) are rendered once and then served from a cache.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple, Union
+
+# Filter operators as the parser names them -> SQL
+OPERATORS = {"gt": ">", "lt": "<", "eq": "=", "like": "LIKE"}
+# Window function -> the alias its column gets
+WINDOW_ALIASES = {"ROW_NUMBER": "row_num", "RANK": "rank_num", "DENSE_RANK": "dense_rank_num"}
+
+
+class Raw(NamedTuple):
+    """SQL written out already (a subquery, an aggregate call); rendered as is."""
+    sql: str
+
+
+class Count(NamedTuple):
+    """
+    Rows of ``table`` per row outside: ``(SELECT COUNT(*) FROM table WHERE
+    table.column = key)``, a correlated subquery (see optimizer.decorrelate).
+    """
+    table: str
+    column: str
+    key: str
+
+
+class Compare(NamedTuple):
+    """``column op value``; a str value is quoted, a number or Raw is not."""
+    column: Union[str, Count]
+    op: str
+    value: object
+
+
+class Between(NamedTuple):
+    column: str
+    low: object
+    high: object
+
+
+class Where(NamedTuple):
+    """Conditions joined with AND."""
+    conditions: Tuple[Union[Compare, Between, Raw], ...]
+
+
+class Derived(NamedTuple):
+    """``(query) AS alias``, a subquery joined as a table; its values are written out."""
+    query: "Select"
+    alias: str
+
+
+class Join(NamedTuple):
+    table: Union[str, Derived]
+    left: str
+    right: str
+    type: str = "INNER"
+
+
+class From(NamedTuple):
+    table: str
+    joins: Tuple[Join, ...] = ()
+    # Reads ``table`` under another name, e.g. a CTE as the table it filters
+    alias: Optional[str] = None
+
+
+class GroupBy(NamedTuple):
+    """Plain grouping, or ``ROLLUP`` / ``CUBE`` over the columns."""
+    columns: Tuple[str, ...]
+    grouping: Optional[str] = None
+
+
+class Having(NamedTuple):
+    column: str
+    op: str
+    value: object
+
+
+class Window(NamedTuple):
+    """A ranking column: ``FUNCTION() OVER (ORDER BY order_by order) as alias``."""
+    function: str
+    order_by: str
+    order: str = "ASC"
+    alias: Optional[str] = None
+
+
+class Cte(NamedTuple):
+    """``name AS (query)``; the query is SQL text or a Select."""
+    name: str
+    query: Union[str, "Select"]
+
+
+class Select(NamedTuple):
+    columns: Tuple[Union[str, Window], ...]
+    source: From
+    where: Optional[Where] = None
+    group_by: Optional[GroupBy] = None
+    having: Optional[Having] = None
+    # (column, direction)
+    order_by: Optional[Tuple[str, str]] = None
+    limit: Optional[int] = None
+    ctes: Tuple[Cte, ...] = ()
+
+
+class Insert(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    values: tuple
+
+
+class Update(NamedTuple):
+    table: str
+    # (column, value) pairs
+    assignments: Tuple[Tuple[str, object], ...]
+    where: Optional[Where] = None
+
+
+class Delete(NamedTuple):
+    table: str
+    where: Optional[Where] = None
+
+
+def literal(value) -> str:
+    """``value`` as SQL: strings quoted (quotes doubled), Raw as written, anything else via str."""
+    if isinstance(value, Raw):
+        return value.sql
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+# Dialect -> the placeholder its usual DB-API driver's execute() takes
+# (sqlite3, psycopg's server-side "$1" form, mysql-connector's plain cursor);
+# "$1" numbers them
+PLACEHOLDERS = {"sqlite": "?", "postgresql": "$1", "mysql": "%s"}
+# Stands in for each bound value until the placeholders are known
+_PARAM = "\x00"
+
+
+def _value(value, params) -> str:
+    """A literal written out, or with ``params`` (a list) appended there and left as a slot."""
+    if params is None or type(value) is Raw:
+        return literal(value)
+    params.append(value)
+    return _PARAM
+
+
+def _where(node: Optional[Where], params) -> str:
+    if not node or not node.conditions:
+        return ""
+    return " WHERE " + " AND ".join([_condition(condition, params) for condition in node.conditions])
+
+
+def _condition(node, params) -> str:
+    kind = type(node)
+    if kind is Compare:
+        column = node.column if type(node.column) is str else _fragment(node.column)
+        return f"{column} {node.op} {_value(node.value, params)}"
+    if kind is Between:
+        return f"{node.column} BETWEEN {_value(node.low, params)} AND {_value(node.high, params)}"
+    return node.sql
+
+
+def _from(node: From) -> str:
+    table = node.table if node.alias is None else f"{node.table} AS {node.alias}"
+    return "FROM " + table + "".join(
+        f" {join.type} JOIN {join.table if type(join.table) is str else _fragment(join.table)}"
+        f" ON {join.left} = {join.right}"
+        for join in node.joins
+    )
+
+
+def _count(node: Count) -> str:
+    return f"(SELECT COUNT(*) FROM {node.table} WHERE {node.table}.{node.column} = {node.key})"
+
+
+def _derived(node: Derived) -> str:
+    return f"({_select(node.query, None)}) AS {node.alias}"
+
+
+def _window(node: Window) -> str:
+    alias = node.alias or WINDOW_ALIASES.get(node.function, node.function.lower())
+    return f"{node.function}() OVER (ORDER BY {node.order_by} {node.order}) as {alias}"
+
+
+def _cte(node: Cte, params=None) -> str:
+    query = node.query if isinstance(node.query, str) else _select(node.query, params)
+    return f"{node.name} AS ({query})"
+
+
+def _group_by(node: GroupBy) -> str:
+    columns = ", ".join(node.columns)
+    if node.grouping:
+        return f" GROUP BY {node.grouping}({columns})"
+    return f" GROUP BY {columns}"
+
+
+# Clauses that repeat from question to question; a question's literals
+# live in WHERE, which is cheap to render and not worth caching. Typed,
+# since nodes of different kinds can be equal as tuples
+_fragment = lru_cache(maxsize=4096, typed=True)(lambda node: _FRAGMENTS[type(node)](node))
+_FRAGMENTS = {From: _from, Window: _window, Cte: _cte, GroupBy: _group_by, Count: _count, Derived: _derived}
+
+
+def _select(node: Select, params) -> str:
+    parts = []
+    if node.ctes:
+        # A CTE written as a Select may hold values to bind
+        ctes = [_fragment(cte) if params is None or isinstance(cte.query, str) else _cte(cte, params)
+                for cte in node.ctes]
+        parts.append("WITH " + ", ".join(ctes) + " ")
+    columns = ", ".join([column if type(column) is str else _fragment(column) for column in node.columns])
+    parts.append(f"SELECT {columns} {_fragment(node.source)}")
+    parts.append(_where(node.where, params))
+    if node.group_by:
+        parts.append(_fragment(node.group_by))
+    if node.having:
+        parts.append(f" HAVING {node.having.column} {node.having.op} {_value(node.having.value, params)}")
+    if node.order_by:
+        parts.append(f" ORDER BY {node.order_by[0]} {node.order_by[1]}")
+    # LIMIT stays written out: it is part of the question's shape
+    if node.limit is not None:
+        parts.append(f" LIMIT {node.limit}")
+    return "".join(parts)
+
+
+def _insert(node: Insert, params) -> str:
+    values = ", ".join([_value(value, params) for value in node.values])
+    return f"INSERT INTO {node.table} ({', '.join(node.columns)}) VALUES ({values})"
+
+
+def _update(node: Update, params) -> str:
+    sql = f"UPDATE {node.table}"
+    if node.assignments:
+        sql += " SET " + ", ".join([f"{column} = {_value(value, params)}" for column, value in node.assignments])
+    return sql + _where(node.where, params)
+
+
+def _delete(node: Delete, params) -> str:
+    return f"DELETE FROM {node.table}" + _where(node.where, params)
+
+
+_STATEMENTS = {Select: _select, Insert: _insert, Update: _update, Delete: _delete}
+
+
+def placeholders(sql: str, placeholder: str) -> str:
+    """Fill the value slots of ``sql`` with ``placeholder`` ("?", "%s" or "$1", numbered from 1)."""
+    if placeholder == "$1":
+        pieces = sql.split(_PARAM)
+        return "".join(piece + (f"${index}" if index < len(pieces) else "") for index, piece in enumerate(pieces, 1))
+    if placeholder == "%s":
+        # With parameters, drivers of this style read every % as a format
+        sql = sql.replace("%", "%%")
+    return sql.replace(_PARAM, placeholder)
+
+
+# A placeholder to fill, skipping quoted strings; "%s" SQL has every % doubled
+_SLOTS = {
+    "?": re.compile(r"'(?:[^']|'')*'|\?"),
+    "%s": re.compile(r"%%|%s"),
+    "$1": re.compile(r"'(?:[^']|'')*'|\$(\d+)"),
+}
+
+
+def inline(sql: str, params, placeholder: str) -> str:
+    """The bound ``sql`` with its ``params`` written back in, as ``render`` would without a placeholder."""
+    remaining = iter(params)
+
+    def fill(match):
+        text = match.group(0)
+        if text == "%%":
+            return "%"
+        if text[0] == "'":
+            return text
+        if text[0] == "$":
+            return literal(params[int(match.group(1)) - 1])
+        return literal(next(remaining))
+
+    return _SLOTS[placeholder].sub(fill, sql)
+
+
+def render(node, placeholder: Optional[str] = None):
+    """
+    The SQL text of a statement node, without the closing semicolon. With
+    ``placeholder`` ("?", "%s" or "$1"), the values are left out instead:
+    returns ``(sql, params)``, the values in the order their placeholders
+    appear, so one text serves every question of the same shape.
+    """
+    if placeholder is None:
+        return _STATEMENTS[type(node)](node, None)
+    params = []
+    sql = _STATEMENTS[type(node)](node, params)
+    return placeholders(sql, placeholder), tuple(params)
+
+
+def clear_cache():
+    _fragment.cache_clear()
@@ -0,0 +1,78 @@
+import hashlib
+import math
+from typing import Iterable
+
+
+def optimal_size(capacity: int, fp_rate: float):
+    """(bits, hash functions) for ``capacity`` items at false-positive rate ``fp_rate``."""
+    capacity = max(capacity, 1)
+    bits = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """
+    Set membership in about 1.2 bytes per item at a 1% false-positive rate.
+
+    ``in`` never answers False for an added item, and answers True for an
+    absent one with probability ``fp_rate`` when ``capacity`` items were added.
+    The bits are one bytearray; the k probe positions come from a single
+    128-bit blake2b digest split into two halves (Kirsch-Mitzenmacher double
+    hashing), so a probe costs one hash however small the rate.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        if not 0 < fp_rate < 1:
+            raise ValueError(f"fp_rate must be between 0 and 1, got {fp_rate}")
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.bits, self.hashes = optimal_size(capacity, fp_rate)
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_items(cls, items: Iterable[str], capacity: int, fp_rate: float = 0.01) -> "BloomFilter":
+        bloom = cls(capacity, fp_rate)
+        bloom.update(items)
+        return bloom
+
+    def __repr__(self):
+        return f"BloomFilter({self.count} items, {self.nbytes} bytes, fp_rate={self.fp_rate})"
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        # An odd step visits distinct positions until it wraps
+        second = int.from_bytes(digest[8:], "little") | 1
+        bits = self.bits
+        return [(first + i * second) % bits for i in range(self.hashes)]
+
+    def add(self, item: str):
+        array = self._array
+        for position in self._positions(item):
+            array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def state(self) -> tuple:
+        """The filter as builtins, for ``from_state``."""
+        return self.capacity, self.fp_rate, self.bits, self.hashes, bytes(self._array), self.count
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "BloomFilter":
+        bloom = object.__new__(cls)
+        bloom.capacity, bloom.fp_rate, bloom.bits, bloom.hashes, array, bloom.count = state
+        bloom._array = bytearray(array)
+        return bloom
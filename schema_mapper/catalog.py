@@ -0,0 +1,252 @@
+import hashlib
+import heapq
+import json
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from parser_agent.parsed_query import FrozenDict
+from schema_mapper.embedding import EmbeddingIndex
+from schema_mapper.join_planner import JoinPlanner
+from schema_mapper.ngram_index import TrigramIndex
+from schema_mapper.symspell import SymSpellIndex
+
+
+# What _build_indexes returns, in order; snapshots store their states
+INDEX_TYPES = (TrigramIndex, TrigramIndex, SymSpellIndex, SymSpellIndex, EmbeddingIndex)
+
+# Cosine similarity a column's name or comment needs before the semantic
+# matcher offers it; below this, hashed trigrams mostly share noise
+SEMANTIC_CUTOFF = 0.6
+
+
+class SchemaCatalog:
+    """
+    Everything the mapper and generator need to know about one schema,
+    precomputed once: the tables, a flat column list, a column -> tables
+    index, primary and foreign keys and the join paths over them, term
+    aliases, display names, column comments and the fuzzy-match indexes.
+
+    Immutable; build one per schema with ``SchemaCatalog.from_schema`` and
+    pass it to ``map_to_schema`` / ``generate_sql``. Fuzzy matches are
+    memoized per catalog, so a changed schema never sees stale matches. The
+    match indexes are built on the first fuzzy lookup, not up front.
+    """
+
+    __slots__ = (
+        "schema", "tables", "columns", "column_set", "column_tables", "aliases",
+        "display_names", "comments", "primary_keys", "foreign_keys", "join_planner", "fingerprint", "_indexes", "_match", "_positions",
+    )
+
+    def __init__(self, schema: Mapping[str, List[str]], aliases: Optional[Mapping[str, str]] = None,
+                 display_names: Optional[Mapping[str, str]] = None,
+                 foreign_keys: Iterable[Tuple[str, str, str, str]] = (),
+                 comments: Optional[Mapping[str, str]] = None,
+                 primary_keys: Optional[Mapping[str, str]] = None):
+        schema = FrozenDict({table: tuple(columns) for table, columns in schema.items()})
+        column_tables: Dict[str, List[str]] = {}
+        for table, columns in schema.items():
+            for column in columns:
+                column_tables.setdefault(column, []).append(table)
+
+        values = {
+            "schema": schema,
+            "tables": tuple(schema),
+            # Flat, with duplicates ("id" is in every table), as the matcher sees it
+            "columns": tuple(column for columns in schema.values() for column in columns),
+            "column_set": frozenset(column_tables),
+            "column_tables": FrozenDict({column: tuple(tables) for column, tables in column_tables.items()}),
+            "aliases": FrozenDict(aliases or {}),
+            "display_names": FrozenDict(display_names or {}),
+            # column -> description, from the database's column comments
+            "comments": FrozenDict(comments or {}),
+            # table -> its primary key, for tables keyed by a single column
+            "primary_keys": FrozenDict(primary_keys or {}),
+            # (table, column, referenced table, referenced column)
+            "foreign_keys": tuple(tuple(fk) for fk in foreign_keys),
+        }
+        values["_indexes"] = self._build_indexes
+        content = [[table, list(columns)] for table, columns in schema.items()]
+        if values["foreign_keys"]:
+            content.append([list(fk) for fk in values["foreign_keys"]])
+        if values["comments"]:
+            content.append(sorted(values["comments"].items()))
+        if values["primary_keys"]:
+            content.append(["primary_keys"] + sorted(values["primary_keys"].items()))
+        content = json.dumps(content, separators=(",", ":"))
+        values["fingerprint"] = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+        self._set(values)
+
+    def _set(self, values):
+        values["join_planner"] = JoinPlanner(values["foreign_keys"])
+        # table -> schema order, the tie-break when ranking
+        values["_positions"] = {table: position for position, table in enumerate(values["tables"])}
+        values["_match"] = lru_cache(maxsize=4096)(self._match_uncached)
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_schema(cls, schema: Mapping[str, List[str]], aliases: Optional[Mapping[str, str]] = None,
+                    display_names: Optional[Mapping[str, str]] = None,
+                    foreign_keys: Iterable[Tuple[str, str, str, str]] = (),
+                    comments: Optional[Mapping[str, str]] = None,
+                    primary_keys: Optional[Mapping[str, str]] = None) -> "SchemaCatalog":
+        return cls(schema, aliases, display_names, foreign_keys, comments, primary_keys)
+
+    def state(self) -> dict:
+        """
+        The catalog's contents and derived lookups as plain builtins (dicts,
+        tuples, frozensets), for ``restore`` to reload without rebuilding.
+        """
+        return {
+            "schema": dict(self.schema),
+            "columns": self.columns,
+            "column_set": self.column_set,
+            "column_tables": dict(self.column_tables),
+            "aliases": dict(self.aliases),
+            "display_names": dict(self.display_names),
+            "comments": dict(self.comments),
+            "primary_keys": dict(self.primary_keys),
+            "foreign_keys": self.foreign_keys,
+            "fingerprint": self.fingerprint,
+        }
+
+    @classmethod
+    def restore(cls, state: dict, indexes) -> "SchemaCatalog":
+        """
+        A catalog from ``state()`` output, skipping the derivation and
+        hashing. ``indexes`` is what ``_build_indexes`` returns, or a callable
+        that returns it on the first fuzzy lookup.
+        """
+        catalog = object.__new__(cls)
+        values = {
+            "schema": FrozenDict(state["schema"]),
+            "tables": tuple(state["schema"]),
+            "columns": state["columns"],
+            "column_set": state["column_set"],
+            "column_tables": FrozenDict(state["column_tables"]),
+            "aliases": FrozenDict(state["aliases"]),
+            "display_names": FrozenDict(state["display_names"]),
+            "comments": FrozenDict(state["comments"]),
+            "primary_keys": FrozenDict(state["primary_keys"]),
+            "foreign_keys": state["foreign_keys"],
+            "fingerprint": state["fingerprint"],
+            "_indexes": indexes,
+        }
+        catalog._set(values)
+        return catalog
+
+    def _build_indexes(self) -> tuple:
+        """(table trigrams, column trigrams, table spellings, column spellings, column embeddings)."""
+        # Aliases are spelled like terms but resolve to what they normalize to
+        table_aliases = {alias: term for alias, term in self.aliases.items() if term in self.schema}
+        column_aliases = {alias: term for alias, term in self.aliases.items() if term in self.column_set}
+        return (
+            TrigramIndex(self.tables),
+            TrigramIndex(self.columns),
+            SymSpellIndex(self.tables, table_aliases),
+            # column_tables holds each column name once, in schema order
+            SymSpellIndex(self.column_tables, column_aliases),
+            EmbeddingIndex(self.column_tables, self.comments),
+        )
+
+    @property
+    def table_index(self) -> TrigramIndex:
+        return self._fuzzy_indexes()[0]
+
+    @property
+    def column_index(self) -> TrigramIndex:
+        return self._fuzzy_indexes()[1]
+
+    @property
+    def table_spelling(self) -> SymSpellIndex:
+        return self._fuzzy_indexes()[2]
+
+    @property
+    def column_spelling(self) -> SymSpellIndex:
+        return self._fuzzy_indexes()[3]
+
+    @property
+    def column_semantics(self) -> EmbeddingIndex:
+        return self._fuzzy_indexes()[4]
+
+    def load_indexes(self) -> None:
+        """Build the match indexes (or read them from the snapshot) now, not on the first fuzzy lookup."""
+        self._fuzzy_indexes()
+
+    def index_state(self) -> tuple:
+        """The match indexes as builtins, for ``indexes_from_state``; builds them if needed."""
+        return tuple(index.state() for index in self._fuzzy_indexes())
+
+    @staticmethod
+    def indexes_from_state(states: tuple) -> tuple:
+        return tuple(kind.from_state(state) for kind, state in zip(INDEX_TYPES, states))
+
+    def _fuzzy_indexes(self) -> tuple:
+        indexes = self._indexes
+        if callable(indexes):
+            # Two threads may both build them; either result is the same
+            indexes = indexes()
+            object.__setattr__(self, "_indexes", indexes)
+        return indexes
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"SchemaCatalog({len(self.tables)} tables, {len(self.column_set)} columns, fingerprint={self.fingerprint})"
+
+    def normalize(self, term: str) -> str:
+        term = term.lower()
+        return self.aliases.get(term, term)
+
+    def match_noun(self, noun: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Closest (tables, columns) for one normalized noun, memoized."""
+        return self._match(noun)
+
+    def _match_uncached(self, noun: str):
+        # Misspellings within a couple of edits resolve through SymSpell;
+        # anything further falls back to difflib-style similarity. Columns
+        # not named exactly first try their names and comments by meaning,
+        # so "wages" finds salary's comment before "ages" by spelling
+        table_match = self.table_spelling.lookup(noun, n=1) or self.table_index.get_close_matches(noun, n=1, cutoff=0.6)
+        col_match = (
+            self.column_spelling.lookup(noun, n=2, max_distance=0)
+            or [column for column, _ in self.column_semantics.top(noun, k=2, cutoff=SEMANTIC_CUTOFF)]
+            or self.column_spelling.lookup(noun, n=2)
+            or self.column_index.get_close_matches(noun, n=2, cutoff=0.6)
+        )
+        return tuple(table_match), tuple(col_match)
+
+    def rank_tables(self, columns, preferred: Optional[str] = None, mentioned=(),
+                    limit: Optional[int] = None) -> List[str]:
+        """
+        Tables ordered by how many of ``columns`` they hold, with a bonus of 2
+        for the table the parser named and 1 for each table a noun matched;
+        ties keep schema order. Only those tables can score, so they are found
+        through the column -> tables index and the others are never looked
+        at. With ``limit``, just the best ``limit`` are returned, picked with
+        a heap; tables that scored nothing fill any places left.
+        """
+        positions = self._positions
+        scores: Dict[str, int] = {}
+        for table in mentioned:
+            if table in positions:
+                scores[table] = scores.get(table, 0) + 1
+        for column in columns:
+            for table in self.column_tables.get(column, ()):
+                scores[table] = scores.get(table, 0) + 1
+        if preferred in positions:
+            scores[preferred] = scores.get(preferred, 0) + 2
+
+        key = lambda table: (-scores[table], positions[table])
+        if limit is None or limit >= len(scores):
+            ranked = sorted(scores, key=key)
+        else:
+            ranked = heapq.nsmallest(limit, scores, key=key)
+        wanted = len(self.tables) if limit is None else min(limit, len(self.tables))
+        for table in self.tables:
+            if len(ranked) >= wanted:
+                break
+            if table not in scores:
+                ranked.append(table)
+        return ranked
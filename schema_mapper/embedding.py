@@ -0,0 +1,138 @@
+import heapq
+import math
+import re
+import zlib
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A power of two, so the low bits of a hash pick the slot and the top bit its sign
+DIMENSIONS = 256
+_WORD = re.compile(r"[a-z0-9]+")
+_PHRASES = re.compile(r"[,;\n]+")
+
+
+def features(text: str, dim: int = DIMENSIONS) -> Dict[int, float]:
+    """
+    The hashed vector of ``text`` as {slot: weight}, unit length: every
+    word and the character trigrams of ``<word>``, each hashed to a slot
+    with a +/-1 sign so collisions cancel out rather than pile up.
+    """
+    vector: Dict[int, float] = {}
+    for word in _WORD.findall(text.lower()):
+        padded = f"<{word}>"
+        grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        grams.append("w:" + word)
+        for gram in grams:
+            code = zlib.crc32(gram.encode("utf-8"))
+            slot = code % dim
+            vector[slot] = vector.get(slot, 0.0) + (1.0 if code & 0x80000000 else -1.0)
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {slot: weight / norm for slot, weight in vector.items() if weight}
+
+
+class EmbeddingIndex:
+    """
+    Semantic column lookup: every column name, and each comma-separated
+    phrase of its comment, as a hashed character-trigram vector. With
+    comments, words that share no letters with a column still find it
+    ("pay" -> salary when salary's comment says "pay, wage").
+
+    A term is scored against every vector at once, as cosine similarity, and
+    each column keeps its best phrase. Only the term's non-zero slots (about
+    20 of 256) take part. With NumPy the vectors are the columns of one dense
+    float32 slot-by-vector matrix and a lookup sums just the term's rows of
+    it; without it, an inverted index over the non-zero slots does the same.
+    """
+
+    def __init__(self, columns: Iterable[str], comments: Optional[Mapping[str, str]] = None,
+                 dim: int = DIMENSIONS):
+        comments = comments or {}
+        self.dim = dim
+        self.columns: List[str] = []
+        # Rows starts[i]..starts[i + 1] belong to columns[i]
+        self.starts: List[int] = []
+        self.vectors: List[Tuple[Tuple[int, float], ...]] = []
+        for column in dict.fromkeys(columns):
+            phrases = [column.replace("_", " ")] + _PHRASES.split(comments.get(column, ""))
+            vectors = [tuple(features(phrase, dim).items()) for phrase in phrases if phrase.strip()]
+            vectors = [vector for vector in vectors if vector]
+            if not vectors:
+                continue
+            self.columns.append(column)
+            self.starts.append(len(self.vectors))
+            self.vectors.extend(vectors)
+        self._build()
+
+    def _build(self):
+        self._dense = np is not None
+        if self._dense:
+            # Slot-major, so a term's slots are whole contiguous rows
+            matrix = np.zeros((self.dim, len(self.vectors)), dtype=np.float32)
+            for row, vector in enumerate(self.vectors):
+                for slot, weight in vector:
+                    matrix[slot, row] = weight
+            self._matrix = matrix
+            self._starts = np.asarray(self.starts, dtype=np.intp)
+        else:
+            owners = []
+            for position, start in enumerate(self.starts):
+                end = self.starts[position + 1] if position + 1 < len(self.starts) else len(self.vectors)
+                owners.extend([position] * (end - start))
+            postings: Dict[int, List[Tuple[int, float]]] = {}
+            for row, vector in enumerate(self.vectors):
+                for slot, weight in vector:
+                    postings.setdefault(slot, []).append((row, weight))
+            self._owners = owners
+            self._postings = postings
+
+    def __len__(self):
+        return len(self.columns)
+
+    def state(self) -> tuple:
+        """The index as builtins, for ``from_state``; the matrix is rebuilt from the sparse vectors."""
+        return self.dim, self.columns, self.starts, self.vectors
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "EmbeddingIndex":
+        index = object.__new__(cls)
+        index.dim, index.columns, index.starts, index.vectors = state
+        index._build()
+        return index
+
+    def top(self, term: str, k: int = 3, cutoff: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Up to ``k`` (column, similarity) pairs scoring at least ``cutoff``
+        (and above zero), best first; ties keep column order.
+        """
+        query = features(term, self.dim)
+        if not query or not self.columns or k <= 0:
+            return []
+        if self._dense:
+            slots = np.fromiter(query, dtype=np.intp, count=len(query))
+            weights = np.fromiter(query.values(), dtype=np.float32, count=len(query))
+            best = np.maximum.reduceat(weights @ self._matrix[slots], self._starts)
+            if k < len(best):
+                chosen = np.argpartition(-best, k - 1)[:k]
+            else:
+                chosen = np.arange(len(best))
+            scored = [(float(best[position]), int(position)) for position in chosen]
+        else:
+            sums: Dict[int, float] = {}
+            for slot, weight in query.items():
+                for row, value in self._postings.get(slot, ()):
+                    sums[row] = sums.get(row, 0.0) + weight * value
+            best: Dict[int, float] = {}
+            owners = self._owners
+            for row, score in sums.items():
+                position = owners[row]
+                if score > best.get(position, -1.0):
+                    best[position] = score
+            scored = [(score, position) for position, score in best.items()]
+        scored = heapq.nsmallest(k, ((-score, position) for score, position in scored if score > 0 and score >= cutoff))
+        return [(self.columns[position], round(-score, 6)) for score, position in scored]
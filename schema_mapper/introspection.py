@@ -0,0 +1,563 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import tracing
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import display_names, normalization_map
+from schema_mapper.schema import COLUMN_COMMENTS
+from schema_mapper.snapshot import load_or_build, source_version
+from schema_mapper.bloom import BloomFilter
+from schema_mapper.value_index import ValueIndex, normalize_value
+
+DIALECTS = ("sqlite", "postgresql", "mysql")
+
+# information_schema queries for the server databases; both list the current
+# schema/database only, in declaration order
+_COLUMNS_SQL = {
+    "postgresql": (
+        "SELECT c.table_name, c.column_name FROM information_schema.columns c "
+        "JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name "
+        "WHERE c.table_schema = current_schema() AND t.table_type = 'BASE TABLE' "
+        "ORDER BY c.table_name, c.ordinal_position"
+    ),
+    "mysql": (
+        "SELECT c.table_name, c.column_name FROM information_schema.columns c "
+        "JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name "
+        "WHERE c.table_schema = DATABASE() AND t.table_type = 'BASE TABLE' "
+        "ORDER BY c.table_name, c.ordinal_position"
+    ),
+}
+_FOREIGN_KEYS_SQL = {
+    "postgresql": (
+        "SELECT kcu.table_name, kcu.column_name, ccu.table_name, ccu.column_name "
+        "FROM information_schema.table_constraints tc "
+        "JOIN information_schema.key_column_usage kcu "
+        "ON kcu.constraint_name = tc.constraint_name AND kcu.constraint_schema = tc.constraint_schema "
+        "JOIN information_schema.constraint_column_usage ccu "
+        "ON ccu.constraint_name = tc.constraint_name AND ccu.constraint_schema = tc.constraint_schema "
+        "WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = current_schema() "
+        "ORDER BY kcu.table_name, kcu.ordinal_position"
+    ),
+    "mysql": (
+        "SELECT table_name, column_name, referenced_table_name, referenced_column_name "
+        "FROM information_schema.key_column_usage "
+        "WHERE table_schema = DATABASE() AND referenced_table_name IS NOT NULL "
+        "ORDER BY table_name, ordinal_position"
+    ),
+}
+# (table, column) for every column of a primary key
+_PRIMARY_KEYS_SQL = {
+    "postgresql": (
+        "SELECT kcu.table_name, kcu.column_name FROM information_schema.table_constraints tc "
+        "JOIN information_schema.key_column_usage kcu "
+        "ON kcu.constraint_name = tc.constraint_name AND kcu.constraint_schema = tc.constraint_schema "
+        "WHERE tc.constraint_type = 'PRIMARY KEY' AND tc.table_schema = current_schema() "
+        "ORDER BY kcu.table_name, kcu.ordinal_position"
+    ),
+    "mysql": (
+        "SELECT table_name, column_name FROM information_schema.key_column_usage "
+        "WHERE table_schema = DATABASE() AND constraint_name = 'PRIMARY' "
+        "ORDER BY table_name, ordinal_position"
+    ),
+}
+# Column comments; SQLite has none
+_COMMENTS_SQL = {
+    "postgresql": (
+        "SELECT c.relname, a.attname, d.description FROM pg_description d "
+        "JOIN pg_class c ON c.oid = d.objoid "
+        "JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = d.objsubid "
+        "WHERE c.relnamespace = current_schema()::regnamespace AND c.relkind = 'r' AND d.objsubid > 0 "
+        "ORDER BY c.relname, a.attnum"
+    ),
+    "mysql": (
+        "SELECT table_name, column_name, column_comment FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND column_comment <> '' "
+        "ORDER BY table_name, ordinal_position"
+    ),
+}
+# (table, column) for the text-typed columns, the only ones with values to look up
+_TEXT_COLUMNS_SQL = {
+    "postgresql": (
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND data_type IN ('character varying', 'character', 'text') "
+        "ORDER BY table_name, ordinal_position"
+    ),
+    "mysql": (
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() "
+        "AND data_type IN ('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext', 'enum', 'set') "
+        "ORDER BY table_name, ordinal_position"
+    ),
+}
+# table -> a counter of its writes kept by the server's own statistics, so a
+# change beyond the sampled rows still shows; SQLite keeps none
+_ACTIVITY_SQL = {
+    "postgresql": (
+        "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables "
+        "WHERE schemaname = current_schema()"
+    ),
+    "mysql": (
+        "SELECT table_name, CONCAT_WS('/', table_rows, update_time) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE()"
+    ),
+}
+# A checksum of every (table, column), key constraint column and column
+# comment, computed by the server: one small row instead of the whole
+# catalog, so checking for changes stays cheap
+_VERSION_SQL = {
+    "postgresql": (
+        "SELECT md5("
+        "coalesce((SELECT string_agg(table_name || '.' || column_name, ',' ORDER BY table_name, ordinal_position) "
+        "FROM information_schema.columns WHERE table_schema = current_schema()), '') || '|' || "
+        "coalesce((SELECT string_agg(tc.constraint_type || ':' || kcu.table_name || '.' || kcu.column_name, ',' "
+        "ORDER BY kcu.table_name, kcu.constraint_name, kcu.ordinal_position) "
+        "FROM information_schema.table_constraints tc JOIN information_schema.key_column_usage kcu "
+        "ON kcu.constraint_name = tc.constraint_name AND kcu.constraint_schema = tc.constraint_schema "
+        "WHERE tc.table_schema = current_schema()), '') || '|' || "
+        "coalesce((SELECT string_agg(c.relname || '.' || d.objsubid || ':' || d.description, ',' "
+        "ORDER BY c.relname, d.objsubid) FROM pg_description d JOIN pg_class c ON c.oid = d.objoid "
+        "WHERE c.relnamespace = current_schema()::regnamespace AND c.relkind = 'r'), ''))"
+    ),
+    "mysql": (
+        "SELECT (SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = DATABASE()), "
+        "(SELECT COALESCE(SUM(CRC32(CONCAT_WS('.', table_name, column_name, ordinal_position, column_comment))), 0) "
+        "FROM information_schema.columns WHERE table_schema = DATABASE()), "
+        "(SELECT COALESCE(SUM(CRC32(CONCAT_WS('.', table_name, column_name, constraint_name, ordinal_position, "
+        "referenced_table_name, referenced_column_name))), 0) "
+        "FROM information_schema.key_column_usage WHERE table_schema = DATABASE())"
+    ),
+}
+
+# connection key -> (schema version, catalog)
+_catalogs: Dict[Hashable, Tuple[Hashable, SchemaCatalog]] = {}
+# connection key -> ValueSampler
+_samplers: Dict[Hashable, "ValueSampler"] = {}
+_lock = threading.Lock()
+
+
+def detect_dialect(conn) -> str:
+    """"sqlite", "postgresql" or "mysql" for a DB-API connection."""
+    if isinstance(conn, sqlite3.Connection):
+        return "sqlite"
+    module = type(conn).__module__
+    if module.startswith(("psycopg", "pg8000", "asyncpg")):
+        return "postgresql"
+    if module.startswith(("mysql", "pymysql", "MySQLdb")):
+        return "mysql"
+    raise ValueError(f"Cannot tell the SQL dialect of {type(conn).__name__}; pass dialect=")
+
+
+def _rows(conn, sql: str) -> List[tuple]:
+    cur = conn.cursor()
+    try:
+        cur.execute(sql)
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+def _quote(name: str, dialect: str = "sqlite") -> str:
+    if dialect == "mysql":
+        return "`" + name.replace("`", "``") + "`"
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sqlite_key(conn, table: str) -> List[str]:
+    """The primary key columns of a SQLite table, in key order."""
+    # table_info's pk is the column's position in the key, 0 if not in it
+    rows = [row for row in _rows(conn, f"PRAGMA table_info({_quote(table)})") if row[5]]
+    return [row[1] for row in sorted(rows, key=lambda row: row[5])]
+
+
+def read_schema(conn, dialect: Optional[str] = None) -> Tuple[Dict[str, List[str]], List[Tuple[str, str, str, str]]]:
+    """
+    The tables and columns of the database behind ``conn``, and its foreign
+    keys as (table, column, referenced table, referenced column).
+    """
+    dialect = dialect or detect_dialect(conn)
+    schema: Dict[str, List[str]] = {}
+    foreign_keys = []
+    if dialect == "sqlite":
+        tables = _rows(conn, "SELECT name FROM sqlite_master WHERE type = 'table' "
+                             "AND name NOT LIKE 'sqlite_%' ORDER BY rowid")
+        for (table,) in tables:
+            # table_info rows: cid, name, type, notnull, default, pk
+            schema[table] = [row[1] for row in _rows(conn, f"PRAGMA table_info({_quote(table)})")]
+            # foreign_key_list rows: id, seq, table, from, to, ...; "to" is
+            # NULL when the key references the parent's primary key
+            for row in _rows(conn, f"PRAGMA foreign_key_list({_quote(table)})"):
+                referenced = row[4]
+                if referenced is None:
+                    parent_key = _sqlite_key(conn, row[2])
+                    if row[1] >= len(parent_key):
+                        # No such parent key; there is nothing to join on
+                        continue
+                    referenced = parent_key[row[1]]
+                foreign_keys.append((table, row[3], row[2], referenced))
+    elif dialect in _COLUMNS_SQL:
+        for table, column in _rows(conn, _COLUMNS_SQL[dialect]):
+            schema.setdefault(table, []).append(column)
+        foreign_keys = [tuple(row) for row in _rows(conn, _FOREIGN_KEYS_SQL[dialect])]
+    else:
+        raise ValueError(f"Unsupported dialect: {dialect}")
+    return schema, foreign_keys
+
+
+def read_comments(conn, dialect: Optional[str] = None) -> Dict[str, str]:
+    """
+    Column comments as column -> text, on top of the bundled ones; a column
+    name commented in several tables gets all of their comments.
+    """
+    dialect = dialect or detect_dialect(conn)
+    comments = dict(COLUMN_COMMENTS)
+    if dialect in _COMMENTS_SQL:
+        for _, column, text in _rows(conn, _COMMENTS_SQL[dialect]):
+            comments[column] = f"{comments[column]}, {text}" if column in comments else text
+    return comments
+
+
+def read_primary_keys(conn, dialect: Optional[str] = None) -> Dict[str, str]:
+    """table -> primary key column, for tables whose primary key is a single column."""
+    dialect = dialect or detect_dialect(conn)
+    columns: Dict[str, List[str]] = {}
+    if dialect == "sqlite":
+        tables = _rows(conn, "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        for (table,) in tables:
+            key = _sqlite_key(conn, table)
+            if key:
+                columns[table] = key
+    elif dialect in _PRIMARY_KEYS_SQL:
+        for table, column in _rows(conn, _PRIMARY_KEYS_SQL[dialect]):
+            columns.setdefault(table, []).append(column)
+    else:
+        raise ValueError(f"Unsupported dialect: {dialect}")
+    return {table: key[0] for table, key in columns.items() if len(key) == 1}
+
+
+def schema_version(conn, dialect: Optional[str] = None) -> Hashable:
+    """
+    A cheap token that changes whenever the schema does: SQLite's
+    ``PRAGMA schema_version`` counter, or a server-side checksum of the
+    columns, key constraints and column comments.
+    """
+    dialect = dialect or detect_dialect(conn)
+    if dialect == "sqlite":
+        return _rows(conn, "PRAGMA schema_version")[0][0]
+    if dialect in _VERSION_SQL:
+        return tuple(_rows(conn, _VERSION_SQL[dialect])[0])
+    raise ValueError(f"Unsupported dialect: {dialect}")
+
+
+def connection_key(conn, dialect: Optional[str] = None) -> Hashable:
+    """
+    Identifies the database behind ``conn``: the file of a SQLite database,
+    the DSN of a PostgreSQL one, host/port/database for MySQL. Connections to
+    the same database share one cached catalog.
+    """
+    dialect = dialect or detect_dialect(conn)
+    if dialect == "sqlite":
+        path = next((row[2] for row in _rows(conn, "PRAGMA database_list") if row[1] == "main"), "")
+        # In-memory databases are private to their connection
+        return ("sqlite", path or id(conn))
+    if dialect == "postgresql" and getattr(conn, "dsn", None):
+        return ("postgresql", hashlib.sha1(conn.dsn.encode("utf-8")).hexdigest())
+    if dialect == "mysql" and getattr(conn, "database", None):
+        return ("mysql", getattr(conn, "server_host", None), getattr(conn, "server_port", None), conn.database)
+    return (dialect, id(conn))
+
+
+def introspect(conn, dialect: Optional[str] = None) -> SchemaCatalog:
+    """Build a fresh catalog from the live schema, keys and column comments, with the bundled aliases."""
+    schema, foreign_keys = read_schema(conn, dialect)
+    comments = read_comments(conn, dialect)
+    primary_keys = read_primary_keys(conn, dialect)
+    return SchemaCatalog.from_schema(schema, normalization_map, display_names, foreign_keys, comments, primary_keys)
+
+
+def catalog_for(conn, dialect: Optional[str] = None, key: Optional[Hashable] = None,
+                snapshot: Optional[str] = None) -> SchemaCatalog:
+    """
+    The catalog of the database behind ``conn``, introspected once per
+    database and reused until its schema version changes. ``key`` overrides
+    the connection key, for databases whose address doesn't identify them
+    (such as a reused temporary file).
+
+    With ``snapshot`` (a file path), a cache miss first tries the snapshot
+    there and only introspects, then rewrites it, when it is out of date.
+    """
+    dialect = dialect or detect_dialect(conn)
+    key = key if key is not None else connection_key(conn, dialect)
+    version = schema_version(conn, dialect)
+    with _lock:
+        cached = _catalogs.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    if snapshot:
+        token = source_version(dialect, version, normalization_map, display_names, COLUMN_COMMENTS)
+        catalog = load_or_build(snapshot, token, lambda: introspect(conn, dialect))
+    else:
+        catalog = introspect(conn, dialect)
+    # Unchanged content keeps the old catalog, and with it the warm match memo
+    if cached is not None and cached[1].fingerprint == catalog.fingerprint:
+        catalog = cached[1]
+    if tracing.enabled:
+        tracing.emit("schema", f"🔎 Introspected {dialect} schema: {catalog}", catalog=catalog, version=version)
+    with _lock:
+        _catalogs[key] = (version, catalog)
+    return catalog
+
+
+def clear_catalogs():
+    with _lock:
+        _catalogs.clear()
+        _samplers.clear()
+
+
+def read_text_columns(conn, schema: Mapping[str, Sequence[str]], dialect: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    table -> its columns of ``schema`` declared as text (CHAR, VARCHAR, TEXT
+    and the like; in SQLite, any type with TEXT affinity).
+    """
+    dialect = dialect or detect_dialect(conn)
+    text: Dict[str, List[str]] = {}
+    if dialect == "sqlite":
+        for table in schema:
+            for row in _rows(conn, f"PRAGMA table_info({_quote(table)})"):
+                if any(word in (row[2] or "").upper() for word in ("CHAR", "CLOB", "TEXT")):
+                    text.setdefault(table, []).append(row[1])
+    elif dialect in _TEXT_COLUMNS_SQL:
+        for table, column in _rows(conn, _TEXT_COLUMNS_SQL[dialect]):
+            if column in schema.get(table, ()):
+                text.setdefault(table, []).append(column)
+    else:
+        raise ValueError(f"Unsupported dialect: {dialect}")
+    return text
+
+
+def column_signatures(conn, schema: Mapping[str, Sequence[str]], dialect: str,
+                      sample_rows: int = 10_000) -> Dict[str, tuple]:
+    """
+    "table.column" -> (rows, distinct values, min, max, table activity) for
+    every column of ``schema``, from one aggregate query per table over at
+    most its first ``sample_rows`` rows. ``rows`` below ``sample_rows``
+    means the whole table was read. Table activity is the server's write
+    counter for the table, when it keeps one, so writes past the sampled rows
+    change the signature too. Two equal signatures almost always mean
+    unchanged values, so a refresh compares these instead of the values.
+    """
+    activity = dict(_rows(conn, _ACTIVITY_SQL[dialect])) if dialect in _ACTIVITY_SQL else {}
+    signatures = {}
+    for table, columns in schema.items():
+        if not columns:
+            continue
+        quoted = [_quote(column, dialect) for column in columns]
+        aggregates = ", ".join(f"COUNT(DISTINCT {name}), MIN({name}), MAX({name})" for name in quoted)
+        row = _rows(conn, f"SELECT COUNT(*), {aggregates} FROM "
+                          f"(SELECT {', '.join(quoted)} FROM {_quote(table, dialect)} LIMIT {sample_rows}) AS sample")[0]
+        for i, column in enumerate(columns):
+            signatures[f"{table}.{column}"] = (row[0],) + tuple(row[1 + 3 * i:4 + 3 * i]) + (activity.get(table),)
+    return signatures
+
+
+class ValueSampler:
+    """
+    Keeps a ValueIndex in step with the data of a live database.
+
+    Only text-typed columns are read, and a refresh only reads the first
+    ``sample_rows`` rows of each table. A text column is indexed when it has
+    at most ``max_values`` distinct values and either its table is that small
+    (a lookup table such as departments) or its values repeat (distinct /
+    rows no more than ``max_ratio``). That picks cities, positions, statuses
+    and department names and skips names, emails and free text of the large
+    tables. Those get a Bloom filter at ``fp_rate`` instead, up to
+    ``max_filter_values`` distinct values, so filters on them can still be
+    ruled out.
+
+    A refresh only builds what the sample covers. In a table larger than
+    the sample, a column indexed from the sampled rows may be missing
+    values, so it isn't used to rule any out, and a column that needs a
+    filter gets none yet. Both stay ``pending`` until ``read_pending`` reads
+    them in full, capped at ``max_values`` + 1 and ``max_filter_values`` + 1
+    distinct values; ``refresh_in_background`` does that off the request
+    path, and a job can call it offline.
+
+    Each refresh compares per-column signatures (see ``column_signatures``)
+    with the last ones and re-reads only the columns whose signature changed.
+    """
+
+    def __init__(self, schema: Mapping[str, Sequence[str]], dialect: str, max_values: int = 200,
+                 max_ratio: float = 0.5, max_filter_values: int = 1_000_000, fp_rate: float = 0.01,
+                 sample_rows: int = 10_000):
+        self.schema = schema
+        self.dialect = dialect
+        self.max_values = max_values
+        self.max_ratio = max_ratio
+        self.max_filter_values = max_filter_values
+        self.fp_rate = fp_rate
+        self.sample_rows = sample_rows
+        self.index = ValueIndex()
+        self.refreshed_at: Optional[float] = None
+        # Indexed from a sample of a larger table, waiting for ``read_pending``
+        self.pending: Set[str] = set()
+        self._text_columns: Optional[Dict[str, List[str]]] = None
+        self._signatures: Dict[str, tuple] = {}
+        self._refreshing = threading.Lock()
+
+    def _wanted(self, signature: tuple) -> bool:
+        rows, distinct = signature[:2]
+        if not 0 < distinct <= self.max_values:
+            return False
+        # A sample as small as max_values says nothing of the table's size
+        small = rows <= self.max_values and rows < self.sample_rows
+        return small or distinct <= rows * self.max_ratio
+
+    def _distinct(self, conn, name: str, limit: Optional[int] = None, sample: Optional[int] = None):
+        """
+        Yield the distinct non-NULL values of ``name`` ("table.column"),
+        fetched in batches; only of its table's first ``sample`` rows if given.
+        """
+        table, column = name.split(".", 1)
+        quoted = _quote(column, self.dialect)
+        source = _quote(table, self.dialect)
+        if sample is not None:
+            source = f"(SELECT {quoted} FROM {source} LIMIT {sample}) AS sample"
+        sql = f"SELECT DISTINCT {quoted} FROM {source} WHERE {quoted} IS NOT NULL"
+        if limit is not None:
+            sql += f" LIMIT {limit}"
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            while True:
+                rows = cur.fetchmany(10000)
+                if not rows:
+                    break
+                for (value,) in rows:
+                    yield value
+        finally:
+            cur.close()
+
+    def refresh(self, conn) -> List[str]:
+        """Re-read the columns whose data changed; returns their names."""
+        if self._text_columns is None:
+            self._text_columns = read_text_columns(conn, self.schema, self.dialect)
+        signatures = column_signatures(conn, self._text_columns, self.dialect, self.sample_rows)
+        changed = [name for name, signature in signatures.items() if self._signatures.get(name) != signature]
+        values = {}
+        sampled = {}
+        filters = {}
+        for name in changed:
+            signature = signatures[name]
+            self.pending.discard(name)
+            # MIN() of a text column holding numbers isn't text; those aren't values to look up
+            text = isinstance(signature[2], str)
+            whole = signature[0] < self.sample_rows
+            if text and self._wanted(signature):
+                if whole:
+                    values[name] = list(self._distinct(conn, name, self.max_values))
+                else:
+                    sampled[name] = list(self._distinct(conn, name, self.max_values, self.sample_rows))
+                    self.pending.add(name)
+            elif text and whole and signature[1] <= self.max_filter_values:
+                # The sample is the whole table, so its distinct count is exact
+                filters[name] = self._filter(self._distinct(conn, name), signature[1])
+            elif text and not whole:
+                self.pending.add(name)
+            if name in self.index and name not in values and name not in sampled:
+                values[name] = ()
+            if name in self.index.filters() and name not in filters:
+                filters[name] = None
+        if values or filters:
+            self.index.update(values, complete=True, filters=filters)
+        if sampled:
+            self.index.update(sampled)
+        self._signatures = signatures
+        self.refreshed_at = time.monotonic()
+        return changed
+
+    def _filter(self, values, capacity: int) -> BloomFilter:
+        return BloomFilter.from_items((normalize_value(str(value)) for value in values), capacity, self.fp_rate)
+
+    def read_pending(self, conn) -> List[str]:
+        """
+        Read the columns only seen through a sample in full: those with at
+        most ``max_values`` values become complete, the others get a Bloom
+        filter if they have at most ``max_filter_values``. Returns the
+        columns read.
+        """
+        done = sorted(self.pending)
+        values = {}
+        filters = {}
+        for name in done:
+            if name in self.index.columns():
+                found = list(self._distinct(conn, name, self.max_values + 1))
+                if len(found) <= self.max_values:
+                    values[name] = found
+                    continue
+                # With more, the sampled values stay as they are: good for
+                # recognizing a value, not for ruling one out
+            found = [normalize_value(str(value)) for value in self._distinct(conn, name, self.max_filter_values + 1)]
+            if len(found) <= self.max_filter_values:
+                filters[name] = BloomFilter.from_items(found, len(found), self.fp_rate)
+        self.pending.difference_update(done)
+        if values or filters:
+            self.index.update(values, complete=True, filters=filters)
+        return done
+
+    def refresh_in_background(self, connect) -> bool:
+        """
+        Refresh on a new thread over its own ``connect()`` connection, unless
+        a refresh is already running; readers keep the current values meanwhile.
+        """
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                conn = connect()
+                try:
+                    self.refresh(conn)
+                    self.read_pending(conn)
+                finally:
+                    conn.close()
+            except Exception as e:
+                # The old values stay in use; the next request tries again
+                if tracing.enabled:
+                    tracing.emit("schema", f"⚠️ Value refresh failed: {e}", error=e)
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name="value-refresh", daemon=True).start()
+        return True
+
+
+def values_for(conn, catalog: SchemaCatalog, dialect: Optional[str] = None, key: Optional[Hashable] = None,
+               max_age: float = 300.0, connect=None) -> ValueIndex:
+    """
+    The known values of the database behind ``conn``: sampled on first use,
+    then refreshed (re-reading only the changed columns) once ``max_age``
+    seconds old. A refresh reads a bounded sample of each table's text
+    columns. With ``connect``, a function opening another connection to the
+    same database, later refreshes, and the full reads of columns only seen
+    in a sample, run in the background instead of holding up the caller. A
+    new ``catalog`` for the same database starts over.
+    """
+    dialect = dialect or detect_dialect(conn)
+    key = key if key is not None else connection_key(conn, dialect)
+    with _lock:
+        sampler = _samplers.get(key)
+        if sampler is None or sampler.schema is not catalog.schema:
+            sampler = _samplers[key] = ValueSampler(catalog.schema, dialect)
+    if sampler.refreshed_at is None or (connect is None and time.monotonic() - sampler.refreshed_at > max_age):
+        changed = sampler.refresh(conn)
+        if tracing.enabled:
+            tracing.emit("schema", f"🔎 Sampled {len(changed)} changed columns: {sampler.index}",
+                         values=sampler.index, changed=changed)
+        if sampler.pending and connect is not None:
+            sampler.refresh_in_background(connect)
+    elif time.monotonic() - sampler.refreshed_at > max_age:
+        sampler.refresh_in_background(connect)
+    return sampler.index
@@ -0,0 +1,109 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# One join in a plan: (table to join, column on the tables joined so far,
+# column on the new table), columns qualified as "table.column"
+Join = Tuple[str, str, str]
+
+
+class JoinPlanner:
+    """
+    Join paths over a schema's foreign keys.
+
+    Tables are nodes and each foreign key is an edge, usable in either
+    direction. Shortest paths are found by breadth-first search, once per
+    source table and only when first needed; later plans reuse them. ``plan``
+    connects a set of tables with as few joins as possible when there are at
+    most three of them, which is what questions ask: the tree meets at the
+    table closest to all three in total. Larger sets attach the closest
+    remaining table to the tree each time (the usual Steiner tree heuristic).
+    """
+
+    def __init__(self, foreign_keys: Iterable[Tuple[str, str, str, str]]):
+        # table -> [(neighbour, column on table, column on neighbour)], in
+        # declaration order so ties always resolve the same way
+        self._edges: Dict[str, List[Tuple[str, str, str]]] = {}
+        for table, column, ref_table, ref_column in foreign_keys:
+            if table == ref_table:
+                continue
+            self._edges.setdefault(table, []).append((ref_table, column, ref_column))
+            self._edges.setdefault(ref_table, []).append((table, ref_column, column))
+        self._paths = lru_cache(maxsize=None)(self._shortest_paths)
+        self._plans = lru_cache(maxsize=1024)(self._plan)
+
+    def __bool__(self):
+        return bool(self._edges)
+
+    def _shortest_paths(self, source: str) -> Dict[str, Tuple[str, str, str]]:
+        """BFS tree from ``source``: table -> (previous table, its column, this table's column)."""
+        parents = {source: None}
+        queue = deque([source])
+        while queue:
+            table = queue.popleft()
+            for neighbour, column, neighbour_column in self._edges.get(table, ()):
+                if neighbour not in parents:
+                    parents[neighbour] = (table, column, neighbour_column)
+                    queue.append(neighbour)
+        return parents
+
+    def path(self, source: str, target: str) -> Optional[List[Join]]:
+        """The joins that lead from ``source`` to ``target``, or None if no keys connect them."""
+        parents = self._paths(source)
+        if target not in parents:
+            return None
+        joins = []
+        table = target
+        while parents[table] is not None:
+            previous, column, table_column = parents[table]
+            joins.append((table, f"{previous}.{column}", f"{table}.{table_column}"))
+            table = previous
+        return joins[::-1]
+
+    def plan(self, root: str, tables: Iterable[str]) -> Optional[Tuple[Join, ...]]:
+        """
+        Joins connecting ``root`` to every table in ``tables``, in the order
+        to write them after ``FROM root``; None if some table can't be reached.
+        """
+        return self._plans(root, frozenset(tables))
+
+    def _depths(self, source: str) -> Dict[str, int]:
+        """Joins needed to reach each table from ``source``."""
+        depths = {}
+        # The BFS tree lists each table after its previous one
+        for table, parent in self._paths(source).items():
+            depths[table] = 0 if parent is None else depths[parent[0]] + 1
+        return depths
+
+    def _plan(self, root: str, tables: FrozenSet[str]) -> Optional[Tuple[Join, ...]]:
+        joined = [root]
+        joins: List[Join] = []
+        remaining = [table for table in sorted(tables) if table != root]
+        if len(remaining) == 2:
+            # Three tables: the shortest paths from the best meeting table
+            depths = [self._depths(table) for table in [root] + remaining]
+            meets = [table for table in depths[0] if all(table in depth for depth in depths[1:])]
+            if not meets:
+                return None
+            meet = min(meets, key=lambda table: sum(depth[table] for depth in depths))
+            paths = [self.path(root, meet)] + [self.path(meet, table) for table in remaining]
+            for join in (join for path in paths for join in path):
+                if join[0] not in joined:
+                    joined.append(join[0])
+                    joins.append(join)
+            return tuple(joins)
+        while remaining:
+            best = None
+            for target in remaining:
+                for start in joined:
+                    path = self.path(start, target)
+                    if path is not None and (best is None or len(path) < len(best)):
+                        best = path
+            if best is None:
+                return None
+            for join in best:
+                if join[0] not in joined:
+                    joined.append(join[0])
+                    joins.append(join)
+            remaining = [table for table in remaining if table not in joined]
+        return tuple(joins)
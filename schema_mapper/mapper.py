@@ -1,5 +1,9 @@
-import difflib
-from schema_mapper.schema import SCHEMA
+import os
+
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapping import SchemaMapping
+from schema_mapper.schema import COLUMN_COMMENTS, FOREIGN_KEYS, PRIMARY_KEYS, SCHEMA
+from schema_mapper.snapshot import load_snapshot, source_version
 
 normalization_map = {
     "the salaries": "salary",
@@ -22,62 +26,61 @@ normalization_map = {
     "statuses": "status"
 }
 
+# Schema column -> the name used in generated SQL
+display_names = {
+    "department_id": "department"
+}
+
 def normalize(term):
     return normalization_map.get(term.lower(), term.lower())
 
-def map_to_schema(nouns: list[str], parsed_data=None) -> dict:
-    if parsed_data:
-        if "columns" in parsed_data:
-            parsed_data["columns"] = [normalize(col) for col in parsed_data["columns"]]
-        if "filters" in parsed_data:
-            parsed_data["filters"] = {
-                normalize(k): v for k, v in parsed_data["filters"].items()
-            }
-        # Filter out keys in filters that are not in schema columns
-        if "filters" in parsed_data:
-            valid_columns = set(sum(SCHEMA.values(), []))
-            parsed_data["filters"] = {
-                k: v for k, v in parsed_data["filters"].items() if k in valid_columns
-            }
+# Written at deploy time (deploy_production.py); loaded instead of rebuilding
+# the catalog as long as the schema and aliases it came from are unchanged
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema_snapshot.bin")
+BUNDLED_VERSION = source_version(SCHEMA, FOREIGN_KEYS, normalization_map, display_names, COLUMN_COMMENTS, PRIMARY_KEYS)
 
-    mapped = {"tables": set(), "columns": set()}
+def build_default_catalog() -> SchemaCatalog:
+    return SchemaCatalog.from_schema(SCHEMA, normalization_map, display_names, FOREIGN_KEYS, COLUMN_COMMENTS,
+                                     PRIMARY_KEYS)
 
-    all_tables = list(SCHEMA.keys())
-    all_columns = sum(SCHEMA.values(), [])
+# Built once for the bundled schema; pass another catalog for other schemas
+DEFAULT_CATALOG = load_snapshot(SNAPSHOT_PATH, BUNDLED_VERSION) or build_default_catalog()
 
-    for noun in nouns:
-        noun = normalization_map.get(noun.lower(), noun.lower())
-        table_match = difflib.get_close_matches(noun, all_tables, n=1, cutoff=0.6)
-        col_match = difflib.get_close_matches(noun, all_columns, n=2, cutoff=0.6)
-
-        if table_match:
-            mapped["tables"].add(table_match[0])
-        if col_match:
-            mapped["columns"].update(col_match)
+def match_noun(noun: str) -> tuple:
+    """Closest (tables, columns) for one normalized noun in the default schema."""
+    return DEFAULT_CATALOG.match_noun(noun)
 
-    # Convert sets to lists
-    mapped["tables"] = list(mapped["tables"])
-    mapped["columns"] = list(mapped["columns"])
+# How many ranked tables a mapping keeps; the generator reads the first, and
+# on a wide schema ranking the rest would cost more than the whole translation
+MAX_TABLES = 8
 
-    if hasattr(parsed_data, "get") and parsed_data.get("table") in all_tables:
-        mapped["tables"].insert(0, parsed_data["table"])
-        mapped["tables"] = list(dict.fromkeys(mapped["tables"]))  # remove duplicates
+def map_to_schema(nouns: list[str], parsed_data=None, catalog: SchemaCatalog = None,
+                  max_tables: int = MAX_TABLES) -> SchemaMapping:
+    catalog = catalog or DEFAULT_CATALOG
 
-    # Re-rank tables based on number of matched columns
-    table_scores = {table: 0 for table in SCHEMA.keys()}
-    for col in mapped["columns"]:
-        for table, cols in SCHEMA.items():
-            if col in cols:
-                table_scores[table] += 1
+    # The parse result is left untouched; its filters come back normalized
+    # (and restricted to schema columns) on the mapping
+    filters = {}
+    if parsed_data and "filters" in parsed_data:
+        for k, v in parsed_data["filters"].items():
+            k = catalog.normalize(k)
+            if k in catalog.column_set:
+                filters[k] = v
 
-    # Bonus if parser specifies the table
-    if hasattr(parsed_data, "get") and parsed_data.get("table") in table_scores:
-        table_scores[parsed_data.get("table")] += 2
+    columns = set()
+    mentioned = set()
+    for noun in nouns:
+        table_match, col_match = catalog.match_noun(catalog.normalize(noun))
+        columns.update(col_match)
+        mentioned.update(table_match)
+    columns = list(columns)
 
-    sorted_tables = sorted(table_scores.items(), key=lambda x: -x[1])
-    mapped["tables"] = [t[0] for t in sorted_tables]
+    # The best tables first: most matched columns, plus bonuses for the
+    # table the parser named and tables the nouns name
+    preferred = parsed_data.get("table") if hasattr(parsed_data, "get") else None
+    tables = catalog.rank_tables(columns, preferred, mentioned, max_tables)
 
-    return mapped
+    return SchemaMapping(tables, columns, filters)
 
 if __name__ == "__main__":
     nouns = ["employee", "salary", "department"]
@@ -0,0 +1,65 @@
+from typing import Dict, Tuple
+
+from parser_agent.parsed_query import FrozenDict, freeze, thaw
+
+
+class SchemaMapping:
+    """
+    The mapper's result: candidate tables (best first), matched columns, and
+    the parsed filters with their keys normalized to schema columns.
+    Immutable and hashable like ParsedQuery.
+    """
+
+    __slots__ = ("tables", "columns", "filters", "_hash")
+    FIELDS = __slots__[:-1]
+
+    tables: Tuple[str, ...]
+    columns: Tuple[str, ...]
+    filters: FrozenDict
+
+    def __init__(self, tables=(), columns=(), filters=None):
+        object.__setattr__(self, "tables", tuple(tables))
+        object.__setattr__(self, "columns", tuple(columns))
+        object.__setattr__(self, "filters", freeze(filters or {}))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SchemaMapping":
+        return cls(**{name: data[name] for name in cls.FIELDS if name in data})
+
+    def to_dict(self) -> Dict:
+        return {name: thaw(getattr(self, name)) for name in self.FIELDS}
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def _key(self):
+        return (self.tables, self.columns, self.filters)
+
+    def __eq__(self, other):
+        if not isinstance(other, SchemaMapping):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, "_hash", hash(self._key()))
+            return self._hash
+
+    def __reduce__(self):
+        return (SchemaMapping, self._key())
+
+    def __repr__(self):
+        return f"SchemaMapping(tables={self.tables!r}, columns={self.columns!r}, filters={self.filters!r})"
+
+    # Read-only mapping access, for callers of the old {"tables", "columns"} dict
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
@@ -0,0 +1,81 @@
+import heapq
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List
+
+
+def trigrams(word: str) -> set:
+    """Character trigrams of ``word``, padded so short words ("id") still have some."""
+    padded = f"$${word}$$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Fuzzy lookup over a fixed list of schema terms, a drop-in for
+    ``difflib.get_close_matches(word, words, n, cutoff)``.
+
+    Each term is posted under its character trigrams once, when the index is
+    built. A lookup counts shared trigrams only over the postings of the
+    query's own trigrams, keeps the ``candidates`` best by Dice overlap, and
+    re-scores just those with SequenceMatcher, applying the same cutoff and
+    ordering as difflib. Lists no longer than ``candidates`` are scored in
+    full, so small schemas get exactly difflib's answer.
+
+    Like difflib, duplicate terms (``id`` in several tables) are separate
+    entries and can each be returned.
+    """
+
+    def __init__(self, words: Iterable[str], candidates: int = 64):
+        self.words: List[str] = list(words)
+        self.candidates = candidates
+        self._grams = [len(trigrams(word)) for word in self.words]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for entry, word in enumerate(self.words):
+            for gram in trigrams(word):
+                postings[gram].append(entry)
+        self._postings = dict(postings)
+
+    def state(self) -> tuple:
+        """The built index as builtins, for ``from_state``."""
+        return self.words, self.candidates, self._grams, self._postings
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "TrigramIndex":
+        index = object.__new__(cls)
+        index.words, index.candidates, index._grams, index._postings = state
+        return index
+
+    def __len__(self):
+        return len(self.words)
+
+    def _shortlist(self, word: str, k: int) -> List[int]:
+        grams = trigrams(word)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for entry in self._postings.get(gram, ()):
+                shared[entry] += 1
+        size = len(grams)
+        sizes = self._grams
+        return heapq.nlargest(k, shared, key=lambda entry: shared[entry] / (size + sizes[entry]))
+
+    def get_close_matches(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        if len(self.words) <= self.candidates:
+            entries = range(len(self.words))
+        else:
+            entries = self._shortlist(word, max(self.candidates, n))
+
+        # Same scoring and tie-breaking as difflib.get_close_matches
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        scored = []
+        for entry in entries:
+            term = self.words[entry]
+            matcher.set_seq1(term)
+            if (
+                matcher.real_quick_ratio() >= cutoff
+                and matcher.quick_ratio() >= cutoff
+                and matcher.ratio() >= cutoff
+            ):
+                scored.append((matcher.ratio(), term))
+        return [term for _, term in heapq.nlargest(n, scored)]
@@ -2,4 +2,27 @@ SCHEMA = {
     "employees": ["id", "name", "salary", "department_id", "city", "age", "join_date", "position", "email"],
     "departments": ["id", "name", "location", "budget"],
     "projects": ["id", "title", "budget", "department_id", "start_date", "end_date", "status"]
-}
\ No newline at end of file
+}
+
+# table -> primary key column
+PRIMARY_KEYS = {"employees": "id", "departments": "id", "projects": "id"}
+
+# (table, column, referenced table, referenced column)
+FOREIGN_KEYS = [
+    ("employees", "department_id", "departments", "id"),
+    ("projects", "department_id", "departments", "id"),
+]
+
+# Column comments, as a database would store them: comma-separated phrases
+# the semantic matcher reads as other names for the column
+COLUMN_COMMENTS = {
+    "salary": "pay, wage, wages, compensation, earnings, income",
+    "join_date": "hired, hire date, date hired, date joined",
+    "age": "years old",
+    "city": "town, based in",
+    "position": "job, role, job title",
+    "email": "email address, mail",
+    "location": "office, site",
+    "budget": "funding, spend",
+    "status": "state, progress",
+}
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import threading
+from typing import Optional
+
+from schema_mapper.catalog import SchemaCatalog
+
+# Bump when the layout or the catalog state changes shape; older files are
+# then ignored and rebuilt
+FORMAT_VERSION = 4
+MAGIC = b"NSQLSNAP"
+# magic, format version, marshal version, header length
+_PREFIX = struct.Struct("<8sHHI")
+
+
+def source_version(*parts) -> str:
+    """A version token for whatever a catalog was built from (schema, aliases, DB version)."""
+    content = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+def save_snapshot(catalog: SchemaCatalog, path: str, version: str):
+    """
+    Write ``catalog`` to ``path``: a small JSON header followed by two
+    marshal sections, the catalog state and its match indexes. The file
+    is replaced atomically, so readers never see a partial snapshot.
+    """
+    catalog_section = marshal.dumps(catalog.state())
+    index_section = marshal.dumps(catalog.index_state())
+    header = json.dumps({
+        "version": version,
+        "fingerprint": catalog.fingerprint,
+        "tables": len(catalog.tables),
+        "columns": len(catalog.columns),
+        "catalog": len(catalog_section),
+        "indexes": len(index_section),
+    }, separators=(",", ":")).encode("utf-8")
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, marshal.version, len(header)))
+        f.write(header)
+        f.write(catalog_section)
+        f.write(index_section)
+    os.replace(tmp, path)
+
+
+def read_header(path: str) -> Optional[dict]:
+    """The snapshot's header, or None if ``path`` isn't a snapshot this build can read."""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                return None
+            magic, fmt, marshal_version, header_length = _PREFIX.unpack(prefix)
+            if magic != MAGIC or fmt != FORMAT_VERSION or marshal_version != marshal.version:
+                return None
+            header = json.loads(f.read(header_length))
+    except (OSError, ValueError):
+        return None
+    header["offset"] = _PREFIX.size + header_length
+    return header
+
+
+def load_snapshot(path: str, version: Optional[str] = None) -> Optional[SchemaCatalog]:
+    """
+    The catalog saved at ``path``, or None if there is none, it is from
+    another format, or it was built from something other than ``version``.
+
+    The file is memory-mapped. Only the catalog state is unmarshalled here;
+    the match indexes are read from the mapping on the first fuzzy lookup.
+    """
+    header = read_header(path)
+    if header is None or (version is not None and header["version"] != version):
+        return None
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    start = header["offset"]
+    split = start + header["catalog"]
+    end = split + header["indexes"]
+    try:
+        if len(data) < end:
+            raise ValueError("truncated snapshot")
+        state = marshal.loads(data[start:split])
+    except (ValueError, EOFError, TypeError):
+        data.close()
+        return None
+    loaded = []
+    lock = threading.Lock()
+
+    def indexes():
+        with lock:
+            if not loaded:
+                states = marshal.loads(data[split:end])
+                data.close()
+                loaded.append(SchemaCatalog.indexes_from_state(states))
+        return loaded[0]
+
+    return SchemaCatalog.restore(state, indexes)
+
+
+def load_or_build(path: str, version: str, build) -> SchemaCatalog:
+    """Load the snapshot at ``path`` if it matches ``version``, else ``build()`` one and save it."""
+    catalog = load_snapshot(path, version)
+    if catalog is None:
+        catalog = build()
+        try:
+            save_snapshot(catalog, path, version)
+        except OSError:
+            # A read-only filesystem only costs the next start a rebuild
+            pass
+    return catalog
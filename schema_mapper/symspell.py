@@ -0,0 +1,158 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """``word`` and every string reachable from it by up to ``max_distance`` deletions."""
+    found = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        following = []
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                shorter = item[:i] + item[i + 1:]
+                if shorter not in found:
+                    found.add(shorter)
+                    following.append(shorter)
+        frontier = following
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions
+    and adjacent transpositions) between ``a`` and ``b``, or ``limit + 1``
+    as soon as it is known to exceed ``limit``.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Only the differing middle needs the table; typo candidates usually
+    # share most of their characters with the query
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    stop = 0
+    while stop < len(a) - start and stop < len(b) - start and a[-1 - stop] == b[-1 - stop]:
+        stop += 1
+    a, b = a[start:len(a) - stop], b[start:len(b) - stop]
+    if not a or not b:
+        return min(len(a) + len(b), limit + 1)
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellIndex:
+    """
+    Symmetric-delete spelling lookup over a fixed vocabulary (SymSpell).
+
+    Every term is posted under the strings left after deleting up to
+    ``max_distance`` characters from its first ``affix_length`` characters,
+    and again from its last ``affix_length``. A lookup generates the same
+    deletes of the query's head and tail and reads the matching buckets, so
+    finding every term within edit distance 2 costs a few dozen dict lookups
+    however large the vocabulary is. A term that close shares a bucket with
+    the query at both ends, which keeps the candidates few even when many
+    columns share a prefix (``customer_*``); they are then checked with the
+    real (Damerau) edit distance.
+
+    Terms map to a target: the term itself, or the column an alias
+    normalizes to ("salries" finds the alias "salaries", returns "salary").
+    """
+
+    def __init__(self, terms: Iterable[str] = (), aliases: Optional[Mapping[str, str]] = None,
+                 max_distance: int = 2, affix_length: int = 7):
+        self.max_distance = max_distance
+        self.affix_length = affix_length
+        self.terms: List[str] = []
+        self.targets: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._heads: Dict[str, List[int]] = {}
+        self._tails: Dict[str, List[int]] = {}
+        for term, target in [(term, term) for term in terms] + list((aliases or {}).items()):
+            if term in self._exact:
+                continue
+            entry = len(self.terms)
+            self._exact[term] = entry
+            self.terms.append(term)
+            self.targets.append(target)
+            for key in deletes(term[:affix_length], max_distance):
+                self._heads.setdefault(key, []).append(entry)
+            for key in deletes(term[-affix_length:], max_distance):
+                self._tails.setdefault(key, []).append(entry)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def state(self) -> tuple:
+        """The built index as builtins, for ``from_state``."""
+        return (self.max_distance, self.affix_length, self.terms, self.targets,
+                self._exact, self._heads, self._tails)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "SymSpellIndex":
+        index = object.__new__(cls)
+        (index.max_distance, index.affix_length, index.terms, index.targets,
+         index._exact, index._heads, index._tails) = state
+        return index
+
+    def allowed_distance(self, word: str) -> int:
+        """Edits tolerated for ``word``: none below 3 characters, 1 up to 5, then ``max_distance``."""
+        return min(self.max_distance, len(word) // 3)
+
+    def _candidates(self, buckets: Dict[str, List[int]], affix: str, limit: int) -> set:
+        entries = set()
+        for key in deletes(affix, limit):
+            entries.update(buckets.get(key, ()))
+        return entries
+
+    def lookup(self, word: str, n: int = 1, max_distance: Optional[int] = None) -> List[str]:
+        """
+        Up to ``n`` distinct targets at the smallest edit distance found from
+        ``word``, in vocabulary order; [] when nothing is close enough.
+        """
+        entry = self._exact.get(word)
+        if entry is not None:
+            return [self.targets[entry]]
+        best = self.allowed_distance(word) if max_distance is None else max_distance
+        if best <= 0:
+            return []
+        entries = self._candidates(self._heads, word[:self.affix_length], best)
+        if entries:
+            entries &= self._candidates(self._tails, word[-self.affix_length:], best)
+
+        terms = self.terms
+        found: Dict[int, int] = {}
+        for entry in entries:
+            term = terms[entry]
+            if abs(len(term) - len(word)) > best:
+                continue
+            distance = edit_distance(word, term, best)
+            if distance < best:
+                best = distance
+                found = {e: d for e, d in found.items() if d <= best}
+            if distance <= best:
+                found[entry] = distance
+
+        targets: List[str] = []
+        for entry in sorted(found):
+            target = self.targets[entry]
+            if target not in targets:
+                targets.append(target)
+                if len(targets) == n:
+                    break
+        return targets
@@ -0,0 +1,256 @@
+import threading
+import uuid
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from schema_mapper.bloom import BloomFilter
+
+# The demo's known values, as the generator writes them. Department filters
+# have always been emitted as typed, so they stay lowercase.
+BUNDLED_VALUES = {
+    "city": ["New York", "London", "Tokyo", "Paris", "Berlin", "Mumbai", "Delhi", "Bangalore"],
+    "department": ["engineering", "marketing", "sales", "hr", "finance", "it", "operations"],
+    "position": ["Software Engineer", "Data Scientist", "Product Manager", "Sales Representative"],
+    "name": ["John", "Alice", "Bob", "Jane", "Mike", "Sarah"],
+}
+
+
+def normalize_value(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+class ValueIndex:
+    """
+    The values of low-cardinality text columns, keyed by normalized phrase.
+
+    A phrase ("new york") maps to the columns it occurs in and each one's
+    canonical spelling ("New York"), so recognizing a value and restoring
+    its case are one dict lookup each. Columns are named "column" or
+    "table.column"; asking for "city" matches a city column of any table.
+
+    Columns too large to hold can instead get a Bloom filter of their values,
+    which ``may_contain`` consults to rule out filters no row can match.
+
+    ``update`` swaps whole columns, so a refresh only touches the columns
+    whose data changed. It replaces the lookup tables instead of mutating
+    them, so concurrent readers keep a consistent view. Every change bumps
+    ``fingerprint``, which the pipeline uses to keep cached translations from
+    outliving the values.
+    """
+
+    def __init__(self, values: Optional[Mapping[str, Iterable[str]]] = None, max_words: int = 4):
+        self.max_words = max_words
+        # phrase -> {column: canonical}
+        self._phrases: Dict[str, Dict[str, str]] = {}
+        # column -> {phrase: canonical}
+        self._columns: Dict[str, Dict[str, str]] = {}
+        # column -> every word of its phrases, for "is this word part of a value"
+        self._words: Dict[str, frozenset] = {}
+        # first word -> number of phrases starting with it, so ``match`` skips
+        # the words no value starts with without building spans
+        self._heads: Dict[str, int] = {}
+        # Columns whose every value is in _columns, and Bloom filters of others
+        self._complete: FrozenSet[str] = frozenset()
+        self._filters: Dict[str, BloomFilter] = {}
+        self._lock = threading.Lock()
+        self._id = uuid.uuid4().hex[:8]
+        self.version = 0
+        if values:
+            self.update(values)
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self._id}:{self.version}"
+
+    def __repr__(self):
+        return (f"ValueIndex({len(self._columns)} columns, {len(self._phrases)} phrases, "
+                f"{len(self._filters)} filters, version={self.version})")
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns or column in self._filters
+
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def filters(self) -> Dict[str, BloomFilter]:
+        return dict(self._filters)
+
+    def values(self, column: str) -> List[str]:
+        """The normalized phrases of ``column`` (of every table's, for a bare name), in the order added."""
+        columns = self._columns
+        if column in columns:
+            return list(columns[column])
+        suffix = "." + column
+        return list(dict.fromkeys(
+            phrase for owner, entries in columns.items() if owner.endswith(suffix) for phrase in entries
+        ))
+
+    def replace(self, column: str, values: Iterable[str], complete: bool = False):
+        """Set ``column``'s values, dropping the ones it had."""
+        self.update({column: values}, complete)
+
+    def update(self, columns: Mapping[str, Iterable[str]], complete: bool = False,
+               filters: Optional[Mapping[str, Optional[BloomFilter]]] = None):
+        """
+        Set the values of each of ``columns`` (an empty list removes the
+        column) and, optionally, the Bloom filter of each of ``filters``
+        (None removes it). ``complete`` says the values are all the column
+        has; a column with a value too long to index is never complete.
+        """
+        prepared = {}
+        whole = set()
+        for column, values in columns.items():
+            entries = {}
+            fits = complete
+            for value in values:
+                phrase = normalize_value(value) if isinstance(value, str) else ""
+                if phrase and len(phrase.split()) <= self.max_words:
+                    entries.setdefault(phrase, value.strip())
+                else:
+                    fits = False
+            prepared[column] = entries
+            if fits and entries:
+                whole.add(column)
+
+        with self._lock:
+            phrases = dict(self._phrases)
+            heads = dict(self._heads)
+            indexed = dict(self._columns)
+            words = dict(self._words)
+            for column, entries in prepared.items():
+                for phrase in indexed.pop(column, {}):
+                    owners = {owner: value for owner, value in phrases[phrase].items() if owner != column}
+                    if owners:
+                        phrases[phrase] = owners
+                        continue
+                    del phrases[phrase]
+                    head = phrase.split(" ", 1)[0]
+                    heads[head] -= 1
+                    if not heads[head]:
+                        del heads[head]
+                words.pop(column, None)
+                if not entries:
+                    continue
+                indexed[column] = entries
+                words[column] = frozenset(word for phrase in entries for word in phrase.split())
+                for phrase, canonical in entries.items():
+                    owners = dict(phrases.get(phrase, {}))
+                    if not owners:
+                        head = phrase.split(" ", 1)[0]
+                        heads[head] = heads.get(head, 0) + 1
+                    owners[column] = canonical
+                    phrases[phrase] = owners
+            bloom_filters = dict(self._filters)
+            for column, bloom in (filters or {}).items():
+                if bloom is None:
+                    bloom_filters.pop(column, None)
+                else:
+                    bloom_filters[column] = bloom
+            self._complete = frozenset((self._complete - set(prepared)) | whole)
+            self._phrases, self._heads, self._columns, self._words = phrases, heads, indexed, words
+            self._filters = bloom_filters
+            self.version += 1
+
+    def _owner(self, owners: Dict[str, str], column: Optional[str]) -> Optional[str]:
+        if column is None:
+            return next(iter(owners))
+        if column in owners:
+            return column
+        if "." not in column:
+            return next((owner for owner in owners if owner.endswith("." + column)), None)
+        return None
+
+    def lookup(self, phrase: str, column: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(column, canonical value) for ``phrase``, or None if no column (or not ``column``) holds it."""
+        owners = self._phrases.get(normalize_value(phrase))
+        if not owners:
+            return None
+        owner = self._owner(owners, column)
+        return (owner, owners[owner]) if owner else None
+
+    def canonical(self, value: str, column: Optional[str] = None) -> str:
+        """
+        ``value`` as the database spells it: as ``column`` has it if it does,
+        else as any column has it, else unchanged.
+        """
+        found = self.lookup(value, column) or (column is not None and self.lookup(value))
+        return found[1] if found else value
+
+    def _matching(self, column: str) -> List[str]:
+        known = set(self._columns) | set(self._filters)
+        if column in known or "." in column:
+            return [column] if column in known else []
+        return [owner for owner in known if owner.endswith("." + column)]
+
+    def may_contain(self, value, column: str) -> bool:
+        """
+        False only when ``column`` certainly has no ``value`` (compared
+        normalized): its values are all indexed, or its Bloom filter rules
+        the value out. True when it may, or when the column isn't tracked.
+        """
+        phrase = normalize_value(str(value))
+        checked = False
+        for owner in self._matching(column):
+            if owner in self._complete:
+                checked = True
+                if phrase in self._columns.get(owner, ()):
+                    return True
+            bloom = self._filters.get(owner)
+            if bloom is not None:
+                checked = True
+                if phrase in bloom:
+                    return True
+        return not checked
+
+    def has_word(self, word: str, column: Optional[str] = None) -> bool:
+        """Whether ``word`` is part of some value ("york" of "new york") of ``column``, or of any column."""
+        word = word.lower()
+        if column in self._words:
+            return word in self._words[column]
+        suffix = "." + column if column is not None else ""
+        return any(word in words for owner, words in self._words.items() if column is None or owner.endswith(suffix))
+
+    def starts_value(self, word: str) -> bool:
+        """Whether some value's first word is ``word`` (lowercase); a cheap pre-check for ``match``."""
+        return word in self._heads
+
+    def starts_any(self, words: Iterable[str]) -> bool:
+        """Whether any of ``words`` starts a value, i.e. there may be something to ``match``."""
+        return not self._heads.keys().isdisjoint(words)
+
+    def match(self, words: Sequence[str], column: Optional[str] = None) -> Optional[Tuple[int, str, str]]:
+        """
+        The longest value that ``words`` (lowercase) start with, as (number
+        of words, column, canonical value), or None. One dict lookup per
+        candidate length.
+        """
+        if not words or words[0] not in self._heads:
+            return None
+        phrases = self._phrases
+        for end in range(min(len(words), self.max_words), 0, -1):
+            owners = phrases.get(" ".join(words[:end]))
+            owner = owners and self._owner(owners, column)
+            if owner:
+                return end, owner, owners[owner]
+        return None
+
+    def find(self, words: Sequence[str], column: Optional[str] = None) -> List[Tuple[int, int, str, str]]:
+        """
+        Values in a sequence of lowercase words, left to right and longest
+        first at each position: (start, end, column, canonical) with
+        ``words[start:end]`` being the phrase.
+        """
+        found = []
+        start = 0
+        while start < len(words):
+            matched = self.match(words[start:start + self.max_words], column)
+            if matched:
+                size, owner, canonical = matched
+                found.append((start, start + size, owner, canonical))
+                start += size
+            else:
+                start += 1
+        return found
+
+
+# Known values of the bundled demo schema
+DEFAULT_VALUES = ValueIndex(BUNDLED_VALUES)
@@ -0,0 +1,312 @@
+import re
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, Tuple
+
+from parser_agent.tokenizer import DATE, EMAIL, ENTITY, NUMBER, tokenize
+from parser_agent.parsed_query import ParsedQuery
+from query_generator.generator import generate_sql_for
+from schema_mapper.mapping import SchemaMapping
+from schema_mapper.value_index import DEFAULT_VALUES, ValueIndex
+import tracing
+from translation_cache import TranslationCache
+
+# Token kinds whose text is a value rather than part of the question's shape
+LITERAL_KINDS = (NUMBER, DATE, EMAIL, ENTITY)
+
+# Parts of a prepared query that decide its shape; a literal leaking into
+# one of them makes the template unusable, since the classifier and mapper
+# ran on the literal's text
+_SHAPE_FIELDS = (("intent",), ("mapping", "tables"), ("mapping", "columns"), ("parsed", "group_by"))
+
+# Stored in place of a template when a query shape cannot be abstracted
+_UNCACHEABLE = object()
+
+
+class _Mismatch(Exception):
+    pass
+
+
+class Slot:
+    """A literal position in a template; ``as_int`` slots hold int(literal)."""
+
+    __slots__ = ("index", "as_int")
+
+    def __init__(self, index: int, as_int: bool = False):
+        self.index = index
+        self.as_int = as_int
+
+    def bind(self, literals: List[str]):
+        text = literals[self.index]
+        return int(text) if self.as_int else text
+
+
+class TemplateString:
+    """A string leaf with literals spliced into it, e.g. ``"<year>%"``."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: tuple):
+        self.parts = parts
+
+    def bind(self, literals: List[str]) -> str:
+        return "".join(part if isinstance(part, str) else part.bind(literals) for part in self.parts)
+
+
+def _placeholder(token) -> str:
+    # The parser branches on a number's length ("joined in 2021" needs four
+    # digits) and on an entity's word count, so both are part of the shape
+    if token.kind == NUMBER:
+        return f"\x00number:{len(token.text)}\x00"
+    if token.kind == ENTITY:
+        return f"\x00{token.category}:{len(token.text.split())}\x00"
+    return f"\x00{token.kind}\x00"
+
+
+def fingerprint(query: str, values: Optional[ValueIndex] = None) -> Tuple[str, List]:
+    """
+    Template key for a normalized query and the literal tokens it abstracts:
+    numbers, dates, emails and known entities (values in ``values``) become
+    placeholders.
+    """
+    parts = []
+    literals = []
+    last = 0
+    for token in tokenize(query, values):
+        if token.kind in LITERAL_KINDS:
+            parts.append(query[last:token.start])
+            parts.append(_placeholder(token))
+            literals.append(token)
+            last = token.end
+    parts.append(query[last:])
+    return "".join(parts), literals
+
+
+def _sentinels(literals, values: ValueIndex) -> Optional[List[str]]:
+    """Distinct stand-in values of the same shape as ``literals``, or None."""
+    used = {token.text for token in literals}
+    used_ints = {int(token.text) for token in literals if token.kind == NUMBER}
+    sentinels = []
+    for token in literals:
+        if token.kind == NUMBER:
+            # 9..., 98..., counting down keeps the length and avoids leading zeros
+            size = len(token.text)
+            value = 10 ** size - 1
+            while value >= 10 ** (size - 1) and (str(value) in used or value in used_ints):
+                value -= 1
+            if value < 10 ** (size - 1):
+                return None
+            text = str(value)
+            used_ints.add(value)
+        elif token.kind == DATE:
+            year = 1901
+            while f"{year}-02-03" in used:
+                year += 1
+            text = f"{year}-02-03"
+        elif token.kind == EMAIL:
+            index = 0
+            while f"slot{chr(97 + index % 26) * (index // 26 + 1)}@example.test" in used:
+                index += 1
+            text = f"slot{chr(97 + index % 26) * (index // 26 + 1)}@example.test"
+        else:
+            words = len(token.text.split())
+            candidates = [
+                name for name in values.values(token.category)
+                if len(name.split()) == words and name not in used
+            ]
+            if not candidates:
+                return None
+            text = candidates[0]
+        used.add(text)
+        sentinels.append(text)
+    return sentinels
+
+
+def _probe_query(query: str, literals, sentinels: List[str]) -> str:
+    parts = []
+    last = 0
+    for token, sentinel in zip(literals, sentinels):
+        parts.append(query[last:token.start])
+        parts.append(sentinel)
+        last = token.end
+    parts.append(query[last:])
+    return "".join(parts)
+
+
+def _abstract(probe, actual, sentinels: List[str], literals: List[str], finder):
+    """
+    Walk the probe's and the real query's values side by side and return a
+    frozen template whose slots reproduce ``actual`` from ``literals``.
+    Raises _Mismatch when the two differ in a way literals don't explain.
+    """
+    if isinstance(probe, dict):
+        if not isinstance(actual, dict) or list(probe) != list(actual):
+            raise _Mismatch
+        for key in probe:
+            if isinstance(key, str) and finder.search(key):
+                raise _Mismatch
+        return MappingProxyType({
+            key: _abstract(probe[key], actual[key], sentinels, literals, finder) for key in probe
+        })
+    if isinstance(probe, list):
+        if not isinstance(actual, list) or len(probe) != len(actual):
+            raise _Mismatch
+        return tuple(_abstract(p, a, sentinels, literals, finder) for p, a in zip(probe, actual))
+    if isinstance(probe, int) and not isinstance(probe, bool):
+        if probe == actual and type(probe) is type(actual):
+            return probe
+        for index, sentinel in enumerate(sentinels):
+            if sentinel.isdigit() and int(sentinel) == probe and int(literals[index]) == actual:
+                return Slot(index, as_int=True)
+        raise _Mismatch
+    if isinstance(probe, str):
+        if not finder.search(probe):
+            if probe != actual:
+                raise _Mismatch
+            return probe
+        parts = []
+        last = 0
+        for match in finder.finditer(probe):
+            parts.append(probe[last:match.start()])
+            parts.append(Slot(sentinels.index(match.group())))
+            last = match.end()
+        parts.append(probe[last:])
+        template = TemplateString(tuple(part for part in parts if part != ""))
+        if template.bind(literals) != actual:
+            raise _Mismatch
+        return template
+    if probe != actual or type(probe) is not type(actual):
+        raise _Mismatch
+    return probe
+
+
+def _unpack(prepared) -> Dict:
+    intent, parsed, mapping = prepared
+    return {"intent": intent, "parsed": parsed.to_dict(), "mapping": mapping.to_dict()}
+
+
+def _pack(values: Dict):
+    return values["intent"], ParsedQuery.from_dict(values["parsed"]), SchemaMapping.from_dict(values["mapping"])
+
+
+def _bind(template, literals: List[str]):
+    """Plain dicts and lists of the template with ``literals`` filled in."""
+    if isinstance(template, MappingProxyType):
+        return {key: _bind(value, literals) for key, value in template.items()}
+    if isinstance(template, tuple):
+        return [_bind(value, literals) for value in template]
+    if isinstance(template, (Slot, TemplateString)):
+        return template.bind(literals)
+    return template
+
+
+def _has_slot(template) -> bool:
+    if isinstance(template, (Slot, TemplateString)):
+        return True
+    if isinstance(template, MappingProxyType):
+        return any(_has_slot(value) for value in template.values())
+    if isinstance(template, tuple):
+        return any(_has_slot(value) for value in template)
+    return False
+
+
+class TemplateCache:
+    """
+    Caches the parse/classify/map work per query template, so questions that
+    differ only in their literals ("older than 30" / "older than 45") share it.
+
+    A template is built from two translations of its first query: the real
+    one and a probe with every literal swapped for a distinct stand-in. Where
+    a stand-in shows up in the parsed query and schema mapping becomes a
+    slot. The template is kept only if filling the slots with the real
+    literals gives back exactly the real parse, mapping and SQL; otherwise the
+    shape is marked uncacheable and always translated in full.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = 3600.0):
+        self._templates = TranslationCache(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def translate(self, query: str, prepare: Callable[[str], tuple],
+                  generate: Callable[..., str] = generate_sql_for, scope: Optional[str] = None,
+                  values: Optional[ValueIndex] = None) -> Tuple[str, str, bool]:
+        """
+        (SQL, intent, answered from a template) for a normalized ``query``.
+        ``prepare`` maps a query to its (intent, ParsedQuery, SchemaMapping)
+        and ``generate`` turns that into SQL. Templates are keyed by ``scope``
+        too, e.g. the schema catalog they were built against; ``values`` are
+        the known values ``prepare`` parses with, which decide the entities.
+        """
+        values = DEFAULT_VALUES if values is None else values
+        key, tokens = fingerprint(query, values)
+        if not tokens:
+            prepared = prepare(query)
+            return generate(*prepared), prepared[0], False
+        if scope is not None:
+            key = (scope, key)
+        literals = [token.text for token in tokens]
+
+        template = self._templates.get(key)
+        if template is _UNCACHEABLE:
+            self._count("uncacheable")
+            prepared = prepare(query)
+            return generate(*prepared), prepared[0], False
+        if template is not None:
+            self._count("hits")
+            prepared = _pack(_bind(template, literals))
+            return generate(*prepared), prepared[0], True
+
+        self._count("misses")
+        prepared = prepare(query)
+        sql = generate(*prepared)
+        template = self._build(query, tokens, literals, _unpack(prepared), sql, prepare, generate, values)
+        self._templates.put(key, _UNCACHEABLE if template is None else template)
+        return sql, prepared[0], False
+
+    def _build(self, query, tokens, literals, expected, sql, prepare, generate, values):
+        sentinels = _sentinels(tokens, values)
+        if sentinels is None:
+            return None
+        # The probe is an implementation detail; keep it out of the trace
+        with tracing.muted():
+            probe = prepare(_probe_query(query, tokens, sentinels))
+        finder = re.compile(
+            r"(?<![0-9a-z])(?:" + "|".join(re.escape(s) for s in sorted(sentinels, key=len, reverse=True)) + r")(?![0-9a-z])"
+        )
+        try:
+            template = _abstract(_unpack(probe), expected, sentinels, literals, finder)
+        except _Mismatch:
+            return None
+        for path in _SHAPE_FIELDS:
+            value = template
+            for name in path:
+                value = value[name]
+            if _has_slot(value):
+                return None
+        if generate(*_pack(_bind(template, literals))) != sql:
+            return None
+        return template
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+    def stats(self) -> Dict:
+        stats = self._templates.stats()
+        with self._lock:
+            lookups = self.hits + self.misses + self.uncacheable
+            return {
+                "templates": stats["entries"],
+                "max_templates": stats["max_entries"],
+                "evictions": stats["evictions"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
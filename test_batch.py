@@ -0,0 +1,67 @@
+import unittest
+
+import pipeline
+
+QUERIES = [
+    "Show employees older than 30",
+    "Delete employees with salary less than 30000",
+    "show EMPLOYEES older   than 30",
+    "Show employees older than 45",
+    "Show departments with more than 2 employees",
+    "Delete employees with salary less than 45000",
+    "Show all employees",
+]
+
+
+def strip_timings(results):
+    return [{key: value for key, value in result.items() if key != "timings"} for result in results]
+
+
+class TestBatchTranslation(unittest.TestCase):
+
+    def setUp(self):
+        pipeline.configure_cache()
+
+    def tearDown(self):
+        pipeline.configure_cache()
+
+    def test_results_in_input_order(self):
+        results = pipeline.nl_to_sql_many(QUERIES)
+        self.assertEqual([result["query"] for result in results], QUERIES)
+        for query, result in zip(QUERIES, results):
+            self.assertIsNone(result["error"])
+            self.assertEqual(result["sql"], pipeline.nl_to_sql(query, use_cache=False))
+
+    def test_duplicates_and_templates_shared(self):
+        pipeline.nl_to_sql_many(QUERIES)
+        # "older than 30" appears twice but is translated once
+        self.assertEqual(pipeline.cache_stats()["misses"], len(QUERIES) - 1)
+        stats = pipeline.template_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 3))
+
+    def test_errors_are_values(self):
+        results = pipeline.nl_to_sql_many(["Show all employees", None, "Delete employees younger than 25"])
+        self.assertIsNotNone(results[1]["error"])
+        self.assertIsNone(results[1]["sql"])
+        self.assertTrue(results[0]["sql"] and results[2]["sql"])
+
+    def test_workers_match_sequential(self):
+        sequential = pipeline.nl_to_sql_many(QUERIES)
+        pipeline.configure_cache()
+        parallel = pipeline.nl_to_sql_many(QUERIES, workers=4)
+        self.assertEqual(strip_timings(parallel), strip_timings(sequential))
+
+    def test_intent_and_cache_source(self):
+        results = pipeline.nl_to_sql_many(QUERIES)
+        self.assertEqual(results[1]["intent"], "DELETE")
+        self.assertEqual([results[0]["cache"], results[5]["cache"]], [None, "template"])
+        self.assertGreaterEqual(results[0]["timings"]["translate_ms"], 0)
+        again = pipeline.nl_to_sql_many(QUERIES[:1])[0]
+        self.assertEqual((again["cache"], again["intent"]), ("translation", "SELECT"))
+
+    def test_empty_batch(self):
+        self.assertEqual(pipeline.nl_to_sql_many([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import sqlite3
+import unittest
+from unittest import mock
+
+import pipeline
+from schema_mapper import introspection
+from schema_mapper.bloom import BloomFilter, optimal_size
+from schema_mapper.introspection import ValueSampler, catalog_for, values_for
+from schema_mapper.value_index import ValueIndex
+
+DDL = """
+CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, salary REAL, city TEXT, position TEXT);
+"""
+CITIES = ["Springfield", "Oslo", "Lima"]
+# 300 distinct positions: more than the value index holds, so they get a filter
+POSITIONS = [f"{grade} {team} analyst" for grade in ("Junior", "Senior", "Lead") for team in
+             [a + b for a in "abcdefghij" for b in "abcdefghij"]]
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives_and_rate_near_target(self):
+        values = [f"user{i}@example.com" for i in range(5000)]
+        bloom = BloomFilter.from_items(values, len(values), fp_rate=0.01)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"guest{i}@example.com" in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_footprint_follows_the_rate(self):
+        bits, hashes = optimal_size(1_000_000, 0.01)
+        self.assertEqual((round(bits / 1_000_000, 1), hashes), (9.6, 7))
+        self.assertLess(BloomFilter(1_000_000, 0.01).nbytes, 1_300_000)
+        self.assertGreater(BloomFilter(1_000_000, 0.001).nbytes, BloomFilter(1_000_000, 0.01).nbytes)
+        with self.assertRaises(ValueError):
+            BloomFilter(10, fp_rate=0)
+
+    def test_state_round_trip(self):
+        bloom = BloomFilter.from_items(["oslo", "lima"], 10)
+        restored = BloomFilter.from_state(bloom.state())
+        self.assertIn("oslo", restored)
+        self.assertEqual((restored.count, restored.nbytes), (2, bloom.nbytes))
+
+
+class TestImpossibleFilters(unittest.TestCase):
+
+    def setUp(self):
+        introspection.clear_catalogs()
+        pipeline.configure_cache()
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript(DDL)
+        rows = [(i, f"Person {i}", 40000 + i, CITIES[i % 3], POSITIONS[i % 300]) for i in range(500)]
+        self.conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)", rows)
+        self.catalog = catalog_for(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        introspection.clear_catalogs()
+
+    def test_large_text_columns_get_filters(self):
+        sampler = ValueSampler(self.catalog.schema, "sqlite", fp_rate=0.001)
+        sampler.refresh(self.conn)
+        self.assertEqual(list(sampler.index.filters()), ["employees.name", "employees.position"])
+        self.assertTrue(sampler.index.may_contain("person  42", "employees.name"))
+        self.assertFalse(sampler.index.may_contain("Zed", "employees.name"))
+
+        # Growing past max_values moves a column from the index to a filter
+        self.conn.executemany("INSERT INTO employees (name, city) VALUES (?, ?)",
+                              [(f"New {i}", f"Town {i}") for i in range(600)])
+        self.assertIn("employees.city", sampler.refresh(self.conn))
+        self.assertNotIn("employees.city", sampler.index.columns())
+        self.assertTrue(sampler.index.may_contain("Town 7", "employees.city"))
+
+    def test_filters_of_large_tables_wait_for_a_capped_full_read(self):
+        sampler = ValueSampler(self.catalog.schema, "sqlite", sample_rows=100, max_filter_values=400)
+        sampler.refresh(self.conn)
+        self.assertEqual(sampler.index.filters(), {})
+        self.assertTrue(sampler.index.may_contain("Wizard", "employees.position"))
+        sampler.read_pending(self.conn)
+        # 300 positions fit under the cap; 500 names don't, and a filter of
+        # only some of them would rule out names that exist
+        self.assertEqual(list(sampler.index.filters()), ["employees.position"])
+        self.assertFalse(sampler.index.may_contain("Wizard", "employees.position"))
+        self.assertTrue(sampler.index.may_contain("Zed", "employees.name"))
+
+    def test_may_contain_only_rules_out_tracked_columns(self):
+        values = ValueIndex()
+        values.update({"employees.city": ["Oslo"]}, complete=True)
+        values.update({"employees.position": ["Engineer"]})
+        self.assertFalse(values.may_contain("Narnia", "employees.city"))
+        self.assertFalse(values.may_contain("Narnia", "city"))
+        self.assertTrue(values.may_contain("oslo", "employees.city"))
+        # Not known to be complete, or not tracked at all: can't tell
+        self.assertTrue(values.may_contain("Wizard", "employees.position"))
+        self.assertTrue(values.may_contain("Narnia", "employees.country"))
+
+    def test_flags_filters_no_row_matches(self):
+        values = values_for(self.conn, self.catalog)
+        check = lambda query: pipeline.impossible_filters(query, self.catalog, values)
+        # position has a Bloom filter, city is indexed in full
+        self.assertEqual(check("Show employees with position Wizard"), [("employees.position", "wizard")])
+        self.assertEqual(check("Show employees with position Lead ej Analyst"), [])
+        self.assertEqual(check("Delete employees in Oslo"), [])
+        # Ranges and inserts aren't equality lookups
+        self.assertEqual(check("Show employees earning more than 50000"), [])
+        self.assertEqual(check("Add employee named Zed"), [])
+        self.assertEqual(pipeline.impossible_filters("Show employees with position Wizard"), [])
+
+    def test_translating_caches_the_check(self):
+        values = values_for(self.conn, self.catalog)
+        query = "Show employees with position Wizard"
+        pipeline.nl_to_sql(query, catalog=self.catalog, values=values)
+        pipeline.nl_to_sql_page("Show employees in Oslo", placeholder="?", catalog=self.catalog, values=values)
+        with mock.patch.object(pipeline, "_prepare", wraps=pipeline._prepare) as prepare:
+            self.assertEqual(pipeline.impossible_filters(query, self.catalog, values), [("employees.position", "wizard")])
+            self.assertEqual(pipeline.impossible_filters("Show employees in Oslo", self.catalog, values), [])
+        self.assertEqual(prepare.call_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import bulk
+import pipeline
+from bulk import read_queries, run_batch, translate_bulk
+from schema_mapper.mapper import build_default_catalog
+from test_batch import strip_timings
+
+QUERIES = [
+    "Show employees older than 30",
+    "Delete employees with salary less than 30000",
+    "Show departments with more than 2 employees",
+    None,
+    "Show employees older than 45",
+    "Show all employees",
+    "Show employees older than 30",
+]
+
+
+class TestBulkTranslation(unittest.TestCase):
+
+    def setUp(self):
+        pipeline.configure_cache()
+
+    def tearDown(self):
+        pipeline.configure_cache()
+
+    def test_process_pool_matches_in_process(self):
+        expected = strip_timings(pipeline.nl_to_sql_many(QUERIES))
+        pipeline.configure_cache()
+        results = list(translate_bulk(QUERIES, processes=2, chunksize=2))
+        self.assertEqual([result["sql"] for result in results], [result["sql"] for result in expected])
+        self.assertEqual([result["error"] for result in results], [result["error"] for result in expected])
+        self.assertIsNotNone(results[3]["error"])
+
+    def test_indexes_load_before_the_workers_fork(self):
+        catalog = build_default_catalog()
+        self.assertTrue(callable(catalog._indexes))
+        with mock.patch.object(bulk, "DEFAULT_CATALOG", catalog):
+            list(translate_bulk(QUERIES[:3], processes=2, chunksize=2))
+        if bulk._pool_context().get_start_method() == "fork":
+            self.assertFalse(callable(catalog._indexes))
+
+    def test_single_process(self):
+        results = list(translate_bulk(iter(QUERIES), processes=1, chunksize=3))
+        self.assertEqual([result["query"] for result in results], QUERIES)
+
+    def test_input_is_consumed_lazily(self):
+        consumed = []
+
+        def queries():
+            for i in range(10000):
+                consumed.append(i)
+                yield f"Show employees older than {i % 90 + 10}"
+
+        stream = translate_bulk(queries(), processes=2, chunksize=10, prefetch=2)
+        first = next(stream)
+        stream.close()
+        self.assertEqual(first["sql"], pipeline.nl_to_sql("Show employees older than 10", use_cache=False))
+        # Only the in-flight window (processes * prefetch chunks) was read
+        self.assertLessEqual(len(consumed), 2 * 2 * 10 + 10)
+
+
+class TestBatchMode(unittest.TestCase):
+
+    def test_read_plain_and_jsonl(self):
+        lines = [
+            "Show all employees\n",
+            "\n",
+            '{"id": 7, "question": "Delete employees younger than 25"}\n',
+            "{not json\n",
+            '{"other": 1}\n',
+        ]
+        records = list(read_queries(lines))
+        self.assertEqual(records[0], {"line": 1, "query": "Show all employees"})
+        self.assertEqual(records[1], {"line": 3, "query": "Delete employees younger than 25", "id": 7})
+        self.assertIn("invalid JSON", records[2]["error"])
+        self.assertIn("no query field", records[3]["error"])
+
+    def test_explicit_field(self):
+        records = list(read_queries(['{"title": "x", "body": "Show all employees"}'], fmt="jsonl", field="body"))
+        self.assertEqual(records[0]["query"], "Show all employees")
+
+    def test_run_batch_writes_json_lines(self):
+        lines = ["Show employees older than 30", "{broken", '{"request_id": "r1", "query": "Show all employees"}']
+        out = io.StringIO()
+        summary = run_batch(lines, out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(summary, {"total": 3, "errors": 1})
+        self.assertEqual([row["line"] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0]["intent"], "SELECT")
+        self.assertIn("age > 30", rows[0]["sql"])
+        self.assertIsNone(rows[1]["sql"])
+        self.assertEqual(rows[2]["id"], "r1")
+        self.assertIn("translate_ms", rows[2]["timings"])
+
+    def test_run_batch_with_workers(self):
+        lines = [f"Show employees older than {age}" for age in range(20, 60)]
+        sequential, parallel = io.StringIO(), io.StringIO()
+        run_batch(lines, sequential)
+        run_batch(lines, parallel, processes=2, chunksize=7)
+        sql = lambda out: [json.loads(line)["sql"] for line in out.getvalue().splitlines()]
+        self.assertEqual(sql(parallel), sql(sequential))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+import pipeline
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import DEFAULT_CATALOG, map_to_schema
+from schema_mapper.schema import SCHEMA
+
+SHOP = {
+    "customers": ["id", "name", "email", "city"],
+    "orders": ["id", "customer_id", "total", "status"],
+}
+
+
+class TestSchemaCatalog(unittest.TestCase):
+
+    def test_indexes(self):
+        self.assertEqual(DEFAULT_CATALOG.tables, tuple(SCHEMA))
+        self.assertEqual(DEFAULT_CATALOG.columns, tuple(sum(SCHEMA.values(), [])))
+        self.assertEqual(DEFAULT_CATALOG.column_tables["budget"], ("departments", "projects"))
+        self.assertEqual(DEFAULT_CATALOG.normalize("Names"), "name")
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            DEFAULT_CATALOG.tables = ()
+        with self.assertRaises(TypeError):
+            DEFAULT_CATALOG.column_tables["x"] = ("employees",)
+
+    def test_rank_tables(self):
+        self.assertEqual(DEFAULT_CATALOG.rank_tables(["budget", "location"]), ["departments", "projects", "employees"])
+        self.assertEqual(DEFAULT_CATALOG.rank_tables([], preferred="projects")[0], "projects")
+
+    def test_rank_tables_top_k(self):
+        wide = SchemaCatalog({f"t{i}": ["id", f"c{i % 7}"] for i in range(50)})
+        self.assertEqual(wide.rank_tables(["c3"], preferred="t10", limit=3), ["t10", "t3", "t17"])
+        self.assertEqual(wide.rank_tables(["c3"], limit=10), ["t3", "t10", "t17", "t24", "t31", "t38", "t45", "t0", "t1", "t2"])
+        self.assertEqual(wide.rank_tables(["c3"]), wide.rank_tables(["c3"], limit=50))
+        mapping = map_to_schema(["c5"], {"table": "t12", "filters": {}}, wide, max_tables=2)
+        self.assertEqual(mapping.tables, ("t12", "t5"))
+
+    def test_fingerprint_follows_content(self):
+        self.assertEqual(SchemaCatalog(SHOP).fingerprint, SchemaCatalog(dict(SHOP)).fingerprint)
+        self.assertNotEqual(SchemaCatalog(SHOP).fingerprint, DEFAULT_CATALOG.fingerprint)
+
+    def test_mapper_uses_given_catalog(self):
+        mapping = map_to_schema(["total", "status"], {"filters": {"city": "paris", "salary": 1}}, SchemaCatalog(SHOP))
+        self.assertEqual(mapping.tables[0], "orders")
+        self.assertEqual(dict(mapping.filters), {"city": "paris"})
+
+
+class TestPipelineCatalog(unittest.TestCase):
+
+    def setUp(self):
+        pipeline.configure_cache()
+
+    def tearDown(self):
+        pipeline.configure_cache()
+
+    def test_catalogs_do_not_share_cache_entries(self):
+        shop = SchemaCatalog(SHOP)
+        default_sql = pipeline.nl_to_sql("Show the totals of orders")
+        shop_sql = pipeline.nl_to_sql("Show the totals of orders", catalog=shop)
+        self.assertIn("FROM orders", shop_sql)
+        self.assertNotEqual(default_sql, shop_sql)
+        self.assertEqual(pipeline.nl_to_sql("Show the totals of orders", catalog=shop), shop_sql)
+        self.assertEqual(pipeline.nl_to_sql("Show the totals of orders", catalog=shop, use_cache=False), shop_sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
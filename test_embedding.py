@@ -0,0 +1,65 @@
+import math
+import unittest
+
+from pipeline import nl_to_sql
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.embedding import EmbeddingIndex, features
+from schema_mapper.mapper import DEFAULT_CATALOG
+
+SHOP = {
+    "customers": ["id", "name", "email", "city"],
+    "orders": ["id", "customer_id", "total", "status", "shipped_at"],
+}
+COMMENTS = {"total": "amount paid, order value", "shipped_at": "dispatched, delivery date"}
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = EmbeddingIndex(["id", "name", "total", "shipped_at"], COMMENTS)
+
+    def test_vectors_are_unit_length(self):
+        vector = features("customer email")
+        self.assertAlmostEqual(math.sqrt(sum(weight * weight for weight in vector.values())), 1.0)
+        self.assertEqual(features("Shipped_At"), features("shipped at"))
+        self.assertEqual(features("--"), {})
+
+    def test_comments_match_by_meaning(self):
+        self.assertEqual(self.index.top("dispatched", k=1), [("shipped_at", 1.0)])
+        self.assertEqual(self.index.top("order value", k=1)[0][0], "total")
+        # Partly shared words still score, below an exact phrase
+        column, score = self.index.top("paid amounts", k=1)[0]
+        self.assertEqual(column, "total")
+        self.assertLess(score, 1.0)
+        self.assertEqual(self.index.top("dispatched", k=3, cutoff=0.99), [("shipped_at", 1.0)])
+        self.assertEqual(self.index.top("", k=3), [])
+        self.assertEqual(self.index.top("dispatched", k=0), [])
+
+    def test_state_round_trip(self):
+        restored = EmbeddingIndex.from_state(self.index.state())
+        for term in ("dispatched", "names", "totals"):
+            self.assertEqual(restored.top(term), self.index.top(term))
+
+
+class TestSemanticMatching(unittest.TestCase):
+
+    def test_bundled_comments_name_columns(self):
+        self.assertEqual(DEFAULT_CATALOG.match_noun("wage")[1], ("salary",))
+        self.assertEqual(DEFAULT_CATALOG.match_noun("hired")[1], ("join_date",))
+        # An exact comment phrase wins over a near spelling ("wages" ~ "ages")
+        self.assertEqual(DEFAULT_CATALOG.match_noun("wages")[1], ("salary",))
+        # Exact names and typos still resolve by spelling
+        self.assertEqual(DEFAULT_CATALOG.match_noun("salries")[1], ("salary",))
+        self.assertEqual(DEFAULT_CATALOG.match_noun("the")[1], ())
+        self.assertEqual(nl_to_sql("Show income of employees"), "SELECT salary FROM employees;")
+
+    def test_comments_change_the_fingerprint(self):
+        plain = SchemaCatalog(SHOP)
+        commented = SchemaCatalog(SHOP, comments=COMMENTS)
+        self.assertNotEqual(plain.fingerprint, commented.fingerprint)
+        self.assertEqual(plain.match_noun("dispatched")[1], ())
+        self.assertEqual(commented.match_noun("dispatched")[1], ("shipped_at",))
+
+
+if __name__ == "__main__":
+    unittest.main()
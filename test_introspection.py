@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import pipeline
+from schema_mapper import introspection
+from schema_mapper.introspection import catalog_for, detect_dialect, read_primary_keys, read_schema, schema_version
+
+DDL = """
+CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, location TEXT, budget REAL);
+CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, budget REAL,
+                       department_id INTEGER REFERENCES departments);
+CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, salary REAL, city TEXT,
+                        department_id INTEGER, FOREIGN KEY (department_id) REFERENCES departments (id));
+"""
+
+
+class TestIntrospection(unittest.TestCase):
+
+    def setUp(self):
+        introspection.clear_catalogs()
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript(DDL)
+
+    def tearDown(self):
+        self.conn.close()
+        introspection.clear_catalogs()
+
+    def test_reads_tables_columns_and_foreign_keys(self):
+        schema, foreign_keys = read_schema(self.conn)
+        self.assertEqual(detect_dialect(self.conn), "sqlite")
+        self.assertEqual(list(schema), ["departments", "projects", "employees"])
+        self.assertEqual(schema["projects"], ["id", "name", "budget", "department_id"])
+        self.assertEqual(foreign_keys, [("projects", "department_id", "departments", "id"),
+                                        ("employees", "department_id", "departments", "id")])
+
+    def test_foreign_keys_to_an_implicit_parent_key(self):
+        self.conn.executescript("""
+        CREATE TABLE teams (code TEXT PRIMARY KEY, name TEXT);
+        CREATE TABLE players (id INTEGER PRIMARY KEY, team_code TEXT REFERENCES teams);
+        """)
+        foreign_keys = read_schema(self.conn)[1]
+        self.assertIn(("players", "team_code", "teams", "code"), foreign_keys)
+        self.assertNotIn(("players", "team_code", "teams", "id"), foreign_keys)
+
+    def test_reads_single_column_primary_keys(self):
+        self.conn.execute("CREATE TABLE assignments (employee_id INTEGER, project_id INTEGER, "
+                          "PRIMARY KEY (employee_id, project_id))")
+        self.conn.execute("CREATE TABLE notes (body TEXT)")
+        keys = {"departments": "id", "projects": "id", "employees": "id"}
+        self.assertEqual(read_primary_keys(self.conn), keys)
+        self.assertEqual(catalog_for(self.conn).primary_keys, keys)
+
+    def test_catalog_cached_until_schema_changes(self):
+        catalog = catalog_for(self.conn)
+        version = schema_version(self.conn)
+        self.assertIs(catalog_for(self.conn), catalog)
+        self.assertIn("name", catalog.schema["projects"])
+
+        self.conn.execute("ALTER TABLE projects ADD COLUMN status TEXT")
+        self.assertNotEqual(schema_version(self.conn), version)
+        changed = catalog_for(self.conn)
+        self.assertIsNot(changed, catalog)
+        self.assertIn("status", changed.schema["projects"])
+        self.assertNotEqual(changed.fingerprint, catalog.fingerprint)
+
+    def test_file_connections_share_a_catalog(self):
+        path = os.path.join(tempfile.mkdtemp(), "shop.db")
+        with sqlite3.connect(path) as conn:
+            conn.executescript(DDL)
+        first, second = sqlite3.connect(path), sqlite3.connect(path)
+        try:
+            self.assertIs(catalog_for(first), catalog_for(second))
+        finally:
+            first.close()
+            second.close()
+            os.remove(path)
+
+    def test_translation_runs_on_introspected_schema(self):
+        pipeline.configure_cache()
+        catalog = catalog_for(self.conn)
+        sql = pipeline.nl_to_sql("Show the names of projects", catalog=catalog)
+        self.assertEqual(sql, "SELECT name FROM projects;")
+        self.conn.execute(sql)
+        self.assertEqual(pipeline.nl_to_sql("Show all employees", catalog=catalog), "SELECT * FROM employees;")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from query_generator.generator import generate_sql
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.join_planner import JoinPlanner
+from schema_mapper.mapper import DEFAULT_CATALOG
+
+SHOP = {
+    "customers": ["id", "name", "region_id"],
+    "regions": ["id", "name"],
+    "orders": ["id", "customer_id", "total"],
+    "order_items": ["id", "order_id", "product_id", "quantity"],
+    "products": ["id", "name", "supplier_id"],
+    "suppliers": ["id", "name", "region_id"],
+}
+SHOP_KEYS = [
+    ("customers", "region_id", "regions", "id"),
+    ("orders", "customer_id", "customers", "id"),
+    ("order_items", "order_id", "orders", "id"),
+    ("order_items", "product_id", "products", "id"),
+    ("products", "supplier_id", "suppliers", "id"),
+    ("suppliers", "region_id", "regions", "id"),
+]
+
+
+class TestJoinPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.planner = JoinPlanner(SHOP_KEYS)
+
+    def test_path_follows_keys_both_ways(self):
+        self.assertEqual(self.planner.path("orders", "customers"), [("customers", "orders.customer_id", "customers.id")])
+        self.assertEqual(self.planner.path("customers", "orders"), [("orders", "customers.id", "orders.customer_id")])
+        self.assertEqual(self.planner.path("orders", "products"), [
+            ("order_items", "orders.id", "order_items.order_id"),
+            ("products", "order_items.product_id", "products.id"),
+        ])
+
+    def test_plan_is_a_minimal_tree(self):
+        plan = self.planner.plan("orders", {"customers", "products"})
+        self.assertEqual([join[0] for join in plan], ["customers", "order_items", "products"])
+        self.assertEqual(self.planner.plan("orders", {"orders"}), ())
+
+    def test_plan_shares_intermediate_tables(self):
+        plan = self.planner.plan("regions", ["orders", "customers"])
+        self.assertEqual([join[0] for join in plan], ["customers", "orders"])
+
+    def test_three_tables_meet_at_the_best_table(self):
+        # Attaching the closest table first goes r-x-a, then needs y and b too
+        planner = JoinPlanner([
+            ("r", "x_id", "x", "id"), ("x", "a_id", "a", "id"),
+            ("r", "y_id", "y", "id"), ("y", "a_id", "a", "id"),
+            ("b", "y_id", "y", "id"),
+        ])
+        plan = planner.plan("r", ["a", "b"])
+        self.assertEqual([join[0] for join in plan], ["y", "a", "b"])
+
+    def test_unreachable_tables(self):
+        planner = JoinPlanner(SHOP_KEYS + [("audit", "id", "audit", "parent_id")])
+        self.assertIsNone(planner.path("orders", "audit"))
+        self.assertIsNone(planner.plan("orders", {"customers", "audit"}))
+
+    def test_bundled_schema(self):
+        self.assertEqual(DEFAULT_CATALOG.join_planner.plan("projects", {"employees"}), (
+            ("departments", "projects.department_id", "departments.id"),
+            ("employees", "departments.id", "employees.department_id"),
+        ))
+
+
+class TestGeneratedJoins(unittest.TestCase):
+    JOIN = [{"type": "LEFT", "table": "products", "on": {"left": "orders.product_id", "right": "products.id"}}]
+
+    def test_generator_plans_through_intermediate_tables(self):
+        catalog = SchemaCatalog(SHOP, foreign_keys=SHOP_KEYS)
+        self.assertEqual(
+            generate_sql("SELECT", ["orders"], [], joins=self.JOIN, catalog=catalog),
+            "SELECT * FROM orders INNER JOIN order_items ON orders.id = order_items.order_id "
+            "LEFT JOIN products ON order_items.product_id = products.id;",
+        )
+
+    def test_generator_keeps_given_condition_without_keys(self):
+        self.assertEqual(
+            generate_sql("SELECT", ["orders"], [], joins=self.JOIN, catalog=SchemaCatalog(SHOP)),
+            "SELECT * FROM orders LEFT JOIN products ON orders.product_id = products.id;",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import random
+import sqlite3
+import unittest
+
+from query_generator.generator import build_statement, generate_sql
+from query_generator.optimizer import decorrelate, drop_dead_ctes, inline_ctes, optimize
+from query_generator.sql_ast import Compare, Count, Cte, From, GroupBy, Join, Select, Where, render
+
+
+def _company(departments: int = 30, employees: int = 400, seed: int = 3):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE departments (id INTEGER, name TEXT, budget INTEGER)")
+    conn.execute("CREATE TABLE employees (id INTEGER, name TEXT, salary INTEGER, department_id INTEGER)")
+    conn.executemany("INSERT INTO departments VALUES (?, ?, ?)",
+                     [(i, f"d{i}", rng.randint(1, 9) * 10000) for i in range(departments)])
+    # Skewed, with empty departments, unknown departments and no department at all
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?)", [
+        (i, f"e{i}", rng.randint(30, 120) * 1000,
+         rng.choice([None, departments + 5] + [int(rng.paretovariate(1.2)) % departments for _ in range(8)]))
+        for i in range(employees)
+    ])
+    return conn
+
+
+def _count_statement(op: str, value, columns=("departments.*",)):
+    count = Count("employees", "department_id", "departments.id")
+    return Select(columns, From("departments"), Where((Compare(count, op, value), Compare("budget", ">", 20000))))
+
+
+class TestDecorrelate(unittest.TestCase):
+
+    def test_same_rows_as_the_correlated_subquery(self):
+        conn = _company()
+        for op in (">", ">=", "<", "<=", "="):
+            for value in (0, 1, 3, 12):
+                statement = _count_statement(op, value)
+                expected = sorted(conn.execute(render(statement)).fetchall())
+                rewritten = render(decorrelate(statement))
+                self.assertNotIn("SELECT COUNT(*) FROM employees WHERE", rewritten)
+                self.assertEqual(sorted(conn.execute(rewritten).fetchall()), expected, (op, value))
+
+    def test_join_kind_and_star(self):
+        inner = render(decorrelate(_count_statement(">", 2, ("*",))))
+        self.assertTrue(inner.startswith("SELECT departments.* FROM departments INNER JOIN (SELECT department_id, "
+                                         "COUNT(*) AS row_count FROM employees GROUP BY department_id) AS employees_counts"))
+        self.assertIn("WHERE employees_counts.row_count > 2 AND budget > 20000", inner)
+        # Departments without employees count 0, which is less than 2
+        self.assertIn("LEFT JOIN", render(decorrelate(_count_statement("<", 2))))
+        self.assertIn("COALESCE(employees_counts.row_count, 0) < 2", render(decorrelate(_count_statement("<", 2))))
+
+    def test_generated_sql_is_not_correlated(self):
+        conn = _company()
+        subqueries = [{"type": "count", "operator": "more than", "value": 2, "table": "employees"}]
+        statement = build_statement("SELECT", ["employees"], [], subqueries=subqueries)
+        sql = generate_sql("SELECT", ["employees"], [], subqueries=subqueries)
+        self.assertEqual(sql, render(optimize(statement)) + ";")
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+        self.assertNotIn("CORRELATED", plan)
+        self.assertIn("CORRELATED", " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + render(statement))))
+        # The average is computed once already; it is left as a subquery
+        average = generate_sql("SELECT", ["employees"], [], subqueries=[
+            {"type": "comparison", "operator": "more than", "comparison": "average", "column": "salary"}])
+        self.assertIn("> (SELECT AVG(salary) FROM employees)", average)
+        self.assertNotIn("CORRELATED", " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + average)))
+
+    def test_leaves_other_statements_alone(self):
+        plain = Select(("*",), From("employees"), Where((Compare("salary", ">", 5),)))
+        self.assertIs(optimize(plain), plain)
+        # The count belongs to departments, which this statement doesn't read
+        other = Select(("*",), From("projects"), Where((Compare(Count("employees", "department_id", "departments.id"), ">", 1),)))
+        self.assertIs(decorrelate(other), other)
+
+
+class TestCtes(unittest.TestCase):
+
+    def test_row_filters_fold_into_the_statement(self):
+        conn = _company()
+        conn.execute("ALTER TABLE employees ADD COLUMN age INTEGER")
+        conn.execute("UPDATE employees SET age = 20 + id % 40")
+        join = [{"type": "INNER", "table": "departments",
+                 "on": {"left": "employees.department_id", "right": "departments.id"}}]
+        for kind in ("high_salary", "senior", "junior"):
+            ctes = [{"type": kind, "name": f"{kind}_employees"}]
+            for intent, columns, joins in [("SELECT", [], None), ("SELECT", ["salary"], join), ("AGGREGATE", ["salary"], None)]:
+                statement = build_statement(intent, ["employees"], columns, {"budget": {"gt": 20000}} if joins else None,
+                                            joins, ctes=ctes)
+                # Read through the CTE as built, the statement already runs
+                expected = sorted(conn.execute(render(statement)).fetchall())
+                optimized = optimize(statement)
+                self.assertEqual(optimized.ctes, ())
+                self.assertEqual(optimized.source.table, "employees")
+                self.assertEqual(sorted(conn.execute(render(optimized)).fetchall()), expected, (kind, intent))
+        self.assertEqual(generate_sql("SELECT", ["employees"], ["city"], {"city": "Oslo"},
+                                      ctes=[{"type": "senior", "name": "senior_employees"}], placeholder="?"),
+                         ("SELECT city FROM employees WHERE age > ? AND city = ?;", (30, "Oslo")))
+
+    def test_unread_ctes_are_dropped(self):
+        self.assertEqual(
+            generate_sql("SELECT", ["employees"], [], ctes=[{"type": "department_summary", "name": "department_summary"}]),
+            "SELECT * FROM employees;")
+        summary = Cte("summary", Select(("department_id", "COUNT(*) AS n"), From("employees"),
+                                        group_by=GroupBy(("department_id",))))
+        feeder = Cte("feeder", "SELECT * FROM summary")
+        statement = Select(("*",), From("employees"), ctes=(summary, feeder))
+        # feeder reads summary, but nothing reads feeder
+        self.assertEqual(drop_dead_ctes(statement).ctes, ())
+        read = statement._replace(source=From("feeder"))
+        self.assertIs(drop_dead_ctes(read), read)
+
+    def test_ctes_read_twice_or_grouping_stay_named(self):
+        rich = Cte("rich", Select(("*",), From("employees"), Where((Compare("salary", ">", 9),))))
+        twice = Select(("*",), From("rich", (Join("rich", "rich.id", "rich.manager_id"),)), ctes=(rich,))
+        self.assertIs(inline_ctes(twice), twice)
+        summary = Cte("summary", Select(("department_id", "COUNT(*) AS n"), From("employees"),
+                                        group_by=GroupBy(("department_id",))))
+        grouped = Select(("*",), From("summary"), ctes=(summary,))
+        self.assertIs(optimize(grouped), grouped)
+
+
+if __name__ == "__main__":
+    unittest.main()
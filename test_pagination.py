@@ -0,0 +1,121 @@
+import importlib.util
+import sqlite3
+import unittest
+from unittest import mock
+
+import pipeline
+from pipeline import nl_to_sql, nl_to_sql_page, page_token, token_after
+from query_generator import generator
+from prepared import PreparedStatements
+from query_generator.pagination import Page, paginate
+from query_generator.sql_ast import Compare, Delete, From, GroupBy, Select, Where, Window, render
+from schema_mapper.introspection import introspect
+
+
+def _employees(count: int = 23):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, age INTEGER, salary INTEGER, city TEXT)")
+    # Inserted out of key order, so pages can't lean on insertion order
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)", [
+        (id_, f"e{id_}", 20 + id_ % 30, 1000 * id_, "Oslo" if id_ % 3 else "Lima")
+        for id_ in sorted(range(1, count + 1), key=lambda n: (n * 7) % count)
+    ])
+    return conn
+
+
+class TestPaginate(unittest.TestCase):
+
+    def test_keyset_page(self):
+        statement = Select(("name",), From("employees"), Where((Compare("age", ">", 30),)))
+        paged, key = paginate(statement, Page(50, 120), "id")
+        self.assertEqual(key, "employees.id")
+        self.assertEqual(render(paged), "SELECT name, employees.id FROM employees "
+                                        "WHERE age > 30 AND employees.id > 120 ORDER BY employees.id ASC LIMIT 50")
+        self.assertEqual(render(paginate(Select(("*",), From("employees")), Page(10), "id")[0]),
+                         "SELECT * FROM employees ORDER BY employees.id ASC LIMIT 10")
+
+    def test_capped_when_not_pageable(self):
+        capped = [
+            (Select(("*",), From("employees")), None, "SELECT * FROM employees LIMIT 10"),
+            (Select(("*",), From("employees"), order_by=("salary", "DESC"), limit=3), "id",
+             "SELECT * FROM employees ORDER BY salary DESC LIMIT 3"),
+            (Select(("city", "COUNT(*)"), From("employees"), group_by=GroupBy(("city",))), "id",
+             "SELECT city, COUNT(*) FROM employees GROUP BY city LIMIT 10"),
+            (Select(("*", Window("RANK", "salary")), From("employees")), "id",
+             "SELECT *, RANK() OVER (ORDER BY salary ASC) as rank_num FROM employees LIMIT 10"),
+        ]
+        for statement, key, sql in capped:
+            paged, found = paginate(statement, Page(10, 5), key)
+            self.assertEqual((render(paged), found), (sql, None))
+        delete = Delete("employees")
+        self.assertEqual(paginate(delete, Page(10), "id"), (delete, None))
+
+
+class TestPages(unittest.TestCase):
+
+    def test_pages_cover_every_row_once(self):
+        conn = _employees()
+        catalog = introspect(conn)
+        statements = PreparedStatements(conn)
+        for query in ["Show all employees", "Show employees older than 30", "Show employees in Oslo"]:
+            expected = sorted(conn.execute(nl_to_sql(query, catalog=catalog)).fetchall())
+            seen, token, pages = [], None, 0
+            while True:
+                after = token_after(token, query)
+                (sql, params), key = nl_to_sql_page(query, 5, after, "?", catalog=catalog)
+                columns, rows, _ = statements.run(sql, params)
+                pages += 1
+                seen.extend(row[:len(expected[0])] for row in rows)
+                if len(rows) < 5:
+                    break
+                token = page_token(query, rows[-1][columns.index(key.rpartition(".")[2])])
+            self.assertEqual(sorted(seen), expected, query)
+            self.assertEqual(pages, len(expected) // 5 + 1)
+
+    def test_pages_share_one_cache_entry(self):
+        pipeline.configure_cache()
+        generator.clear_cache()
+        catalog = introspect(_employees())
+        query = "Show employees older than 30"
+        pages = [nl_to_sql_page(query, 5, after, "?", catalog=catalog)[0] for after in (None, 5, 10, 15, 20)]
+        self.assertEqual(pages[2], ("SELECT age, employees.id FROM employees WHERE age > ? AND employees.id > ? "
+                                    "ORDER BY employees.id ASC LIMIT 5;", (30, 10)))
+        self.assertEqual(pipeline.cache_stats()["entries"], 1)
+        self.assertEqual(len(generator._generated), 1)
+        self.assertEqual(nl_to_sql_page(query, 5, 10, "?", catalog=catalog)[0], pages[2])
+        self.assertEqual(pipeline.cache_stats()["hits"], 5)
+
+    def test_tokens(self):
+        token = page_token("Show  all employees", 17)
+        self.assertEqual(token_after(token, "show all employees"), 17)
+        # A token only continues the question it came from
+        self.assertIsNone(token_after(token, "show all departments"))
+        self.assertIsNone(token_after("not a token", "show all employees"))
+        self.assertIsNone(token_after(None, "show all employees"))
+
+    def test_plain_translation_is_unbounded(self):
+        self.assertEqual(nl_to_sql("Show all employees"), "SELECT * FROM employees;")
+        self.assertEqual(nl_to_sql_page("Top 3 employees by salary", 100),
+                         ("SELECT *, RANK() OVER (ORDER BY salary DESC) as rank_num FROM employees "
+                          "ORDER BY salary DESC LIMIT 3;", None))
+
+
+@unittest.skipUnless(importlib.util.find_spec("gradio") and importlib.util.find_spec("pandas"), "needs gradio and pandas")
+class TestApp(unittest.TestCase):
+
+    def test_full_page_continues(self):
+        import app
+
+        query = "Show employees older than 30"
+        with mock.patch.object(app, "PAGE_SIZE", 5):
+            sql, result, error, token = app.translate_and_run(query, _employees, background_refresh=False)
+            self.assertIsNone(error)
+            after = token_after(token, query)
+            self.assertIsInstance(after, int)
+            sql, result, error, token = app.translate_and_run(query, _employees, background_refresh=False, token=token)
+        self.assertIsNone(error)
+        self.assertIn(f"employees.id > {after}", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
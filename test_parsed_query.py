@@ -0,0 +1,70 @@
+import pickle
+import unittest
+
+from parser_agent.parsed_query import FrozenDict, ParsedQuery
+from parser_agent.parser import parse_natural_language
+from query_generator.generator import generate_sql, generate_sql_for
+from schema_mapper.mapper import map_to_schema
+from schema_mapper.mapping import SchemaMapping
+
+
+class TestParsedQuery(unittest.TestCase):
+
+    def test_immutable(self):
+        parsed = parse_natural_language("show employees who earn between 40000 and 80000")
+        with self.assertRaises(AttributeError):
+            parsed.action = "delete"
+        with self.assertRaises(TypeError):
+            parsed.filters["city"] = "london"
+        with self.assertRaises(TypeError):
+            parsed["filters"]["salary"]["between"] = [1, 2]
+
+    def test_hashable_cache_key(self):
+        first = parse_natural_language("show employees in london")
+        second = parse_natural_language("SHOW employees in london")
+        self.assertEqual(first, second)
+        self.assertEqual({first: "sql"}[second], "sql")
+        self.assertNotEqual(first, parse_natural_language("show employees in paris"))
+
+    def test_dict_compatibility(self):
+        parsed = parse_natural_language("what is the average salary in employees?")
+        self.assertEqual(parsed["function"], "avg")
+        self.assertIn("function", parsed)
+        self.assertIsNone(parse_natural_language("show all employees").get("function"))
+        self.assertEqual(ParsedQuery.from_dict(parsed.to_dict()), parsed)
+
+    def test_pickle_round_trip(self):
+        parsed = parse_natural_language("show departments with average salary > 50000")
+        mapping = map_to_schema(list(parsed.columns), parsed)
+        self.assertEqual(pickle.loads(pickle.dumps(parsed)), parsed)
+        self.assertEqual(pickle.loads(pickle.dumps(mapping)), mapping)
+        self.assertIsInstance(pickle.loads(pickle.dumps(FrozenDict(a=1))), FrozenDict)
+
+
+class TestSchemaMapping(unittest.TestCase):
+
+    def test_mapper_leaves_parse_untouched(self):
+        parsed = parse_natural_language("show names of employees in engineering who earn more than 50000")
+        before = parsed.to_dict()
+        mapping = map_to_schema(list(parsed.columns) + list(parsed.filters), parsed)
+        self.assertEqual(parsed.to_dict(), before)
+        self.assertIsInstance(mapping, SchemaMapping)
+        self.assertEqual(mapping["tables"][0], "employees")
+        self.assertIn("department_id", mapping.filters)
+        self.assertNotIn("department", mapping.filters)
+
+    def test_generator_accepts_types(self):
+        parsed = parse_natural_language("rank employees by salary desc")
+        mapping = map_to_schema(list(parsed.columns) + list(parsed.filters), parsed)
+        legacy = generate_sql(
+            "SELECT", list(mapping.tables), list(mapping.columns), dict(mapping.filters),
+            parsed.to_dict()["joins"], parsed.group_by, dict(parsed.having),
+            [], parsed.to_dict()["window_functions"], [], [],
+        )
+        self.assertEqual(generate_sql_for("SELECT", parsed, mapping), legacy)
+        # The shared mapping is not modified by window-function columns
+        self.assertEqual(generate_sql_for("SELECT", parsed, mapping), legacy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import re
+import unittest
+
+from parser_agent.parser import (
+    ADVANCED_AGG_PATTERNS,
+    CTE_PATTERNS,
+    GROUP_BY_PATTERNS,
+    HAVING_PATTERNS,
+    JOIN_PATTERNS,
+    STAGE_TRIGGERS,
+    SUBQUERY_PATTERNS,
+    WINDOW_PATTERNS,
+)
+from parser_agent.patterns import PatternFamily, TriggerIndex, required_literals
+
+FAMILIES = [
+    GROUP_BY_PATTERNS,
+    HAVING_PATTERNS,
+    SUBQUERY_PATTERNS,
+    WINDOW_PATTERNS,
+    CTE_PATTERNS,
+    ADVANCED_AGG_PATTERNS,
+    JOIN_PATTERNS,
+]
+
+QUERIES = [
+    "show all employees",
+    "show departments with average salary > 50000",
+    "show employees who earn more than average",
+    "show departments with more than 2 employees",
+    "rank employees by salary desc",
+    "top 3 employees by salary",
+    "show high salary employees",
+    "with temp as (select 1) show employees",
+    "show employees with rollup",
+    "salary rollup by department",
+    "show employees and their departments",
+    "group employees by department and show count",
+    "show employees in new york",
+    "insert a new employee named john with salary 60000",
+    "delete employees younger than 25",
+    "show employee count by city",
+    "dense rank by age",
+    "multi dimensional analysis",
+]
+
+
+def legacy_search(patterns, query):
+    for i, pattern in enumerate(patterns):
+        match = re.search(pattern, query)
+        if match:
+            return i, match
+    return None, None
+
+
+class TestPatternFamily(unittest.TestCase):
+
+    def test_matches_legacy_loop(self):
+        for family in FAMILIES:
+            for query in QUERIES:
+                index, expected = legacy_search(family.patterns, query)
+                match = family.search(query)
+                if expected is None:
+                    self.assertIsNone(match, (family, query))
+                    continue
+                self.assertEqual(match.index, index, (family, query))
+                self.assertEqual(match.pattern, family.patterns[index])
+                self.assertEqual(match.groups(), expected.groups())
+                self.assertEqual(match.group(0), expected.group(0))
+                self.assertEqual(match.span(), expected.span())
+
+    def test_priority_beats_position(self):
+        family = PatternFamily("test", [r"second", r"first"])
+        match = family.search("first second")
+        self.assertEqual(match.index, 0)
+        self.assertEqual(match.span(), (6, 12))
+
+    def test_branch_groups_are_isolated(self):
+        family = PatternFamily("test", [r"a(\d+)b(\d+)", r"rank\s+by\s+(\w+)"])
+        match = family.search("rank by salary")
+        self.assertEqual(match.index, 1)
+        self.assertEqual(match.groups(), ("salary",))
+        self.assertEqual(match.group(1), "salary")
+
+    def test_no_match(self):
+        self.assertIsNone(PatternFamily("test", [r"cube"]).search("show all employees"))
+
+
+class TestTriggerIndex(unittest.TestCase):
+
+    def test_required_literals(self):
+        self.assertEqual(required_literals(r"rank\s+employees?\s+by\s+(\w+)"), ["rank", "employee", "by"])
+        self.assertEqual(required_literals(r"with\s+(\w+)\s+as\s+\((.+?)\)"), ["with", "as"])
+        self.assertEqual(required_literals(r"(\w+)\s*(>|<|=)\s*(\d+)"), [])
+        self.assertEqual(required_literals(r"cube|rollup"), [])
+
+    def test_never_skips_a_matching_family(self):
+        for query in QUERIES:
+            stages = STAGE_TRIGGERS.scan(query)
+            for family in FAMILIES:
+                if family.search(query):
+                    self.assertIn(family.name, stages, query)
+
+    def test_simple_queries_skip_stages(self):
+        stages = STAGE_TRIGGERS.scan("show employees in new york")
+        for name in ["group_by", "subquery", "window", "cte", "advanced_agg", "join"]:
+            self.assertNotIn(name, stages)
+
+    def test_overlapping_triggers(self):
+        index = TriggerIndex([
+            PatternFamily("short", [r"group\s+by"]),
+            PatternFamily("long", [r"grouping\s+sets"]),
+        ])
+        self.assertEqual(index.scan("grouping sets"), {"short", "long"})
+        self.assertEqual(index.scan("group by city"), {"short"})
+
+    def test_literal_free_family_always_enabled(self):
+        index = TriggerIndex([PatternFamily("having", [r"(\w+)\s*(>)\s*(\d+)"])])
+        self.assertEqual(index.scan(""), {"having"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+import unittest
+
+import prepared
+from pipeline import nl_to_sql, nl_to_sql_params
+from prepared import PreparedStatements, drop_session, session_for
+
+
+def _employees():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE employees (id INTEGER, name TEXT, age INTEGER, salary INTEGER, city TEXT)")
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)", [
+        (1, "Ann", 25, 40000, "New York"), (2, "Bo", 35, 65000, "Boston"), (3, "Cy", 45, 90000, "New York"),
+    ])
+    conn.commit()
+    return conn
+
+
+class FakeCursor:
+    description = None
+    rowcount = 0
+
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class TestPreparedStatements(unittest.TestCase):
+
+    def test_bound_sql_returns_the_written_out_rows(self):
+        conn = _employees()
+        statements = PreparedStatements(conn)
+        for query in ["Show employees earning more than 50000", "Show employees in New York who are older than 30",
+                      "Show employees with age between 20 and 40"]:
+            sql, params = nl_to_sql_params(query, statements.placeholder)
+            self.assertTrue(params)
+            expected = conn.execute(nl_to_sql(query)).fetchall()
+            columns, rows, _ = statements.run(sql, params)
+            self.assertEqual(rows, expected)
+            self.assertTrue(columns)
+        columns, rows, count = statements.run(*nl_to_sql_params("Delete employees younger than 30"))
+        self.assertEqual((columns, rows, count), (None, [], 1))
+
+    def test_literals_share_one_statement(self):
+        first = nl_to_sql_params("Show employees earning more than 50000", "$1")
+        second = nl_to_sql_params("Show employees earning more than 70000", "$1")
+        self.assertEqual(first[0], second[0])
+        self.assertEqual((first[1], second[1]), ((50000,), (70000,)))
+
+    def test_postgres_prepares_once_and_deallocates_the_oldest(self):
+        conn = FakeConnection()
+        statements = PreparedStatements(conn, "postgresql", max_statements=2)
+        statements.run("SELECT * FROM t WHERE a > $1;", (1,))
+        statements.run("SELECT * FROM t WHERE a > $1", (2,))
+        self.assertEqual(conn.log, [
+            ("PREPARE naturalsql_1 AS SELECT * FROM t WHERE a > $1", None),
+            ("EXECUTE naturalsql_1 (%s)", (1,)),
+            ("EXECUTE naturalsql_1 (%s)", (2,)),
+        ])
+        statements.run("SELECT * FROM t", ())
+        statements.run("SELECT * FROM u", ())
+        self.assertIn(("DEALLOCATE naturalsql_1", None), conn.log)
+        self.assertEqual((len(statements), statements.prepares, statements.executions), (2, 3, 4))
+
+    def test_sessions_are_kept_until_dropped(self):
+        opened = []
+
+        def connect():
+            opened.append(FakeConnection())
+            return opened[-1]
+
+        try:
+            first = session_for("db", connect, "postgresql")
+            self.assertIs(session_for("db", connect, "postgresql"), first)
+            drop_session("db")
+            self.assertTrue(opened[0].closed)
+            self.assertIsNot(session_for("db", connect, "postgresql"), first)
+            self.assertEqual(len(opened), 2)
+        finally:
+            prepared.close_sessions()
+
+    def test_holding_the_connection_keeps_other_threads_out(self):
+        statements = PreparedStatements(sqlite3.connect(":memory:", check_same_thread=False))
+        done = threading.Event()
+
+        def run():
+            statements.run("SELECT 2")
+            done.set()
+
+        with statements:
+            statements.run("SELECT 1")
+            worker = threading.Thread(target=run)
+            worker.start()
+            self.assertFalse(done.wait(0.1))
+        worker.join()
+        self.assertTrue(done.is_set())
+        statements.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import difflib
+import unittest
+
+from schema_mapper.mapper import DEFAULT_CATALOG
+from schema_mapper.ngram_index import TrigramIndex, trigrams
+from schema_mapper.schema import SCHEMA
+from schema_mapper.symspell import SymSpellIndex, edit_distance
+
+NOUNS = ["name", "names", "salary", "salaries", "department_id", "employee", "employees",
+         "city", "age", "budget", "titel", "id", "join_date", "xyz", "sum", "count"]
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def test_short_words_have_trigrams(self):
+        self.assertEqual(trigrams("id"), {"$$i", "$id", "id$", "d$$"})
+
+    def test_matches_difflib_on_schema(self):
+        columns = sum(SCHEMA.values(), [])
+        index = TrigramIndex(columns)
+        tables = TrigramIndex(SCHEMA.keys())
+        for noun in NOUNS:
+            self.assertEqual(index.get_close_matches(noun, n=2), difflib.get_close_matches(noun, columns, n=2), noun)
+            self.assertEqual(tables.get_close_matches(noun, n=1), difflib.get_close_matches(noun, list(SCHEMA), n=1))
+
+    def test_keeps_duplicate_terms(self):
+        index = TrigramIndex(sum(SCHEMA.values(), []))
+        self.assertEqual(index.get_close_matches("name", n=2), ["name", "name"])
+
+    def test_shortlist_on_wide_schema(self):
+        columns = [f"{prefix}_{suffix}" for prefix in ("customer", "order", "invoice", "vendor", "product")
+                   for suffix in ("total", "date", "status", "amount", "region", "price", "tax", "rate",
+                                  "city", "email", "phone", "balance", "currency", "quantity", "category",
+                                  "discount", "address")]
+        index = TrigramIndex(columns, candidates=8)
+        self.assertGreater(len(columns), index.candidates)
+        for noun in ["order_totals", "custmer_email", "invoice_tax", "vendor_rate", "weather"]:
+            self.assertEqual(index.get_close_matches(noun, n=2), difflib.get_close_matches(noun, columns, n=2), noun)
+
+
+class TestSymSpell(unittest.TestCase):
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("salary", "salry", 2), 1)
+        self.assertEqual(edit_distance("salary", "slaary", 2), 1)
+        self.assertEqual(edit_distance("department", "departmnet", 2), 1)
+        self.assertEqual(edit_distance("budget", "gadget", 2), 2)
+        self.assertEqual(edit_distance("name", "position", 2), 3)
+
+    def test_finds_misspellings_and_aliases(self):
+        index = SymSpellIndex(["salary", "name", "department_id", "city"], {"salaries": "salary", "cities": "city"})
+        self.assertEqual(index.lookup("salry"), ["salary"])
+        self.assertEqual(index.lookup("departmnt_id"), ["department_id"])
+        self.assertEqual(index.lookup("salries"), ["salary"])
+        self.assertEqual(index.lookup("citys"), ["city"])
+        self.assertEqual(index.lookup("weather"), [])
+
+    def test_short_words_need_exact_or_near_matches(self):
+        index = SymSpellIndex(["id", "age", "name"])
+        self.assertEqual(index.lookup("id"), ["id"])
+        self.assertEqual(index.lookup("ix"), [])
+        self.assertEqual(index.lookup("nam"), ["name"])
+
+    def test_only_closest_terms_are_returned(self):
+        index = SymSpellIndex(["join_date", "end_date", "start_date"])
+        self.assertEqual(index.lookup("join_date", n=2), ["join_date"])
+        self.assertEqual(index.lookup("join_dte", n=2), ["join_date"])
+
+    def test_shared_prefixes(self):
+        columns = [f"customer_{suffix}" for suffix in ("total", "date", "status", "amount", "region", "email")]
+        index = SymSpellIndex(columns, affix_length=4)
+        self.assertEqual(index.lookup("customer_stauts"), ["customer_status"])
+        self.assertEqual(index.lookup("customr_email"), ["customer_email"])
+
+    def test_catalog_resolves_typos(self):
+        self.assertEqual(DEFAULT_CATALOG.match_noun("salry"), ((), ("salary",)))
+        self.assertEqual(DEFAULT_CATALOG.match_noun("emplyees"), (("employees",), ()))
+        self.assertEqual(DEFAULT_CATALOG.match_noun("departmnt"), (("departments",), ("department_id",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from schema_mapper import introspection
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapper import DEFAULT_CATALOG, map_to_schema
+from schema_mapper.snapshot import load_snapshot, read_header, save_snapshot, source_version
+
+SHOP = {
+    "customers": ["id", "name", "email", "city"],
+    "orders": ["id", "customer_id", "total", "status"],
+}
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "schema_snapshot.bin")
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_round_trip(self):
+        catalog = SchemaCatalog(SHOP, {"totals": "total"}, {"customer_id": "customer"},
+                                [("orders", "customer_id", "customers", "id")], {"total": "amount paid"},
+                                {"orders": "id"})
+        save_snapshot(catalog, self.path, "v1")
+        loaded = load_snapshot(self.path, "v1")
+        self.assertEqual(loaded.fingerprint, catalog.fingerprint)
+        self.assertEqual(loaded.state(), catalog.state())
+        self.assertEqual(loaded.tables, catalog.tables)
+        # Indexes come out of the file on the first fuzzy lookup
+        self.assertTrue(callable(loaded._indexes))
+        self.assertEqual(loaded.match_noun("totals"), catalog.match_noun("totals"))
+        self.assertFalse(callable(loaded._indexes))
+        self.assertEqual(loaded.match_noun("amount paid")[1], ("total",))
+        self.assertEqual(loaded.primary_keys, {"orders": "id"})
+
+    def test_mapper_output_unchanged(self):
+        save_snapshot(DEFAULT_CATALOG, self.path, "v1")
+        loaded = load_snapshot(self.path)
+        for nouns in (["salary", "names"], ["budget"], ["titel", "department"]):
+            self.assertEqual(map_to_schema(nouns, None, loaded), map_to_schema(nouns, None, DEFAULT_CATALOG))
+
+    def test_stale_or_foreign_files_are_ignored(self):
+        save_snapshot(SchemaCatalog(SHOP), self.path, "v1")
+        self.assertIsNone(load_snapshot(self.path, "v2"))
+        self.assertIsNone(load_snapshot(self.path + ".missing"))
+        with open(self.path, "r+b") as f:
+            f.write(b"NOTASNAP")
+        self.assertIsNone(read_header(self.path))
+        self.assertIsNone(load_snapshot(self.path))
+
+    def test_source_version_follows_inputs(self):
+        self.assertEqual(source_version(SHOP, {}), source_version(dict(SHOP), {}))
+        self.assertNotEqual(source_version(SHOP, {}), source_version(SHOP, {"names": "name"}))
+
+    def test_introspection_reuses_snapshot(self):
+        introspection.clear_catalogs()
+        db = self.path + ".db"
+        conn = sqlite3.connect(db)
+        try:
+            conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, total REAL)")
+            first = introspection.catalog_for(conn, snapshot=self.path)
+            introspection.clear_catalogs()
+            restored = introspection.catalog_for(conn, snapshot=self.path)
+            self.assertEqual(restored.fingerprint, first.fingerprint)
+            self.assertTrue(callable(restored._indexes))
+
+            conn.execute("ALTER TABLE orders ADD COLUMN status TEXT")
+            introspection.clear_catalogs()
+            changed = introspection.catalog_for(conn, snapshot=self.path)
+            self.assertIn("status", changed.column_set)
+            self.assertEqual(load_snapshot(self.path).fingerprint, changed.fingerprint)
+        finally:
+            conn.close()
+            os.remove(db)
+            introspection.clear_catalogs()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import sys
+import unittest
+
+from parser_agent.parser import parse_natural_language
+from query_generator import generator
+from query_generator.generator import build_statement, generate_sql, generate_sql_for
+from query_generator.sql_ast import (
+    Between, Compare, Cte, Delete, From, GroupBy, Having, Insert, Join, Raw, Select, Update, Where, Window, inline, render,
+)
+from schema_mapper.catalog import SchemaCatalog
+from schema_mapper.mapping import SchemaMapping
+from schema_mapper.value_index import ValueIndex
+
+
+class TestRenderer(unittest.TestCase):
+
+    def test_select_clauses_in_sql_order(self):
+        statement = Select(
+            ("city", Window("RANK", "salary", "DESC")),
+            From("employees", (Join("departments", "employees.department_id", "departments.id", "LEFT"),)),
+            Where((Compare("salary", ">", 50000), Between("age", 20, 30), Raw("budget > 10"))),
+            GroupBy(("city",)),
+            Having("COUNT(*)", ">", 2),
+            order_by=("salary", "DESC"),
+            limit=5,
+            ctes=(Cte("rich", Select(("*",), From("employees"), Where((Compare("salary", ">", 90000),)))),),
+        )
+        self.assertEqual(render(statement), (
+            "WITH rich AS (SELECT * FROM employees WHERE salary > 90000) "
+            "SELECT city, RANK() OVER (ORDER BY salary DESC) as rank_num "
+            "FROM employees LEFT JOIN departments ON employees.department_id = departments.id "
+            "WHERE salary > 50000 AND age BETWEEN 20 AND 30 AND budget > 10 "
+            "GROUP BY city HAVING COUNT(*) > 2 ORDER BY salary DESC LIMIT 5"
+        ))
+        self.assertEqual(render(Select(("a",), From("t"), group_by=GroupBy(("a", "b"), "ROLLUP"))),
+                         "SELECT a FROM t GROUP BY ROLLUP(a, b)")
+
+    def test_other_statements_and_quoting(self):
+        self.assertEqual(render(Insert("employees", ("name", "age"), ("O'Brien", 30))),
+                         "INSERT INTO employees (name, age) VALUES ('O''Brien', 30)")
+        self.assertEqual(render(Update("employees", (("salary", 5),), Where((Compare("city", "=", "Oslo"),)))),
+                         "UPDATE employees SET salary = 5 WHERE city = 'Oslo'")
+        self.assertEqual(render(Delete("employees")), "DELETE FROM employees")
+
+    def test_placeholders_bind_values_in_order(self):
+        statement = Select(
+            ("*",), From("employees"),
+            Where((Compare("city", "=", "Oslo"), Between("age", 20, 30), Compare("salary", ">", Raw("(SELECT 1)")),
+                   Compare("join_date", "LIKE", "2020%"))),
+            limit=5,
+            ctes=(Cte("rich", Select(("*",), From("employees"), Where((Compare("salary", ">", 90000),)))),),
+        )
+        params = (90000, "Oslo", 20, 30, "2020%")
+        self.assertEqual(render(statement, "?"), (
+            "WITH rich AS (SELECT * FROM employees WHERE salary > ?) SELECT * FROM employees "
+            "WHERE city = ? AND age BETWEEN ? AND ? AND salary > (SELECT 1) AND join_date LIKE ? LIMIT 5", params))
+        self.assertEqual(render(statement, "$1")[0].count("$"), 5)
+        self.assertIn("age BETWEEN $3 AND $4", render(statement, "$1")[0])
+        self.assertEqual(render(Update("t", (("a", 1),), Where((Compare("b", "LIKE", Raw("'x%'")),))), "%s"),
+                         ("UPDATE t SET a = %s WHERE b LIKE 'x%%'", (1,)))
+        # Written out, the same tree is unchanged
+        self.assertIn("city = 'Oslo'", render(statement))
+
+    def test_inline_writes_bound_values_back(self):
+        statement = Select(("*",), From("employees"), Where((
+            Compare("name", "=", "O'Brien"), Compare("note", "LIKE", Raw("'why?$1%'")), Compare("age", ">", 30))))
+        for placeholder in ("?", "%s", "$1"):
+            self.assertEqual(inline(*render(statement, placeholder), placeholder), render(statement))
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_every_statement_uses_the_same_filters(self):
+        filters = {"join_date": {"like": "2020%"}, "position": {"eq": "software engineer"}, "age": {"between": [20, 30]}}
+        where = "WHERE join_date LIKE '2020%' AND position = 'Software Engineer' AND age BETWEEN 20 AND 30;"
+        self.assertTrue(generate_sql("SELECT", ["employees"], [], filters).endswith(where))
+        self.assertTrue(generate_sql("DELETE", ["employees"], [], filters).endswith(where))
+        # Aggregates filter too, ahead of their grouping
+        self.assertEqual(
+            generate_sql("AGGREGATE", ["employees"], ["salary"], {"city": "london", "function": "sum"}, group_by="city"),
+            "SELECT city, SUM(salary) FROM employees WHERE city = 'London' GROUP BY city;",
+        )
+
+    def test_no_statement(self):
+        self.assertEqual(generate_sql("UPDATE", ["employees"], []), "UPDATE employees SET ... WHERE ...;")
+        self.assertEqual(generate_sql("EXPLAIN", ["employees"], []), "-- Unknown intent;")
+        self.assertIsNone(build_statement("INSERT", ["employees"], []))
+        with self.assertRaises(ValueError):
+            generate_sql("SELECT", [], [])
+
+    def test_memoized_sql_follows_the_values(self):
+        generator.clear_cache()
+        parsed = parse_natural_language("show employees in oslo")
+        mapping = SchemaMapping(("employees",), (), {"city": "oslo"})
+        values = ValueIndex({"employees.city": ["OSLO"]})
+        self.assertIn("'OSLO'", generate_sql_for("SELECT", parsed, mapping, values=values))
+        self.assertIs(generate_sql_for("SELECT", parsed, mapping, values=values),
+                      generate_sql_for("SELECT", parsed, mapping, values=values))
+        values.replace("employees.city", ["Oslo"])
+        self.assertIn("'Oslo'", generate_sql_for("SELECT", parsed, mapping, values=values))
+        self.assertEqual(generate_sql_for("SELECT", parsed, mapping, values=values, placeholder="?"),
+                         ("SELECT * FROM employees WHERE city = ?;", ("Oslo",)))
+        self.assertEqual(generate_sql("UPDATE", ["employees"], [], placeholder="?"),
+                         ("UPDATE employees SET ... WHERE ...;", ()))
+
+    def test_memo_does_not_hold_catalogs_or_values(self):
+        generator.clear_cache()
+        parsed = parse_natural_language("show employees in oslo")
+        mapping = SchemaMapping(("employees",), (), {"city": "oslo"})
+        catalog = SchemaCatalog.from_schema({"employees": ["id", "city"]})
+        values = ValueIndex({"employees.city": ["Oslo"]})
+        held = sys.getrefcount(catalog), sys.getrefcount(values)
+        sql = generate_sql_for("SELECT", parsed, mapping, catalog, values)
+        self.assertIs(generate_sql_for("SELECT", parsed, mapping, catalog, values), sql)
+        self.assertEqual((sys.getrefcount(catalog), sys.getrefcount(values)), held)
+
+
+if __name__ == "__main__":
+    unittest.main()
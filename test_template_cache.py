@@ -0,0 +1,102 @@
+import ast
+import os
+import re
+import unittest
+
+import pipeline
+from template_cache import TemplateCache, fingerprint
+from translation_cache import normalize_query
+
+
+def pipeline_corpus():
+    """Every ``query = "..."`` string in test_pipeline.py."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_pipeline.py")
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    queries = []
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Assign)
+            and any(isinstance(target, ast.Name) and target.id == "query" for target in node.targets)
+            and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str)
+        ):
+            queries.append(node.value.value)
+    return queries
+
+
+EXTRA_QUERIES = [
+    "Show employees in New York who are older than 25 and earn more than 50000",
+    "Show employees who joined after 2020-01-01",
+    "Insert a new employee named Bob with email bob@company.com and salary 70000",
+    "Show departments with more than 2 employees",
+    "Show top 3 employees by salary",
+    "Delete employees younger than 25",
+    "Show employees in London",
+]
+
+
+def variant(query: str) -> str:
+    """The same question with different literals of the same shape."""
+    swapped = re.sub(r"\d+", lambda m: str(int(m.group()) + 1).zfill(len(m.group()))[-len(m.group()):], query)
+    return swapped.replace("London", "Paris").replace("london", "paris")
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_literals_become_placeholders(self):
+        key, literals = fingerprint("show employees in london older than 30")
+        other, _ = fingerprint("show employees in tokyo older than 45")
+        self.assertEqual(key, other)
+        self.assertEqual([token.text for token in literals], ["london", "30"])
+
+    def test_number_length_is_part_of_the_shape(self):
+        self.assertNotEqual(fingerprint("joined in 2021")[0], fingerprint("joined in 21")[0])
+
+
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        pipeline.configure_cache()
+
+    def tearDown(self):
+        pipeline.configure_cache()
+
+    def assert_matches_uncached(self, queries):
+        for query in queries:
+            expected = pipeline.nl_to_sql(query, use_cache=False)
+            self.assertEqual(pipeline.nl_to_sql(query), expected, query)
+
+    def test_corpus_matches_uncached(self):
+        queries = pipeline_corpus() + EXTRA_QUERIES
+        self.assertGreater(len(queries), 20)
+        self.assert_matches_uncached(queries)
+        # Same shapes, new literals: answered from templates
+        self.assert_matches_uncached([variant(query) for query in queries])
+        self.assertGreater(pipeline.template_cache_stats()["hits"], 0)
+
+    def test_rebinds_literals(self):
+        pipeline.nl_to_sql("Delete employees with salary less than 30000")
+        sql = pipeline.nl_to_sql("Delete employees with salary less than 45000")
+        self.assertIn("45000", sql)
+        self.assertNotIn("30000", sql)
+        stats = pipeline.template_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_result_is_not_shared(self):
+        cache = TemplateCache()
+        query = normalize_query("Show top 3 employees by salary")
+        first, _, _ = cache.translate(query, pipeline._prepare)
+        second, intent, from_template = cache.translate(normalize_query("Show top 4 employees by salary"), pipeline._prepare)
+        self.assertTrue(from_template)
+        self.assertEqual(intent, "SELECT")
+        self.assertEqual(cache.translate(query, pipeline._prepare)[0], first)
+        self.assertNotEqual(first, second)
+
+    def test_stats(self):
+        stats = pipeline.template_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (0, 0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from parser_agent.parser import parse_natural_language
+from parser_agent.tokenizer import (
+    DATE,
+    EMAIL,
+    ENTITY,
+    IDENTIFIER,
+    KEYWORD,
+    NUMBER,
+    SYMBOL,
+    WORDS,
+    tokenize,
+)
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def test_token_kinds_and_offsets(self):
+        query = "insert bob with email bob@company.com, salary 60000 joined after 2020-01-01"
+        tokens = tokenize(query)
+        kinds = [(token.kind, token.text) for token in tokens]
+        self.assertEqual(kinds, [
+            (IDENTIFIER, "insert"),
+            (IDENTIFIER, "bob"),
+            (IDENTIFIER, "with"),
+            (KEYWORD, "email"),
+            (EMAIL, "bob@company.com"),
+            (SYMBOL, ","),
+            (KEYWORD, "salary"),
+            (NUMBER, "60000"),
+            (KEYWORD, "joined"),
+            (KEYWORD, "after"),
+            (DATE, "2020-01-01"),
+        ])
+        for token in tokens:
+            self.assertEqual(query[token.start:token.end], token.text)
+
+    def test_multi_word_entity(self):
+        tokens = tokenize("show employees in new  york")
+        city = tokens[-1]
+        self.assertEqual((city.kind, city.category, city.text), (ENTITY, "city", "new york"))
+        self.assertEqual(tokens.words_after(("in",)), "new  york")
+
+    def test_phrase_lookups(self):
+        tokens = tokenize("show employees older than 30 who earn between 40000 and 80000")
+        self.assertEqual(tokens.after(("older", "than"), (NUMBER,)).text, "30")
+        self.assertEqual(tokens.range_after(("earn", "between")), [40000, 80000])
+        self.assertIsNone(tokens.after(("younger", "than"), (NUMBER,)))
+
+    def test_phrase_needs_whitespace(self):
+        tokens = tokenize("older than30")
+        self.assertIsNone(tokens.after(("older", "than"), (NUMBER,)))
+
+    def test_word_run_stops_at_non_words(self):
+        tokens = tokenize("insert alice, from london, as software engineer")
+        self.assertEqual(tokens.words_after((frozenset(["from", "in"]),)), "london")
+        self.assertEqual(tokens.words_after(("as",)), "software engineer")
+        self.assertEqual(tokens.after(("from",), WORDS).category, "city")
+
+
+class TestTokenizedFilters(unittest.TestCase):
+
+    def test_first_city_in_the_question_wins(self):
+        # Not the first of the known cities in list order: New York comes first there
+        self.assertEqual(parse_natural_language("Show employees in Tokyo and New York").filters["city"], "tokyo")
+        self.assertEqual(parse_natural_language("Show employees in New York and Tokyo").filters["city"], "new york")
+
+    def test_dates_are_not_read_as_numbers(self):
+        # A date is one token, so "age 2020-01-01" is no longer age 2020
+        self.assertNotIn("age", parse_natural_language("Show employees older than 2020-01-01").filters)
+        inserted = parse_natural_language("Add employee named Zed with salary 2023-05-01 and age 2020-01-01")
+        self.assertEqual(dict(inserted.filters), {"name": "zed"})
+        self.assertEqual(parse_natural_language("Add employee named Zed with salary 60000").filters["salary"], 60000)
+
+    def test_update_department_takes_every_word_before_department(self):
+        # Used to stop at the first word and set department = 'new'
+        parsed = parse_natural_language("update salary to 90000 for employees in new york department")
+        self.assertEqual(parsed.filters["department"], "new york")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import contextlib
+import io
+import unittest
+
+import pipeline
+import tracing
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        pipeline.configure_cache()
+
+    def tearDown(self):
+        tracing.set_verbose(False)
+        pipeline.configure_cache()
+
+    def run_query(self, query):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            sql = pipeline.nl_to_sql(query)
+        return sql, out.getvalue()
+
+    def test_quiet_by_default(self):
+        self.assertFalse(tracing.enabled)
+        _, output = self.run_query("Show employees with rollup")
+        self.assertEqual(output, "")
+
+    def test_verbose_prints_every_stage(self):
+        tracing.set_verbose()
+        sql, output = self.run_query("Show employees with rollup")
+        self.assertIn("🔍 Input Query: Show employees with rollup", output)
+        self.assertIn("🧠 Final Parsed Output:", output)
+        self.assertIn("🎯 Intent Detected: SELECT", output)
+        self.assertIn("🔍 Advanced Aggregation: ROLLUP", output)
+        self.assertIn(f"💡 Generated SQL: {sql}", output)
+
+    def test_request_scoped_hook(self):
+        events = []
+        with tracing.traced(lambda stage, message, data: events.append((stage, data))):
+            self.assertTrue(tracing.enabled)
+            sql, output = self.run_query("Show employees older than 30")
+        self.assertFalse(tracing.enabled)
+        self.assertEqual(output, "")
+        stages = {stage for stage, _ in events}
+        self.assertEqual(stages, {"parser", "pipeline"})
+        self.assertIn({"sql": sql, "cache": None}, [data for _, data in events])
+
+    def test_muted_block(self):
+        tracing.set_verbose()
+        with tracing.muted():
+            _, output = self.run_query("Show all employees")
+        self.assertEqual(output, "")
+
+    def test_template_probe_is_not_traced(self):
+        events = []
+        with tracing.traced(lambda stage, message, data: events.append(data)):
+            self.run_query("Delete employees younger than 25")
+        queries = [data["query"] for data in events if "query" in data]
+        self.assertEqual(queries, ["Delete employees younger than 25", "delete employees younger than 25"])
+
+
+if __name__ == "__main__":
+    unittest.main()
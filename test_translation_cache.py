@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pipeline
+from translation_cache import TranslationCache, normalize_query
+
+
+class TestTranslationCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = TranslationCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = TranslationCache(ttl=0.01)
+        cache.put("a", "1")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual((stats["expirations"], stats["misses"], stats["entries"]), (1, 1, 0))
+
+    def test_memory_bound(self):
+        cache = TranslationCache(max_entries=100, max_bytes=400)
+        for i in range(20):
+            cache.put(f"key {i}", "x" * 50)
+        self.assertLessEqual(cache.stats()["bytes"], 400)
+        self.assertGreater(cache.stats()["evictions"], 0)
+        cache.put("huge", "x" * 1000)
+        self.assertNotIn("huge", cache)
+
+    def test_memory_bound_counts_tuple_contents(self):
+        cache = TranslationCache(max_entries=10000, max_bytes=100 * 1024)
+        for i in range(900):
+            cache.put(("?", None, f"query {i}"), ("SELECT " + "x, " * 2000 + f"{i};", "SELECT"))
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 100 * 1024)
+        self.assertLess(stats["entries"], 20)
+        self.assertGreater(stats["evictions"], 880)
+
+    def test_hit_miss_counters(self):
+        cache = TranslationCache()
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "1")
+        self.assertEqual(cache.get("a"), "1")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_concurrent_access(self):
+        cache = TranslationCache(max_entries=50)
+
+        def worker(n):
+            for i in range(500):
+                cache.put(f"{n}-{i % 80}", str(i))
+                cache.get(f"{n}-{(i * 7) % 80}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 50)
+        self.assertEqual(stats["hits"] + stats["misses"], 8 * 500)
+
+
+class TestPipelineCache(unittest.TestCase):
+
+    def setUp(self):
+        pipeline.configure_cache()
+
+    def tearDown(self):
+        pipeline.configure_cache()
+
+    def test_normalized_key(self):
+        self.assertEqual(normalize_query("  Show   ALL employees "), "show all employees")
+
+    def test_repeated_query_hits_cache(self):
+        first = pipeline.nl_to_sql("Show employees older than 30")
+        second = pipeline.nl_to_sql("  show EMPLOYEES older   than 30")
+        self.assertEqual(first, second)
+        stats = pipeline.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_cached_result_matches_uncached(self):
+        query = "Show employees in New York who are older than 25 and earn more than 50000"
+        pipeline.nl_to_sql(query)
+        self.assertEqual(pipeline.nl_to_sql(query), pipeline.nl_to_sql(query, use_cache=False))
+
+    def test_disabled_cache(self):
+        pipeline.configure_cache(max_entries=0)
+        pipeline.nl_to_sql("Show all employees")
+        pipeline.nl_to_sql("Show all employees")
+        self.assertEqual(pipeline.cache_stats()["hits"], 0)
+
+    def test_disabled_cache_parses_each_query_once(self):
+        pipeline.configure_cache(max_entries=0)
+        queries = [f"Show employees older than {age}" for age in (25, 30, 35, 40, 45)]
+        with mock.patch.object(pipeline, "_prepare", wraps=pipeline._prepare) as prepare:
+            for query in queries:
+                pipeline.nl_to_sql(query)
+        self.assertEqual(prepare.call_count, len(queries))
+        self.assertEqual(pipeline.template_cache_stats()["misses"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import pipeline
+from parser_agent.parser import parse_natural_language
+from parser_agent.tokenizer import ENTITY, tokenize
+from schema_mapper import introspection
+from schema_mapper.introspection import ValueSampler, catalog_for, read_text_columns, values_for
+from schema_mapper.value_index import DEFAULT_VALUES, ValueIndex
+
+DDL = """
+CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, location TEXT, budget REAL);
+CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, salary REAL, city TEXT, position TEXT,
+                        department_id INTEGER REFERENCES departments (id));
+INSERT INTO departments VALUES (1, 'Engineering', 'Springfield', 500000), (2, 'Research & Development', 'Oslo', 200000);
+"""
+CITIES = ["Springfield", "Oslo", "Rio de Janeiro"]
+POSITIONS = ["Engineer", "Analyst"]
+
+
+class TestValueIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.values = ValueIndex({"employees.city": ["New York", "Oslo"], "departments.name": ["Engineering"]})
+
+    def test_lookup_by_normalized_phrase(self):
+        self.assertEqual(self.values.lookup("new  YORK"), ("employees.city", "New York"))
+        self.assertEqual(self.values.lookup("new york", "city"), ("employees.city", "New York"))
+        self.assertIsNone(self.values.lookup("new york", "departments.name"))
+        self.assertIsNone(self.values.lookup("york"))
+        self.assertEqual(self.values.canonical("engineering", "department"), "Engineering")
+        self.assertEqual(self.values.canonical("narnia", "city"), "narnia")
+
+    def test_find_prefers_the_longest_value(self):
+        self.values.replace("employees.city", ["New York", "York", "Oslo"])
+        words = "show employees in new york and york".split()
+        self.assertEqual(
+            [(start, end, canonical) for start, end, _, canonical in self.values.find(words, "city")],
+            [(3, 5, "New York"), (6, 7, "York")],
+        )
+
+    def test_replace_drops_old_values_and_changes_fingerprint(self):
+        before = self.values.fingerprint
+        self.values.replace("employees.city", ["Lima"])
+        self.assertNotEqual(self.values.fingerprint, before)
+        self.assertIsNone(self.values.lookup("oslo"))
+        self.assertFalse(self.values.has_word("york", "city"))
+        self.assertEqual(self.values.values("city"), ["lima"])
+        self.assertEqual(self.values.find(["oslo"]), [])
+
+    def test_bundled_values_match_the_demo_entities(self):
+        self.assertEqual(DEFAULT_VALUES.canonical("software engineer", "position"), "Software Engineer")
+        self.assertEqual(DEFAULT_VALUES.lookup("bangalore", "city"), ("city", "Bangalore"))
+        self.assertTrue(DEFAULT_VALUES.has_word("york", "city"))
+
+    def test_tokenizer_and_parser_use_the_given_values(self):
+        values = ValueIndex({"employees.city": ["Rio de Janeiro"]})
+        entities = [token for token in tokenize("employees in rio de  janeiro", values) if token.kind == ENTITY]
+        self.assertEqual([(e.text, e.category) for e in entities], [("rio de janeiro", "city")])
+        self.assertEqual(tokenize("employees in london", values)[-1].kind, "identifier")
+
+        parsed = parse_natural_language("Show employees in Rio de Janeiro", values)
+        self.assertEqual(parsed.filters["city"], "rio de janeiro")
+        self.assertEqual(parsed.table, "employees")
+
+
+class TestValueSampling(unittest.TestCase):
+
+    def setUp(self):
+        introspection.clear_catalogs()
+        pipeline.configure_cache()
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript(DDL)
+        rows = [(i, f"Person {i}", 40000 + i, CITIES[i % 3], POSITIONS[i % 2], 1 + i % 2) for i in range(300)]
+        self.conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.catalog = catalog_for(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        introspection.clear_catalogs()
+
+    def test_samples_low_cardinality_text_columns(self):
+        sampler = ValueSampler(self.catalog.schema, "sqlite")
+        sampler.refresh(self.conn)
+        # employees.name is unique in a table larger than max_values, the
+        # numeric columns aren't text; the small departments table is kept whole
+        self.assertEqual(sorted(sampler.index.columns()), [
+            "departments.location", "departments.name", "employees.city", "employees.position",
+        ])
+        self.assertEqual(sampler.index.lookup("rio de janeiro", "city"), ("employees.city", "Rio de Janeiro"))
+
+    def test_reads_only_a_sample_of_the_text_columns(self):
+        self.assertEqual(read_text_columns(self.conn, self.catalog.schema),
+                         {"departments": ["name", "location"], "employees": ["name", "city", "position"]})
+        sampler = ValueSampler(self.catalog.schema, "sqlite", sample_rows=100)
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        sampler.refresh(self.conn)
+        self.conn.set_trace_callback(None)
+        selects = [sql for sql in statements if sql.startswith("SELECT")]
+        self.assertTrue(selects)
+        self.assertTrue(all("LIMIT" in sql and "salary" not in sql for sql in selects), selects)
+
+        # Seen through 100 of 300 rows: recognized, but not yet complete
+        self.assertEqual(sampler.index.lookup("oslo", "city"), ("employees.city", "Oslo"))
+        self.assertTrue(sampler.index.may_contain("Narnia", "employees.city"))
+        self.assertFalse(sampler.index.may_contain("Narnia", "departments.location"))
+        # Names need a filter, which isn't built from part of a large table
+        self.assertEqual(sampler.pending, {"employees.city", "employees.name", "employees.position"})
+        self.assertEqual(sampler.index.filters(), {})
+        self.assertEqual(sampler.read_pending(self.conn), ["employees.city", "employees.name", "employees.position"])
+        self.assertFalse(sampler.index.may_contain("Narnia", "employees.city"))
+        self.assertFalse(sampler.index.may_contain("Person 1000", "employees.name"))
+        self.assertTrue(sampler.index.may_contain("person 299", "employees.name"))
+        self.assertEqual(sampler.pending, set())
+
+    def test_refresh_rereads_only_changed_columns(self):
+        sampler = ValueSampler(self.catalog.schema, "sqlite")
+        sampler.refresh(self.conn)
+        version = sampler.index.version
+        self.assertEqual(sampler.refresh(self.conn), [])
+        self.assertEqual(sampler.index.version, version)
+
+        self.conn.execute("UPDATE employees SET city = 'Lima' WHERE city = 'Oslo'")
+        self.assertEqual(sampler.refresh(self.conn), ["employees.city"])
+        self.assertEqual(sorted(sampler.index.values("employees.city")), ["lima", "rio de janeiro", "springfield"])
+
+    def test_translation_uses_the_live_values(self):
+        values = values_for(self.conn, self.catalog)
+        self.assertIs(values_for(self.conn, self.catalog), values)
+
+        sql = pipeline.nl_to_sql("Show employees in springfield", catalog=self.catalog, values=values)
+        self.assertIn("city = 'Springfield'", sql)
+        self.assertEqual(len(self.conn.execute(sql).fetchall()), 100)
+        # The bundled values don't know Springfield
+        self.assertNotIn("city =", pipeline.nl_to_sql("Show employees in springfield", catalog=self.catalog))
+
+        delete = pipeline.nl_to_sql("Delete employees in rio de janeiro", catalog=self.catalog, values=values)
+        self.assertEqual(delete, "DELETE FROM employees WHERE city = 'Rio de Janeiro';")
+
+    def test_refreshed_values_are_not_served_from_stale_cache_entries(self):
+        values = values_for(self.conn, self.catalog)
+        query = "Show employees in lima"
+        self.assertNotIn("city =", pipeline.nl_to_sql(query, catalog=self.catalog, values=values))
+        self.conn.execute("UPDATE employees SET city = 'Lima' WHERE city = 'Oslo'")
+        values = values_for(self.conn, self.catalog, max_age=0)
+        self.assertIn("city = 'Lima'", pipeline.nl_to_sql(query, catalog=self.catalog, values=values))
+
+
+    def test_background_refresh_keeps_serving_the_current_values(self):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.conn.commit()
+        self.conn.execute("VACUUM INTO ?", (path,))
+        conn = sqlite3.connect(path)
+        try:
+            catalog = catalog_for(conn)
+            connect = lambda: sqlite3.connect(path)
+            values = values_for(conn, catalog, max_age=0, connect=connect)
+            conn.execute("UPDATE employees SET city = 'Lima' WHERE city = 'Oslo'")
+            conn.commit()
+            self.assertIs(values_for(conn, catalog, max_age=0, connect=connect), values)
+            for thread in threading.enumerate():
+                if thread.name == "value-refresh":
+                    thread.join()
+            self.assertEqual(values.lookup("lima", "city"), ("employees.city", "Lima"))
+        finally:
+            conn.close()
+            os.remove(path)
+
+if __name__ == "__main__":
+    unittest.main()
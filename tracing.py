@@ -0,0 +1,95 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List
+
+# A hook receives (stage, message, data): the component that emitted the
+# event ("parser", "pipeline", "generator"), the human-readable line the CLI
+# prints, and structured fields for loggers and metrics.
+Hook = Callable[[str, str, Dict], None]
+
+# Call sites check this before building a message, so a disabled trace costs
+# one attribute lookup: ``if tracing.enabled: tracing.emit(...)``. Read it
+# through the module; a ``from tracing import enabled`` copy goes stale.
+enabled = False
+
+_process_hooks: List[Hook] = []
+# Hooks for the current request (thread / async task); None means "use the
+# process hooks"
+_request_hooks: ContextVar = ContextVar("trace_hooks", default=None)
+_active_requests = 0
+_lock = threading.Lock()
+
+
+def _refresh() -> None:
+    global enabled
+    enabled = bool(_process_hooks) or _active_requests > 0
+
+
+def emit(stage: str, message: str, **data) -> None:
+    hooks = _request_hooks.get()
+    if hooks is None:
+        hooks = _process_hooks
+    for hook in hooks:
+        hook(stage, message, data)
+
+
+def add_hook(hook: Hook) -> None:
+    """Trace every request in this process to ``hook``."""
+    with _lock:
+        if hook not in _process_hooks:
+            _process_hooks.append(hook)
+        _refresh()
+
+
+def remove_hook(hook: Hook) -> None:
+    with _lock:
+        if hook in _process_hooks:
+            _process_hooks.remove(hook)
+        _refresh()
+
+
+def clear_hooks() -> None:
+    """Remove every process-wide hook."""
+    with _lock:
+        _process_hooks.clear()
+        _refresh()
+
+
+def print_hook(stage: str, message: str, data: Dict) -> None:
+    print(message)
+
+
+def set_verbose(verbose: bool = True) -> None:
+    """Print every trace line to stdout (the CLI's debug output), or stop."""
+    if verbose:
+        add_hook(print_hook)
+    else:
+        remove_hook(print_hook)
+
+
+@contextmanager
+def traced(*hooks: Hook):
+    """Trace only the code inside the block, e.g. a single request, to ``hooks``."""
+    global _active_requests
+    token = _request_hooks.set(tuple(hooks))
+    with _lock:
+        _active_requests += 1
+        _refresh()
+    try:
+        yield
+    finally:
+        _request_hooks.reset(token)
+        with _lock:
+            _active_requests -= 1
+            _refresh()
+
+
+@contextmanager
+def muted():
+    """Drop trace events inside the block, whatever hooks are installed."""
+    token = _request_hooks.set(())
+    try:
+        yield
+    finally:
+        _request_hooks.reset(token)